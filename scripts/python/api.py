@@ -10,7 +10,7 @@ url = os.getenv("API_URL")
 with open('data.json', 'r') as json_file:
     data = json.load(json_file)
 
-response = requests.post(url, json=data, timeout=10)
+response = requests.post(f"{url.rstrip('/')}/_bulk", json=data, timeout=60)
 
 print(response.status_code)
 print(response.json())
@@ -0,0 +1,90 @@
+"""
+Measures how long a fresh worker process takes to become useful.
+
+Each run starts a new interpreter and times, in milliseconds:
+
+- import:        ``import app`` (the factory package)
+- create_app:    building the Flask app
+- first_request: the first GET /api/items, which loads the repository
+- warmup:        ``warmup(app)`` instead of a first request (separate run)
+
+    python coldstart.py --runs 20
+    python coldstart.py --data-file /tmp/big.json --json
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+SRC_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+)
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app as factory
+imported = time.perf_counter()
+flask_app = factory.create_app()
+created = time.perf_counter()
+if sys.argv[1] == 'warmup':
+    factory.warmup(flask_app)
+else:
+    flask_app.test_client().get('/api/items')
+done = time.perf_counter()
+print(json.dumps({
+    'import': (imported - start) * 1000,
+    'create_app': (created - imported) * 1000,
+    sys.argv[1]: (done - created) * 1000,
+}))
+"""
+
+
+def probe(mode, env):
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, mode],
+        cwd=SRC_DIR,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--data-file', help="DATA_FILE for the probe")
+    parser.add_argument('--json', action='store_true',
+                        help="print the medians as JSON")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=SRC_DIR, PYTHONDONTWRITEBYTECODE='')
+    if args.data_file:
+        env['DATA_FILE'] = os.path.abspath(args.data_file)
+
+    samples = {}
+    for _ in range(args.runs):
+        for mode in ('first_request', 'warmup'):
+            for phase, value in probe(mode, env).items():
+                samples.setdefault(phase, []).append(value)
+
+    medians = {
+        phase: round(statistics.median(values), 2)
+        for phase, values in samples.items()
+    }
+    if args.json:
+        print(json.dumps(medians, indent=2))
+        return
+    for phase, values in samples.items():
+        print(
+            f"{phase:<14} median {statistics.median(values):8.2f} ms"
+            f"   min {min(values):8.2f} ms   max {max(values):8.2f} ms"
+        )
+
+
+if __name__ == '__main__':
+    main()
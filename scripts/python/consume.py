@@ -1,52 +1,218 @@
+"""
+Log consumer for the 'logs' fanout exchange.
+
+Every worker process consumes from one shared, durable queue bound to the
+exchange, so adding workers splits the load instead of duplicating it.
+Each worker limits unacknowledged deliveries with basic_qos, formats
+messages as they arrive, writes them to a rotating log file in batches
+and acknowledges each batch with a single multiple=True ack. Formatting
+is CPU-bound, so it scales with --workers processes rather than threads.
+Throughput, end-to-end lag and queue depth are reported periodically.
+
+    python consume.py --workers 4 --prefetch 1000 --output logs/app.log
+"""
+import os
+import json
+import time
+import signal
+import logging
+import argparse
+import multiprocessing
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
 import pika
 
+logger = logging.getLogger('consume')
 
-def callback(
-    ch,
-    method,
-    properties,
-    body
-):
-    print(
-        f"Returning: {body}"
-    )
+EXCHANGE = 'logs'
 
 
-def consume_log(
-        message
-):
-    connection = pika.BlockingConnection(
-        pika.ConnectionParameters(
-            'localhost'
-        )
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument(
+        '--url', default=os.getenv('RABBITMQ_URI', 'localhost'),
+        help="AMQP URL or host name (default: $RABBITMQ_URI or localhost)"
     )
+    parser.add_argument('--queue', default='log_consumer')
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of consumer processes")
+    parser.add_argument('--prefetch', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--batch-interval', type=float, default=1.0,
+                        help="seconds before a partial batch is flushed")
+    parser.add_argument('--output', default='logs/consumer.log',
+                        help="rotating log file, or - for stdout")
+    parser.add_argument('--max-bytes', type=int, default=50 * 1024 * 1024)
+    parser.add_argument('--backup-count', type=int, default=5)
+    parser.add_argument('--report-interval', type=float, default=10.0)
+    return parser.parse_args(argv)
 
-    channel = connection.channel(
-    )
 
-    channel.exchange_declare(
-        exchange='logs', exchange_type='fanout'
-    )
+def connection_parameters(url):
+    if '://' in url:
+        return pika.URLParameters(url)
+    return pika.ConnectionParameters(url)
+
 
-    result = channel.queue_declare(
-        queue='',
-        exclusive=True
+def format_message(body):
+    """Returns ``(line, created)`` for one delivered message."""
+    text = body.decode('utf-8', errors='replace')
+    try:
+        record = json.loads(text)
+        created = float(record['timestamp'])
+    except (ValueError, KeyError, TypeError):
+        return text, None
+    timestamp = datetime.fromtimestamp(created, timezone.utc).isoformat()
+    line = "{} {} {} [{}] {}".format(
+        timestamp,
+        record.get('level', '-'),
+        record.get('logger', '-'),
+        record.get('pid', '-'),
+        record.get('message', '')
     )
+    return line, created
 
-    queue_name = result.method.queue
 
-    channel.queue_bind(
-        exchange='logs',
-        queue=queue_name
-    )
+class RotatingFileSink:
+    """Writes each batch of lines with one write to a rotating file."""
+
+    def __init__(self, path, max_bytes, backup_count):
+        if path == '-':
+            self._handler = logging.StreamHandler()
+        else:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self._handler = RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backup_count
+            )
+        self._handler.setFormatter(logging.Formatter('%(message)s'))
+
+    def write(self, lines):
+        record = logging.makeLogRecord({'msg': '\n'.join(lines)})
+        self._handler.emit(record)
+
+    def close(self):
+        self._handler.close()
+
+
+class LogConsumer:
+    def __init__(self, args, sink):
+        self.args = args
+        self.sink = sink
+        self.pending = []
+        self.last_flush = time.monotonic()
+        self.processed = 0
+        self.lag = 0.0
+        self.stopping = False
+        self.channel = None
+
+    def on_message(self, channel, method, properties, body):
+        line, created = format_message(body)
+        self.pending.append((method.delivery_tag, line, created))
+        if len(self.pending) >= self.args.batch_size:
+            self.flush()
 
-    channel.basic_consume(
-        queue=queue_name,
-        on_message_callback=callback,
-        auto_ack=True
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        self.sink.write([line for _, line, _ in batch])
+        self.channel.basic_ack(delivery_tag=batch[-1][0], multiple=True)
+
+        self.processed += len(batch)
+        created = [stamp for _, _, stamp in batch if stamp is not None]
+        if created:
+            self.lag = time.time() - max(created)
+
+    def report(self, started, processed_before):
+        elapsed = time.monotonic() - started
+        depth = self.channel.queue_declare(
+            queue=self.args.queue, passive=True
+        ).method.message_count
+        logger.info(
+            "pid %d: %.0f msg/s, lag %.3fs, queue depth %d, total %d",
+            os.getpid(),
+            (self.processed - processed_before) / elapsed if elapsed else 0,
+            self.lag,
+            depth,
+            self.processed
+        )
+
+    def stop(self, *_):
+        self.stopping = True
+
+    def run(self):
+        connection = pika.BlockingConnection(
+            connection_parameters(self.args.url)
+        )
+        self.channel = connection.channel()
+        self.channel.exchange_declare(
+            exchange=EXCHANGE, exchange_type='fanout'
+        )
+        self.channel.queue_declare(queue=self.args.queue, durable=True)
+        self.channel.queue_bind(exchange=EXCHANGE, queue=self.args.queue)
+        self.channel.basic_qos(prefetch_count=self.args.prefetch)
+        self.channel.basic_consume(
+            queue=self.args.queue, on_message_callback=self.on_message
+        )
+
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        started, processed_before = time.monotonic(), 0
+        try:
+            while not self.stopping:
+                connection.process_data_events(
+                    time_limit=min(self.args.batch_interval, 1.0)
+                )
+                if (time.monotonic() - self.last_flush
+                        >= self.args.batch_interval):
+                    self.flush()
+                if time.monotonic() - started >= self.args.report_interval:
+                    self.report(started, processed_before)
+                    started, processed_before = (
+                        time.monotonic(), self.processed
+                    )
+            self.flush()
+        finally:
+            self.sink.close()
+            if connection.is_open:
+                connection.close()
+
+
+def consume_log(args):
+    sink = RotatingFileSink(args.output, args.max_bytes, args.backup_count)
+    LogConsumer(args, sink).run()
+
+
+def main(argv=None):
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
     )
+    args = parse_args(argv)
+    if args.workers <= 1:
+        consume_log(args)
+        return
 
-    channel.start_consuming()
+    workers = []
+    for number in range(args.workers):
+        worker_args = argparse.Namespace(**vars(args))
+        if args.output != '-':
+            root, ext = os.path.splitext(args.output)
+            worker_args.output = f"{root}.{number}{ext}"
+        process = multiprocessing.Process(
+            target=consume_log, args=(worker_args,)
+        )
+        process.start()
+        workers.append(process)
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        for process in workers:
+            process.terminate()
+            process.join()
 
 
-consume_log()
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+import json
+from marshmallow import ValidationError
+from .items import item_schema, items_schema
+
+BULK_OPERATIONS = ('create', 'update', 'delete')
+
+BULK_STATUS = {
+    'created': 201,
+    'updated': 200,
+    'deleted': 200,
+    'exists': 400,
+    'not_found': 404,
+    'invalid': 400
+}
+
+BULK_ERRORS = {
+    'exists': "Item already exists",
+    'not_found': "Item not found"
+}
+
+
+def read_operations(request):
+    """
+    Returns the raw operations of a bulk request.
+
+    The body is either a JSON array or, with an ``application/x-ndjson``
+    content type, one JSON value per line. Raises ValueError if it is
+    neither.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        return [
+            json.loads(line)
+            for line in request.get_data(as_text=True).splitlines()
+            if line.strip()
+        ]
+    operations = request.get_json(silent=True)
+    if not isinstance(operations, list):
+        raise ValueError("Expected a JSON array or NDJSON operations.")
+    return operations
+
+
+def prepare_operations(raw_operations):
+    """
+    Validates raw operations and returns ``(operations, errors)``.
+
+    Each entry is ``{"op": "create" | "update" | "delete", "id": ...,
+    "item": {...}}``; an entry without ``op`` is treated as an item to
+    create, and any ``id`` it carries is ignored because the store
+    assigns ids. ``operations`` holds ``(position, op, key, item)`` tuples for
+    the valid entries and ``errors`` maps positions to error messages.
+    Item payloads are validated together with ``ItemSchema(many=True)``.
+    """
+    errors = {}
+    parsed = []
+    for position, entry in enumerate(raw_operations):
+        if not isinstance(entry, dict):
+            errors[position] = "Operation must be an object"
+            continue
+        if 'op' not in entry:
+            item = {key: entry[key] for key in entry if key != 'id'}
+            parsed.append((position, 'create', None, item))
+            continue
+        op = entry['op']
+        if op not in BULK_OPERATIONS:
+            errors[position] = f"Unknown operation: {op}"
+        elif op != 'create' and not isinstance(entry.get('id'), int):
+            errors[position] = "Operation requires an integer id"
+        elif op != 'delete' and not isinstance(entry.get('item'), dict):
+            errors[position] = "Operation requires an item object"
+        else:
+            parsed.append((position, op, entry.get('id'), entry.get('item')))
+
+    payloads = [item for _, op, _, item in parsed if op != 'delete']
+    try:
+        loaded = iter(items_schema.load(payloads))
+    except ValidationError:
+        loaded = None
+
+    operations = []
+    for position, op, key, item in parsed:
+        if op != 'delete':
+            if loaded is not None:
+                item = next(loaded)
+            else:
+                try:
+                    item = item_schema.load(item)
+                except ValidationError as err:
+                    errors[position] = err.messages
+                    continue
+            if len(item['name']) < 3:
+                errors[position] = (
+                    "Item name must be at least 3 characters long"
+                )
+                continue
+        operations.append((position, op, key, item))
+    return operations, errors
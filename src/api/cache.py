@@ -0,0 +1,166 @@
+"""
+Caches for item reads and encoded responses.
+
+``LRUCache`` is the in-process tier: bounded by entry count and bytes,
+with an optional TTL. ``RedisCache`` is the optional shared tier, talking
+to any client with redis-py's ``get``, ``set``, ``incr`` and ``close``.
+Both report hits, misses, evictions and expirations to the observers
+registered with ``observe_cache``.
+"""
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_cache_observers = []
+
+
+def observe_cache(observer):
+    """
+    Registers ``observer(tier, event)``, called with 'hit', 'miss',
+    'eviction' or 'expiration' for every cache of the process.
+    """
+    if observer not in _cache_observers:
+        _cache_observers.append(observer)
+
+
+def _notify(tier, event):
+    for observer in _cache_observers:
+        observer(tier, event)
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache.
+
+    It holds at most ``max_entries`` values and ``max_bytes`` bytes, as
+    measured by ``len(value)`` or the ``size`` given to ``put``; larger
+    values are not cached. With ``ttl`` entries expire that many seconds
+    after they were stored. ``tier`` names the cache in observer events.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024,
+                 ttl=None, tier='local', clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.tier = tier
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the value for ``key``, or None."""
+        expired = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and (
+                    entry[2] <= self._clock()):
+                self._remove(key)
+                entry = None
+                expired = True
+            elif entry is not None:
+                self._entries.move_to_end(key)
+        if expired:
+            _notify(self.tier, 'expiration')
+        _notify(self.tier, 'miss' if entry is None else 'hit')
+        return None if entry is None else entry[0]
+
+    def put(self, key, value, size=None):
+        if size is None:
+            size = len(value)
+        if self.max_entries < 1 or size > self.max_bytes:
+            return
+        expires = None if self.ttl is None else self._clock() + self.ttl
+        evicted = 0
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, size, expires)
+            self._bytes += size
+            while (len(self._entries) > self.max_entries
+                   or self._bytes > self.max_bytes):
+                _, (_, dropped, _) = self._entries.popitem(last=False)
+                self._bytes -= dropped
+                evicted += 1
+        for _ in range(evicted):
+            _notify(self.tier, 'eviction')
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCache:
+    """
+    Shared cache tier on a Redis-protocol server.
+
+    Values are bytes stored with a ``ttl`` in seconds. Connection errors
+    are logged and treated as misses, so an unavailable server slows
+    reads down instead of failing them.
+    """
+
+    def __init__(self, client, ttl=None, tier='redis'):
+        self.client = client
+        self.ttl = ttl
+        self.tier = tier
+
+    def get(self, key):
+        try:
+            value = self.client.get(key)
+        except Exception as e:
+            logger.warning("Cache read from %s failed: %s", self.tier, e)
+            return None
+        _notify(self.tier, 'miss' if value is None else 'hit')
+        return value
+
+    def put(self, key, value):
+        try:
+            self.client.set(key, value, ex=self.ttl)
+        except Exception as e:
+            logger.warning("Cache write to %s failed: %s", self.tier, e)
+
+    def counter(self, key):
+        """Returns the integer stored at ``key`` (0 if unset), or None."""
+        try:
+            value = self.client.get(key)
+        except Exception as e:
+            logger.warning("Cache read from %s failed: %s", self.tier, e)
+            return None
+        return 0 if value is None else int(value)
+
+    def increment(self, key):
+        """Increments the counter at ``key``; returns False on failure."""
+        try:
+            self.client.incr(key)
+        except Exception as e:
+            logger.warning("Cache write to %s failed: %s", self.tier, e)
+            return False
+        return True
+
+    def close(self):
+        self.client.close()
+
+
+def connect_redis(url):
+    """Returns a redis-py client for ``url``; needs ``pip install redis``."""
+    try:
+        import redis
+    except ImportError as e:
+        raise ImportError(
+            "ITEM_CACHE=redis requires redis: pip install redis"
+        ) from e
+    return redis.Redis.from_url(
+        url, socket_timeout=0.5, socket_connect_timeout=0.5
+    )
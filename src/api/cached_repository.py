@@ -0,0 +1,210 @@
+import json
+import logging
+from .cache import LRUCache, RedisCache, connect_redis
+from .records import as_dict
+from .repository import ItemRepository
+from .serialization import EncodedItems
+
+logger = logging.getLogger(__name__)
+
+ITEM_CACHES = ('none', 'local', 'redis')
+
+# Without Redis results are never encoded, so local entries are sized at
+# an estimate of the JSON bytes per item instead.
+ESTIMATED_ITEM_BYTES = 128
+
+
+class CachedRepository(ItemRepository):
+    """
+    Two-tier read cache in front of another ItemRepository.
+
+    Results of ``all``, ``get``, ``find_by_name``, ``page`` and ``search``
+    are kept in ``local``, an LRUCache of decoded results, and in
+    ``remote``, an optional RedisCache of their JSON shared by every worker
+    and instance.
+    Entries count against ``local``'s byte limit at the size of their
+    JSON when ``remote`` needs it encoded anyway, and otherwise at
+    ESTIMATED_ITEM_BYTES per item.
+    Keys embed a version, and every write through this repository moves
+    the version on, so stale entries are never looked up again and expire
+    by TTL and LRU instead of being deleted one by one.
+
+    With ``remote`` the version is a counter on the server. Without one it
+    is the wrapped repository's own collection version when it tracks
+    one, as ItemStore does across processes, and otherwise a counter local
+    to this process: writes made by other processes then show up once
+    ``local`` entries expire.
+    """
+
+    def __init__(self, repository, local, remote=None, namespace='items'):
+        self.repository = repository
+        self.local = local
+        self.remote = remote
+        self.namespace = namespace
+        self.encoded_items = EncodedItems()
+        self._version_key = f"{namespace}:version"
+        self._local_version = 0
+
+    def _version(self):
+        """Returns the current cache version, or None to bypass caching."""
+        if self.remote is not None:
+            return self.remote.counter(self._version_key)
+        version = self.repository.version()
+        if version is not None:
+            return version.etag
+        return self._local_version
+
+    def _bump(self):
+        if self.remote is not None:
+            if not self.remote.increment(self._version_key):
+                logger.warning(
+                    "Could not invalidate %s; other workers may serve "
+                    "stale reads until their entries expire",
+                    self.namespace
+                )
+        self._local_version += 1
+        self.local.clear()
+
+    def _cached(self, operation, arguments, load):
+        version = self._version()
+        if version is None:
+            return load()
+        key = f"{self.namespace}:{version}:{operation}:{arguments}"
+        result = self.local.get(key)
+        if result is not None:
+            return result
+        if self.remote is None:
+            result = load()
+            size = _item_count(operation, result) * ESTIMATED_ITEM_BYTES
+        else:
+            encoded = self.remote.get(key)
+            if encoded is not None:
+                result = json.loads(encoded)
+            else:
+                result = load()
+                encoded = json.dumps(
+                    result, separators=(',', ':'), default=as_dict
+                ).encode()
+                self.remote.put(key, encoded)
+            size = len(encoded)
+        if operation in ('page', 'search'):
+            result = tuple(result)
+        self.local.put(key, result, size)
+        return result
+
+    def load(self):
+        self.repository.load()
+
+    def all(self):
+        return self._cached('all', '', self.repository.all)
+
+    def get(self, key):
+        # Missing items are cached as null, so look them up through a list.
+        return self._cached(
+            'get', key, lambda: [self.repository.get(key)]
+        )[0]
+
+    def find_by_name(self, name):
+        return self._cached(
+            'name', json.dumps(name),
+            lambda: self.repository.find_by_name(name)
+        )
+
+    def page(self, after=None, limit=100):
+        return self._cached(
+            'page', f"{after}:{limit}",
+            lambda: self.repository.page(after=after, limit=limit)
+        )
+
+    def search(self, query, offset=0, limit=100):
+        return self._cached(
+            'search', json.dumps([query, offset, limit]),
+            lambda: self.repository.search(query, offset, limit)
+        )
+
+    def add(self, item):
+        try:
+            return self.repository.add(item)
+        finally:
+            self._bump()
+
+    def update(self, key, item, expected=None):
+        try:
+            return self.repository.update(key, item, expected)
+        finally:
+            self._bump()
+
+    def delete(self, key, expected=None):
+        try:
+            return self.repository.delete(key, expected)
+        finally:
+            self._bump()
+
+    def bulk(self, operations):
+        try:
+            return self.repository.bulk(operations)
+        finally:
+            self._bump()
+
+    def __len__(self):
+        return len(self.repository)
+
+    def version(self):
+        return self.repository.version()
+
+    def item_version(self, key):
+        return self.repository.item_version(key)
+
+    def get_versioned(self, key):
+        # Versioned items are read from the repository that versions them.
+        if self.repository.version() is None:
+            return self.get(key), None
+        return self.repository.get_versioned(key)
+
+    def version_of(self, item):
+        return self.repository.version_of(item)
+
+    def close(self):
+        self.repository.close()
+        if self.remote is not None:
+            self.remote.close()
+
+
+def _item_count(operation, result):
+    """Returns the number of items in a result of ``operation``, at least 1."""
+    if operation in ('page', 'search'):
+        result = result[0]
+    return max(1, len(result))
+
+
+def init_item_cache(app, repository):
+    """
+    Wraps ``repository`` in the cache selected by ``ITEM_CACHE`` and
+    registers the wrapper on ``app``: 'local' for the in-process tier
+    only, 'redis' to add the shared tier on ``REDIS_URL``.
+    """
+    config = app.config
+    mode = config.get('ITEM_CACHE', 'none')
+    if mode not in ITEM_CACHES:
+        raise ValueError(f"Unknown item cache: {mode}")
+    if mode == 'none':
+        return repository
+    ttl = float(config.get('CACHE_TTL', 60))
+    local = LRUCache(
+        int(config.get('CACHE_MAX_ENTRIES', 1024)),
+        int(config.get('CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+        ttl=ttl
+    )
+    remote = None
+    if mode == 'redis':
+        remote = RedisCache(
+            connect_redis(config.get('REDIS_URL')), ttl=max(1, int(ttl))
+        )
+    cached = CachedRepository(
+        repository,
+        local,
+        remote,
+        namespace=config.get('CACHE_NAMESPACE', 'items')
+    )
+    app.extensions['item_repository'] = cached
+    return cached
@@ -0,0 +1,119 @@
+"""
+Content-Encoding negotiation for JSON responses.
+
+Bodies of at least ``COMPRESS_MIN_SIZE`` bytes are compressed with the
+best coding the client accepts: brotli when the optional ``brotli``
+package is installed, otherwise gzip. A compressed body is a different
+representation, so its strong ETag gets a ``-<coding>`` suffix. Variants
+of responses that carry an ETag are kept in an LRUCache, so a
+collection version is compressed once per coding and URL rather than
+once per request.
+"""
+import gzip
+from flask import current_app, request
+from werkzeug.datastructures import ETags
+from .cache import LRUCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Codings in order of preference when the client accepts several equally.
+CODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(data, coding, level=6):
+    """Compresses ``data``; gzip output carries no timestamp."""
+    if coding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def negotiate():
+    """Returns the coding to use for the current request, or None."""
+    accepted = request.accept_encodings
+    best = None
+    best_quality = 0
+    for coding in CODINGS:
+        quality = accepted[coding]
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def variant_etags(etag):
+    """Returns ``etag`` followed by the ETags of its compressed variants."""
+    return [etag] + [f"{etag}-{coding}" for coding in CODINGS]
+
+
+def strip_coding(etags):
+    """Maps ETags of compressed variants back to their identity ETag."""
+    stripped = []
+    for etag in etags.as_set():
+        for coding in CODINGS:
+            if etag.endswith(f"-{coding}"):
+                etag = etag[:-len(coding) - 1]
+                break
+        stripped.append(etag)
+    return ETags(stripped, star_tag=etags.star_tag)
+
+
+def _variant_cache():
+    cache = current_app.extensions.get('compressed_responses')
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            'compressed_responses',
+            LRUCache(
+                int(current_app.config.get('RESPONSE_CACHE_SIZE', 256)),
+                int(current_app.config.get(
+                    'RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024
+                )),
+                tier='compressed'
+            )
+        )
+    return cache
+
+
+def compress_response(response):
+    """
+    ``after_request`` hook compressing eligible JSON responses.
+
+    Streamed responses, other statuses and bodies below the threshold are
+    left alone; ``Vary: Accept-Encoding`` is set on every JSON response
+    since its encoding depends on that header.
+    """
+    if (response.mimetype != current_app.json.mimetype
+            or response.is_streamed
+            or response.direct_passthrough):
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.status_code != 200
+            or 'Content-Encoding' in response.headers
+            or not current_app.config.get('COMPRESS_RESPONSES', True)):
+        return response
+    body = response.get_data()
+    if len(body) < int(current_app.config.get('COMPRESS_MIN_SIZE', 1024)):
+        return response
+    coding = negotiate()
+    if coding is None:
+        return response
+
+    etag, _ = response.get_etag()
+    level = int(current_app.config.get(
+        'COMPRESS_BROTLI_QUALITY' if coding == 'br' else 'COMPRESS_LEVEL',
+        5 if coding == 'br' else 6
+    ))
+    if etag is None:
+        compressed = compress(body, coding, level)
+    else:
+        cache = _variant_cache()
+        key = (request.full_path, etag, coding)
+        compressed = cache.get(key)
+        if compressed is None:
+            compressed = compress(body, coding, level)
+            cache.put(key, compressed)
+        response.set_etag(f"{etag}-{coding}")
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = coding
+    return response
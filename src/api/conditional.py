@@ -0,0 +1,107 @@
+"""
+HTTP conditional requests for item reads and writes.
+
+Reads carry the repository's versions as a strong ``ETag`` and a
+``Last-Modified`` date, so clients revalidating with ``If-None-Match`` or
+``If-Modified-Since`` get a 304 without the items being read or encoded.
+Writes honor ``If-Match`` by handing the listed ETags to the repository,
+which compares them under its write lock.
+"""
+from datetime import datetime, timezone
+from flask import current_app, request
+from werkzeug.http import is_resource_modified
+from .cache import LRUCache
+from .compression import variant_etags, strip_coding
+
+
+def get_response_cache():
+    """Returns the current app's cache of encoded list bodies."""
+    cache = current_app.extensions.get('response_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            'response_cache',
+            LRUCache(
+                int(current_app.config.get('RESPONSE_CACHE_SIZE', 256)),
+                int(current_app.config.get(
+                    'RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024
+                )),
+                tier='responses'
+            )
+        )
+    return cache
+
+
+def _last_modified(version):
+    return datetime.fromtimestamp(version.modified, timezone.utc)
+
+
+def _matched_etag(version):
+    """
+    Returns the ETag in ``If-None-Match`` naming ``version`` in any
+    encoding, or None.
+    """
+    for etag in variant_etags(version.etag):
+        if request.if_none_match.contains_weak(etag):
+            return etag
+    return None
+
+
+def is_conditional():
+    """True if the request carries validators to compare versions with."""
+    return (
+        'If-None-Match' in request.headers
+        or 'If-Modified-Since' in request.headers
+    )
+
+
+def is_modified(version):
+    """
+    True unless the request's validators match ``version``.
+
+    ``If-None-Match`` takes precedence over ``If-Modified-Since``.
+    """
+    if 'If-None-Match' in request.headers:
+        return _matched_etag(version) is None
+    return is_resource_modified(
+        request.environ, last_modified=_last_modified(version)
+    )
+
+
+def with_validators(response, version, etag=None):
+    """
+    Adds ``version`` to ``response`` as ETag and Last-Modified.
+
+    ``Cache-Control: no-cache`` makes clients revalidate before reuse
+    instead of guessing a freshness lifetime from Last-Modified.
+    """
+    response.set_etag(etag or version.etag)
+    response.last_modified = _last_modified(version)
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified(version):
+    """
+    Returns an empty 304 response carrying ``version``, under the ETag of
+    the variant the client named.
+    """
+    response = current_app.response_class(status=304)
+    response.vary.add('Accept-Encoding')
+    return with_validators(response, version, _matched_etag(version))
+
+
+def cached_response(body):
+    """Returns a JSON response for a body taken from the response cache."""
+    return current_app.response_class(
+        body, mimetype=current_app.json.mimetype
+    )
+
+
+def expected_etags():
+    """
+    Returns the ETags a write is conditional on, as identity ETags, or
+    None without an ``If-Match`` header.
+    """
+    if 'If-Match' not in request.headers:
+        return None
+    return strip_coding(request.if_match)
@@ -0,0 +1,285 @@
+"""
+Change feed of item mutations, served as Server-Sent Events.
+
+Every successful write publishes one event to the process's Broadcaster,
+which copies it to the bounded buffer of each open ``/api/items/events``
+stream. A stream whose buffer fills up, because its client reads more
+slowly than items change, is evicted rather than slowing writers or other
+clients down; its EventSource reconnects and reads the list afresh.
+
+With ``ITEM_EVENTS_RELAY=rabbitmq`` events are also published to the
+``item_events`` fanout exchange, and every worker passes on the events
+the others published to its own streams.
+"""
+import os
+import json
+import uuid
+import logging
+import threading
+from collections import deque
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+EVENT_RELAYS = ('none', 'rabbitmq')
+EVENTS_EXCHANGE = 'item_events'
+
+# Sent to a stream when it is evicted or the worker shuts down, just
+# before it ends.
+_CLOSED = b'event: closed\ndata: {}\n\n'
+_HEARTBEAT = b': keep-alive\n\n'
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+# Callbacks receiving 'opened' and 'closed' for streams, and 'published',
+# 'received' and 'evicted'; app.metrics registers one so this module
+# stays metrics-agnostic.
+_event_observers = []
+
+
+def observe_events(observer):
+    """Registers ``observer(event)`` for stream and event counts."""
+    if observer not in _event_observers:
+        _event_observers.append(observer)
+
+
+def _notify(event):
+    for observer in _event_observers:
+        observer(event)
+
+
+def encode_event(event):
+    """Returns the Server-Sent Events frame of ``event``."""
+    data = json.dumps(event, separators=(',', ':'))
+    return f"event: {event['type']}\ndata: {data}\n\n".encode()
+
+
+class Subscription:
+    """
+    Events waiting to be sent to one stream, at most ``capacity`` of them.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.closed = False
+        self._frames = deque()
+        self._cond = threading.Condition()
+
+    def put(self, frame):
+        """Queues ``frame``; returns False if the buffer is full."""
+        with self._cond:
+            if len(self._frames) >= self.capacity:
+                return False
+            self._frames.append(frame)
+            self._cond.notify()
+            return True
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+    def get(self, timeout):
+        """
+        Returns the queued frames, waiting up to ``timeout`` seconds for
+        one; an empty list if none came, and None once closed.
+        """
+        with self._cond:
+            if not self._frames and not self.closed:
+                self._cond.wait(timeout)
+            if self.closed:
+                return None
+            frames = list(self._frames)
+            self._frames.clear()
+            return frames
+
+
+class Broadcaster:
+    """
+    Per-process fan-out of item events to Subscriptions.
+
+    ``publish`` never blocks on subscribers: a subscription whose buffer
+    is full is closed and counted in ``evictions``. At most
+    ``max_subscribers`` streams are open at once. With a ``relay``, events
+    are also handed to ``relay.publish`` and the relay calls ``receive``
+    with those of other processes; ``origin`` tells them apart.
+    """
+
+    def __init__(self, capacity=256, max_subscribers=1000, relay=None):
+        self.capacity = capacity
+        self.max_subscribers = max_subscribers
+        self.relay = relay
+        self.origin = uuid.uuid4().hex
+        self.pid = os.getpid()
+        self.published = 0
+        self.evictions = 0
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """Returns a new Subscription, or None if there are too many."""
+        with self._lock:
+            if len(self._subscriptions) >= self.max_subscribers:
+                return None
+            subscription = Subscription(self.capacity)
+            self._subscriptions.add(subscription)
+        _notify('opened')
+        if self.relay is not None:
+            self.relay.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription not in self._subscriptions:
+                return
+            self._subscriptions.remove(subscription)
+        _notify('closed')
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def publish(self, event):
+        """Sends ``event`` to this process's streams and to the relay."""
+        self.published += 1
+        _notify('published')
+        self._deliver(encode_event(event))
+        if self.relay is not None:
+            self.relay.publish(json.dumps({
+                'origin': self.origin, 'event': event
+            }, separators=(',', ':')))
+
+    def receive(self, body):
+        """Delivers an event the relay received from another process."""
+        message = json.loads(body)
+        if message['origin'] != self.origin:
+            _notify('received')
+            self._deliver(encode_event(message['event']))
+
+    def _deliver(self, frame):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if not subscription.put(frame):
+                self.unsubscribe(subscription)
+                subscription.close()
+                self.evictions += 1
+                _notify('evicted')
+                logger.warning("Evicted a slow item event stream")
+
+    def close(self):
+        """Ends every stream and stops the relay."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            self.unsubscribe(subscription)
+            subscription.close()
+        if self.relay is not None:
+            self.relay.close()
+
+
+class RabbitMQRelay:
+    """
+    Relays events between workers through the ``item_events`` fanout
+    exchange; pika is only imported when it is created.
+    """
+
+    def __init__(self, uri, receive):
+        from utils.rabbitmq_utils import (
+            RabbitMQPublisher,
+            RabbitMQSubscriber,
+            connection_parameters
+        )
+
+        parameters = connection_parameters(uri)
+        self.publisher = RabbitMQPublisher(
+            parameters,
+            exchange=EVENTS_EXCHANGE,
+            exchange_type='fanout',
+            pool_size=1
+        )
+        self.subscriber = RabbitMQSubscriber(
+            parameters, exchange=EVENTS_EXCHANGE, on_message=receive
+        )
+
+    def start(self):
+        self.subscriber.start()
+
+    def publish(self, body):
+        self.publisher.publish(body)
+
+    def close(self):
+        self.subscriber.stop()
+        self.publisher.close()
+
+
+def get_broadcaster():
+    """
+    Returns this process's Broadcaster, created from the current app's
+    config on first use and again in a forked child.
+    """
+    global _broadcaster
+    broadcaster = _broadcaster
+    if broadcaster is not None and broadcaster.pid == os.getpid():
+        return broadcaster
+    with _broadcaster_lock:
+        if _broadcaster is None or _broadcaster.pid != os.getpid():
+            _broadcaster = _create_broadcaster(current_app.config)
+        return _broadcaster
+
+
+def _create_broadcaster(config):
+    relay = config.get('ITEM_EVENTS_RELAY', 'none')
+    if relay not in EVENT_RELAYS:
+        raise ValueError(f"Unknown item event relay: {relay}")
+    broadcaster = Broadcaster(
+        capacity=int(config.get('EVENT_BUFFER_SIZE', 256)),
+        max_subscribers=int(config.get('EVENT_MAX_STREAMS', 1000))
+    )
+    if relay == 'rabbitmq':
+        broadcaster.relay = RabbitMQRelay(
+            config.get('RABBITMQ_URI'), receive=broadcaster.receive
+        )
+    return broadcaster
+
+
+def publish_event(kind, item, version=None):
+    """
+    Publishes a ``kind`` event for ``item``, a dumped item, at ``version``,
+    its ETag. Failures are logged; they never fail the write.
+    """
+    event = {
+        'type': kind,
+        'id': item['id'],
+        'version': version,
+        'item': item
+    }
+    try:
+        get_broadcaster().publish(event)
+    except Exception as e:
+        logger.error("Could not publish item event: %s", e)
+
+
+def close_event_streams():
+    """Ends this process's event streams, e.g. when it starts draining."""
+    broadcaster = _broadcaster
+    if broadcaster is not None and broadcaster.pid == os.getpid():
+        broadcaster.close()
+
+
+def stream_events(broadcaster, subscription, heartbeat=15.0):
+    """
+    Yields the Server-Sent Events of ``subscription``, batching those that
+    queued up, and a comment every ``heartbeat`` idle seconds so that
+    proxies keep the connection open and a gone client is noticed.
+    """
+    try:
+        yield b'retry: 3000\n\n'
+        while True:
+            frames = subscription.get(heartbeat)
+            if frames is None:
+                yield _CLOSED
+                return
+            yield b''.join(frames) if frames else _HEARTBEAT
+    finally:
+        broadcaster.unsubscribe(subscription)
@@ -11,3 +11,13 @@ class ItemAlreadyExistsError(Exception):
 class ItemNameTooShortError(Exception):
     """Exception for handling the case when the item name is too short."""
     pass
+
+
+class InvalidQueryError(Exception):
+    """Exception for handling invalid query string parameters."""
+    pass
+
+
+class VersionMismatchError(Exception):
+    """Exception for a write whose expected item version is not current."""
+    pass
@@ -1,14 +1,16 @@
+import os
 import json
+import time
 import logging
+import tempfile
+from contextlib import contextmanager, nullcontext
 from marshmallow import Schema, fields
-
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+from .locks import file_lock
+from .records import as_dict
 
 
 class ItemSchema(Schema):
+    id = fields.Integer(dump_only=True)
     name = fields.String(required=True)
     description = fields.String(required=False)
 
@@ -16,19 +18,105 @@ class ItemSchema(Schema):
 item_schema = ItemSchema()
 items_schema = ItemSchema(many=True)
 
+# Callbacks receiving ``(operation, seconds)`` for every timed storage
+# step; app.metrics registers one so this module stays metrics-agnostic.
+_storage_observers = []
+
+
+def observe_storage(observer):
+    """Registers ``observer(operation, seconds)`` for storage timings."""
+    if observer not in _storage_observers:
+        _storage_observers.append(observer)
+
 
-def load_data():
+@contextmanager
+def timed(operation):
+    """Reports how long the block took to the storage observers."""
+    if not _storage_observers:
+        yield
+        return
+    start = time.perf_counter()
     try:
-        with open('data.json', 'r') as data_file:
-            return json.load(data_file)
-    except Exception as e:
-        logging.error(f"Error loading data: {e}")
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        for observer in _storage_observers:
+            observer(operation, elapsed)
+
+
+def load_data(path='data.json', lock=True, workers=1):
+    """
+    Reads the valid items in ``path`` with a ``loader.ItemReader``, which
+    quarantines malformed ones; ``workers`` is passed on to it. Returns
+    an empty list if ``path`` does not exist, and raises ValueError if it
+    is empty or does not hold a JSON array.
+
+    Holds the shared advisory lock unless ``lock`` is False, for callers
+    that already hold it.
+    """
+    # The loader validates items with ItemSchema, defined here.
+    from .loader import ItemReader
+
+    try:
+        with file_lock(path, exclusive=False) if lock else nullcontext():
+            with timed('load'):
+                return list(ItemReader(path, workers=workers))
+    except FileNotFoundError:
+        logging.warning(f"Data file {path} does not exist, starting empty")
         return []
 
 
-def save_data(items):
+def save_data(items, path='data.json', lock=True):
+    """
+    Atomically replaces ``path`` with ``items``. Errors are logged and
+    raised, with ``path`` left as it was.
+
+    Holds the exclusive advisory lock unless ``lock`` is False, for
+    callers that already hold it.
+    """
     try:
-        with open('data.json', 'w') as data_file:
-            json.dump(items, data_file)
+        with timed('serialize'):
+            payload = json.dumps(items, default=as_dict).encode()
+        with file_lock(path) if lock else nullcontext(), timed('save'):
+            write_atomic(path, payload)
     except Exception as e:
         logging.error(f"Error saving data: {e}")
+        raise
+
+
+def write_atomic(path, payload):
+    """
+    Writes ``payload`` to a temporary file next to ``path`` and renames it
+    over ``path``, so readers see either the old or the new file.
+    """
+    with atomic_file(path) as tmp_file:
+        tmp_file.write(payload)
+
+
+@contextmanager
+def atomic_file(path):
+    """
+    Yields a temporary file next to ``path``, opened for binary writing,
+    that is synced and renamed over ``path`` once the block completes.
+    If it raises instead, the temporary file is removed.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory,
+        prefix=f".{os.path.basename(path)}.",
+        suffix='.tmp'
+    )
+    try:
+        try:
+            os.fchmod(fd, os.stat(path).st_mode & 0o777)
+        except FileNotFoundError:
+            os.fchmod(fd, 0o644)
+        with os.fdopen(fd, 'wb') as tmp_file:
+            yield tmp_file
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
@@ -0,0 +1,445 @@
+"""
+Incremental reader for data.json files too large to parse in one go.
+
+``json.load`` holds the whole text of a file, and then every item in it,
+before the caller sees the first one. ``ItemReader`` walks the top-level
+array instead, decoding one element at a time from a window of a chunk
+or two of the file, so ItemStore compacts and indexes items while the
+rest of the file is still being read. Every element is validated against
+ItemSchema; those that do not parse or validate are skipped and appended
+to ``<data file>.quarantine``, instead of the whole file being dropped.
+"""
+import os
+import re
+import json
+import time
+import codecs
+import hashlib
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from marshmallow import INCLUDE
+from .items import ItemSchema
+from .locks import file_lock
+from .records import FIELDS
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 20
+
+# Files this large are parsed by a process pool when it has more than one
+# worker, in ranges of about RANGE_SIZE bytes.
+PARALLEL_THRESHOLD = 64 << 20
+RANGE_SIZE = 16 << 20
+
+# Seconds between progress log lines while a file is read.
+PROGRESS_INTERVAL = 5.0
+
+_decoder = json.JSONDecoder()
+# What raw_decode wraps; it raises StopIteration where no value starts.
+_scan = _decoder.scan_once
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_SEPARATOR = re.compile(r'[ \t\n\r]*(,?)[ \t\n\r]*')
+# A string, whose group 1 is empty if the text ends inside it, or a
+# character that delimits JSON values.
+_TOKENS = re.compile(r'"(?:[^"\\]|\\.)*("?)|[\[\]{},]', re.DOTALL)
+# What separates two items, as written by save_data; a range starts at
+# the ``{`` that follows.
+_BOUNDARY = re.compile(rb'\}[ \t\n\r]*,[ \t\n\r]*(?=\{)')
+
+_FIELD_SET = frozenset(FIELDS)
+
+# ItemStore keeps fields ItemSchema does not know, and checks ids itself.
+_schema = ItemSchema(unknown=INCLUDE)
+
+
+def check_item(value):
+    """Returns why ``value`` cannot be loaded as an item, or None."""
+    if type(value) is not dict:
+        return "Item must be an object"
+    if 'id' in value and type(value['id']) is not int:
+        return "Item id must be an integer"
+    if (type(value.get('name')) is str
+            and type(value.get('description', '')) is str
+            and _FIELD_SET.issuperset(value)):
+        return None
+    errors = _schema.validate(
+        {key: field for key, field in value.items() if key != 'id'}
+    )
+    return json.dumps(errors, sort_keys=True) if errors else None
+
+
+def _value_end(text, start):
+    """
+    Returns where the JSON value starting at ``start`` ends, well-formed
+    or not, or None if ``text`` ends first.
+    """
+    depth = 0
+    for match in _TOKENS.finditer(text, start):
+        token = match.group()
+        if token[0] == '"':
+            if not match.group(1):
+                return None
+        elif token in '[{':
+            depth += 1
+        elif depth == 0:
+            return match.start()
+        elif token in ']}':
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    return None
+
+
+class _Parser:
+    """
+    Iterates over the elements of a JSON array whose ``[`` has been read,
+    from ``text`` and then the text ``chunks``, as ``(value, None)``, or
+    ``(source, error)`` for an element that does not parse.
+
+    Once exhausted, ``closed`` tells whether the closing ``]`` was read,
+    and ``between`` whether the text ended between two elements rather
+    than inside or right after one.
+    """
+
+    def __init__(self, chunks, text=''):
+        self._chunks = chunks
+        self.text = text
+        self.position = 0
+        self.closed = False
+        self.between = True
+
+    def _read(self):
+        """Appends the next chunk to the text; False at the end."""
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        self.text = self.text[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def skip_whitespace(self):
+        """Returns the next non-blank character, or None at the end."""
+        while True:
+            self.position = _WHITESPACE.match(self.text, self.position).end()
+            if self.position < len(self.text):
+                return self.text[self.position]
+            if not self._read():
+                return None
+
+    def __iter__(self):
+        expected = None
+        while True:
+            char = self.skip_whitespace()
+            if char is None:
+                self.between = expected is None
+                return
+            if char == ']':
+                self.position += 1
+                self.closed = True
+                return
+            if expected is not None and char == ',':
+                self.position += 1
+                expected = None
+                continue
+
+            start = self.position
+            try:
+                value, end = _decoder.raw_decode(self.text, start)
+            except json.JSONDecodeError as e:
+                end = _value_end(self.text, start)
+                if end is None and self._read():
+                    continue
+                error = expected or e.msg
+                if end is None:
+                    end = len(self.text)
+                    error = "The file ends inside this item"
+                elif end == start:
+                    # A stray closing brace.
+                    end += 1
+                self.position = end
+                yield self.text[start:end], error
+            else:
+                # A number may carry on in the next chunk.
+                if end == len(self.text) and self._read():
+                    continue
+                if expected is not None:
+                    self.position = end
+                    yield self.text[start:end], expected
+                else:
+                    yield value, None
+                    # Decode the items that follow a comma here, without
+                    # the checks above, until something else comes up.
+                    text = self.text
+                    while True:
+                        match = _SEPARATOR.match(text, end)
+                        start = match.end()
+                        if not match.group(1) or start == len(text):
+                            break
+                        try:
+                            value, after = _scan(text, start)
+                        except (StopIteration, json.JSONDecodeError):
+                            break
+                        if after == len(text):
+                            break
+                        end = after
+                        yield value, None
+                    if match.group(1):
+                        self.position = start
+                        expected = None
+                        continue
+                    self.position = end
+            expected = "Expected ',' before this item"
+
+
+def _array_start(data_file):
+    """Returns the offset just past the ``[`` that opens the file."""
+    head = data_file.read(4096)
+    stripped = head.lstrip(b' \t\n\r')
+    if not stripped:
+        raise ValueError(f"{data_file.name} is empty")
+    if stripped[:1] != b'[':
+        raise ValueError(f"{data_file.name} does not hold a JSON array")
+    return len(head) - len(stripped) + 1
+
+
+def _range_starts(data_file, start, size, range_size):
+    """
+    Returns the offsets parsing ranges start at: ``start``, then the first
+    item boundary found after every ``range_size`` bytes.
+    """
+    starts = [start]
+    position = start + range_size
+    while position < size:
+        data_file.seek(position)
+        window = data_file.read(1 << 16)
+        match = _BOUNDARY.search(window)
+        if match is None:
+            # Overlap the windows so a boundary across them is found.
+            position += max(len(window) - 64, 1)
+            continue
+        starts.append(position + match.end())
+        position = starts[-1] + range_size
+    return starts
+
+
+def _parse_range(path, start, end):
+    """
+    Parses and validates bytes ``start:end`` of ``path`` in a pool process.
+
+    Returns ``(items, rejects, count, parser)``: the valid items, the
+    ``(index, error, source)`` of the others, the number of elements, and
+    the exhausted parser's ``(closed, between)`` state.
+    """
+    with open(path, 'rb') as data_file:
+        data_file.seek(start)
+        text = data_file.read(end - start).decode('utf-8')
+    parser = _Parser(iter(()), text)
+    items = []
+    rejects = []
+    count = 0
+    for count, (value, error) in enumerate(parser, 1):
+        if error is None:
+            error = check_item(value)
+            if error is None:
+                items.append(value)
+                continue
+            value = json.dumps(value)
+        rejects.append((count - 1, error, value))
+    return items, rejects, count, (parser.closed, parser.between)
+
+
+def quarantine(path, rejects):
+    """
+    Appends ``(index, error, source)`` rejects to ``path`` as JSON lines,
+    skipping lines it already has, since every worker loading the same
+    data file finds the same ones.
+    """
+    lines = [
+        json.dumps({'index': index, 'error': error, 'source': source}) + '\n'
+        for index, error, source in rejects
+    ]
+    with file_lock(path):
+        try:
+            with open(path, encoding='utf-8') as quarantine_file:
+                known = set(quarantine_file)
+        except FileNotFoundError:
+            known = set()
+        with open(path, 'a', encoding='utf-8') as quarantine_file:
+            quarantine_file.writelines(
+                line for line in lines if line not in known
+            )
+
+
+class ItemReader:
+    """
+    Iterates over the valid items of the data.json file ``path``.
+
+    Elements that do not parse or validate are logged, counted in
+    ``rejected`` and appended to ``path + '.quarantine'`` as
+    ``{"index", "error", "source"}`` lines, ``index`` being their position
+    in the array. A file that ends before its closing bracket only loses
+    the item it ends in. Iterating raises ValueError if the file is empty
+    or does not hold an array, and FileNotFoundError if it is missing.
+
+    With more than one of ``workers``, a file of ``parallel_threshold``
+    bytes or more is split into ranges of about ``range_size`` bytes, each
+    starting after a ``},`` between two items, and a process pool parses
+    and validates them. A range is only used if the one before it ended
+    exactly where it starts. If a ``},`` was inside a string instead,
+    this process reads the rest of the file itself.
+
+    ``progress(items, position, size)`` is called as the file is read;
+    without it, progress is logged every PROGRESS_INTERVAL seconds.
+    """
+
+    def __init__(self, path, workers=1, progress=None,
+                 parallel_threshold=PARALLEL_THRESHOLD,
+                 range_size=RANGE_SIZE, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.workers = workers
+        self.progress = progress
+        self.parallel_threshold = parallel_threshold
+        self.range_size = range_size
+        self.chunk_size = chunk_size
+        self.count = 0
+        self.rejected = 0
+        self._rejects = []
+        self._digest = None
+        self._reported = time.monotonic()
+
+    @property
+    def digest(self):
+        """The ``wal.snapshot_digest`` of the file read."""
+        if self._digest is None:
+            with open(self.path, 'rb') as data_file:
+                self._digest = hashlib.file_digest(
+                    data_file, 'sha256'
+                ).hexdigest()
+        return self._digest
+
+    def __iter__(self):
+        with open(self.path, 'rb') as data_file:
+            size = os.fstat(data_file.fileno()).st_size
+            start = _array_start(data_file)
+            if self.workers > 1 and size >= self.parallel_threshold:
+                closed = yield from self._read_parallel(
+                    data_file, start, size
+                )
+            else:
+                data_file.seek(0)
+                closed = yield from self._read(data_file, size)
+        if not closed:
+            logger.warning("%s ends before its closing bracket", self.path)
+        if self._rejects:
+            quarantine(self.path + '.quarantine', self._rejects)
+            logger.warning(
+                "Skipped %d malformed items in %s, kept in %s.quarantine",
+                self.rejected, self.path, self.path
+            )
+            self._rejects = []
+
+    def _report(self, position, size):
+        if self.progress is not None:
+            self.progress(self.count, position, size)
+            return
+        now = time.monotonic()
+        if now - self._reported >= PROGRESS_INTERVAL:
+            self._reported = now
+            logger.info(
+                "Loading %s: %d%%, %d items",
+                self.path, 100 * position // max(size, 1), self.count
+            )
+
+    def _reject(self, index, error, source):
+        logger.debug("Item %d of %s is malformed: %s", index, self.path, error)
+        self.rejected += 1
+        self._rejects.append((index, error, source))
+
+    def _chunks(self, data_file, size, offset=0):
+        """Yields the decoded text of ``data_file``, hashing it if whole."""
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        digest = hashlib.sha256() if offset == 0 else None
+        position = offset
+        while True:
+            chunk = data_file.read(self.chunk_size)
+            if digest is not None:
+                digest.update(chunk)
+            position += len(chunk)
+            text = decoder.decode(chunk, final=not chunk)
+            if text:
+                yield text
+            if not chunk:
+                break
+            self._report(position, size)
+        if digest is not None:
+            self._digest = digest.hexdigest()
+
+    def _read(self, data_file, size, offset=0, index=0):
+        """
+        Yields the valid items from ``offset``, the start of the file or
+        of an element, and returns whether the array was closed.
+        """
+        chunks = self._chunks(data_file, size, offset)
+        parser = _Parser(chunks)
+        if offset == 0:
+            parser.skip_whitespace()
+            parser.position += 1
+        for index, (value, error) in enumerate(parser, index):
+            if error is None:
+                error = check_item(value)
+                if error is None:
+                    self.count += 1
+                    yield value
+                    continue
+                value = json.dumps(value)
+            self._reject(index, error, value)
+        # Hash whatever follows the array.
+        for _ in chunks:
+            pass
+        return parser.closed
+
+    def _read_parallel(self, data_file, start, size):
+        starts = _range_starts(data_file, start, size, self.range_size)
+        ranges = deque(zip(starts, starts[1:] + [size]))
+        context = multiprocessing.get_context('spawn')
+        index = 0
+        with ProcessPoolExecutor(self.workers, mp_context=context) as pool:
+            pending = deque()
+
+            def submit():
+                if ranges:
+                    range_start, range_end = ranges.popleft()
+                    pending.append((range_start, range_end, pool.submit(
+                        _parse_range, self.path, range_start, range_end
+                    )))
+
+            for _ in range(2 * self.workers):
+                submit()
+            while pending:
+                range_start, range_end, future = pending.popleft()
+                items, rejects, count, (closed, between) = future.result()
+                last = range_end == size
+                if not last and (closed or not between):
+                    # The next range does not start where this one ends.
+                    for _, _, later in pending:
+                        later.cancel()
+                    logger.info(
+                        "Reading %s from offset %d in one process",
+                        self.path, range_start
+                    )
+                    data_file.seek(range_start)
+                    return (yield from self._read(
+                        data_file, size, range_start, index
+                    ))
+                submit()
+                for position, error, source in rejects:
+                    self._reject(index + position, error, source)
+                self.count += len(items)
+                yield from items
+                index += count
+                self._report(range_end, size)
+                if last:
+                    return closed
+        return True
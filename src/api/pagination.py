@@ -0,0 +1,84 @@
+import json
+import base64
+from functools import lru_cache
+from .items import ItemSchema
+from .exceptions import InvalidQueryError
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _encode(payload):
+    payload = json.dumps(payload).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def _decode(cursor, key):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded))[key]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidQueryError("Invalid cursor.")
+    if not isinstance(value, int):
+        raise InvalidQueryError("Invalid cursor.")
+    return value
+
+
+def encode_cursor(item_id):
+    """Returns an opaque cursor that resumes after ``item_id``."""
+    if item_id is None:
+        return None
+    return _encode({'after': item_id})
+
+
+def decode_cursor(cursor):
+    """Returns the item id a cursor resumes after."""
+    return _decode(cursor, 'after')
+
+
+def encode_offset(offset):
+    """Returns an opaque cursor that resumes at result ``offset``."""
+    if offset is None:
+        return None
+    return _encode({'offset': offset})
+
+
+def decode_offset(cursor):
+    """Returns the result offset a cursor resumes at."""
+    offset = _decode(cursor, 'offset')
+    if offset < 0:
+        raise InvalidQueryError("Invalid cursor.")
+    return offset
+
+
+def parse_limit(value):
+    if value is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise InvalidQueryError("limit must be an integer.")
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise InvalidQueryError(
+            f"limit must be between 1 and {MAX_PAGE_SIZE}."
+        )
+    return limit
+
+
+def parse_fields(value):
+    """Returns the requested field names as a tuple, or None for all."""
+    if value is None:
+        return None
+    fields = tuple(name.strip() for name in value.split(',') if name.strip())
+    unknown = set(fields) - set(ItemSchema().fields)
+    if not fields or unknown:
+        raise InvalidQueryError(
+            f"Unknown fields: {', '.join(sorted(unknown)) or value}"
+        )
+    return fields
+
+
+@lru_cache(maxsize=64)
+def projection_schema(fields=None):
+    """Returns a cached many=True schema dumping only ``fields``."""
+    return ItemSchema(many=True, only=fields)
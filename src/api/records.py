@@ -0,0 +1,111 @@
+"""
+Compact in-memory form of stored items.
+
+A dict per item pays for a hash table on top of its values, and every
+item parsed from JSON has its own copy of strings other items repeat.
+``Item`` keeps the fields of ItemSchema in ``__slots__`` and interns its
+strings, so equal names and descriptions are stored once per process.
+Items are read-only mappings, so code written against item dicts reads
+them unchanged; ``as_dict`` turns them back into dicts where JSON is
+written.
+"""
+import gc
+from sys import intern
+from operator import attrgetter
+from contextlib import contextmanager
+from collections.abc import Mapping
+
+FIELDS = ('id', 'name', 'description')
+
+_FIELD_SET = frozenset(FIELDS)
+
+_MISSING = object()
+
+
+class Item(Mapping):
+    """
+    Read-only item record with ``id``, ``name`` and, optionally,
+    ``description``. A missing field is an unset slot, so an item without
+    a description has no ``'description'`` key, just like the dict.
+    """
+
+    __slots__ = FIELDS
+
+    def __getitem__(self, key):
+        try:
+            return _GETTERS[key](self)
+        except (KeyError, AttributeError):
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return key in _FIELD_SET and hasattr(self, key)
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            return getattr(self, key, default)
+        return default
+
+    def __iter__(self):
+        return (key for key in FIELDS if hasattr(self, key))
+
+    def __len__(self):
+        return sum(1 for key in FIELDS if hasattr(self, key))
+
+    def __repr__(self):
+        return f"Item({dict(self)!r})"
+
+
+_GETTERS = {name: attrgetter(name) for name in FIELDS}
+
+
+def compact(item):
+    """
+    Returns ``item`` as an Item, or unchanged if it is one already or has
+    fields an Item cannot hold.
+    """
+    if type(item) is Item or not _FIELD_SET.issuperset(item) or (
+            'id' not in item or 'name' not in item):
+        return item
+    return new_item(
+        item['id'], item['name'], item.get('description', _MISSING)
+    )
+
+
+def new_item(item_id, name, description=_MISSING):
+    """Returns an Item with these fields, interning its strings."""
+    record = Item()
+    record.id = item_id
+    # sys.intern only takes exact str instances.
+    record.name = intern(name) if type(name) is str else name
+    if type(description) is str:
+        record.description = intern(description)
+    elif description is not _MISSING:
+        record.description = description
+    return record
+
+
+@contextmanager
+def gc_paused():
+    """
+    Pauses the garbage collector while many Items are created.
+
+    Unlike dicts holding only strings and numbers, Items are tracked by
+    the garbage collector, which would otherwise rescan the growing heap
+    many times over while a large file is converted.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def as_dict(value):
+    """``default`` for ``json.dumps``: writes Items as JSON objects."""
+    if isinstance(value, Item):
+        return dict(value)
+    raise TypeError(
+        f"Object of type {type(value).__name__} is not JSON serializable"
+    )
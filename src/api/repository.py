@@ -0,0 +1,161 @@
+import threading
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from flask import current_app
+from .exceptions import VersionMismatchError
+from .search import SearchIndex
+
+_init_lock = threading.Lock()
+
+ITEM_BACKENDS = ('json', 'sql')
+
+# An opaque strong entity tag and the modification time, in seconds since
+# the epoch, of the collection or of one item.
+Version = namedtuple('Version', ['etag', 'modified'])
+
+
+def check_version(expected, current, key):
+    """
+    Raises VersionMismatchError unless ``expected``, a collection of
+    acceptable ETags such as werkzeug's ``ETags``, is None or contains the
+    ``current`` one. Items without a version only match a wildcard.
+    """
+    if expected is not None and current not in expected:
+        raise VersionMismatchError(key)
+
+
+class ItemRepository(ABC):
+    """
+    Storage interface the item routes are written against.
+
+    Items are plain dicts with ``id``, ``name`` and optionally
+    ``description``. Keys passed to ``get``, ``update`` and ``delete`` are
+    item ids, or list positions for repositories in position addressing
+    mode. Methods return None for missing items and raise
+    ItemAlreadyExistsError for duplicate names. ``update`` and ``delete``
+    raise VersionMismatchError when given ``expected`` ETags that do not
+    include the item's current one.
+
+    Backends that keep the same item dicts between reads may set
+    ``encoded_items`` to an EncodedItems cache, letting reads reuse each
+    item's JSON encoding.
+    """
+
+    encoded_items = None
+
+    @abstractmethod
+    def load(self):
+        """Prepares the backend, e.g. reading files or creating tables."""
+
+    @abstractmethod
+    def all(self):
+        """Returns every item, ordered by id."""
+
+    @abstractmethod
+    def get(self, key):
+        """Returns the item for ``key`` or None."""
+
+    @abstractmethod
+    def find_by_name(self, name):
+        """Returns the items named exactly ``name``."""
+
+    @abstractmethod
+    def page(self, after=None, limit=100):
+        """Returns ``(items, last_id)`` for the items after id ``after``."""
+
+    @abstractmethod
+    def add(self, item):
+        """Stores a new item and returns it with its id."""
+
+    @abstractmethod
+    def update(self, key, item, expected=None):
+        """Replaces the item for ``key`` and returns it, or None."""
+
+    @abstractmethod
+    def delete(self, key, expected=None):
+        """Removes the item for ``key`` and returns it, or None."""
+
+    @abstractmethod
+    def bulk(self, operations):
+        """Applies ``(op, key, item)`` operations in one unit of work."""
+
+    @abstractmethod
+    def __len__(self):
+        """Returns the number of items."""
+
+    def search(self, query, offset=0, limit=100):
+        """
+        Returns ``(items, next_offset)`` for the items best matching
+        ``query``, with ``next_offset`` None after the last match.
+
+        This fallback indexes every item for each query; backends that
+        can should keep an index between queries.
+        """
+        items = {item['id']: item for item in self.all()}
+        ids, more = SearchIndex(items.values()).search(query, offset, limit)
+        return [items[i] for i in ids], offset + limit if more else None
+
+    def version(self):
+        """Returns the collection's Version, or None if not tracked."""
+        return None
+
+    def item_version(self, key):
+        """Returns the Version of the item for ``key``, or None."""
+        return None
+
+    def get_versioned(self, key):
+        """
+        Returns the item for ``key``, or None, and its Version, or None if
+        not tracked, as one consistent read.
+        """
+        return self.get(key), self.item_version(key)
+
+    def version_of(self, item):
+        """
+        Returns the Version of ``item``, as returned by a write, or None if
+        not tracked.
+        """
+        return None
+
+    def close(self):
+        """Releases files, connections or other resources."""
+
+
+def init_repository(app):
+    """
+    Creates the item repository selected by ``ITEM_BACKEND`` and registers
+    it on ``app``.
+
+    ``json`` (the default) uses the file-backed ItemStore. ``sql`` uses
+    SQLItemRepository on ``DATABASE_URL``; SQLAlchemy is only imported
+    when it is selected. ``ITEM_CACHE`` wraps either in a
+    CachedRepository.
+    """
+    backend = app.config.get('ITEM_BACKEND', 'json')
+    if backend not in ITEM_BACKENDS:
+        raise ValueError(f"Unknown item backend: {backend}")
+    if backend == 'sql':
+        from .sql_repository import init_sql_repository
+        repository = init_sql_repository(app)
+    else:
+        from .store import init_store
+        repository = init_store(app)
+    if app.config.get('ITEM_CACHE', 'none') != 'none':
+        from .cached_repository import init_item_cache
+        repository = init_item_cache(app, repository)
+    return repository
+
+
+def get_repository():
+    """
+    Returns the item repository of the current app, creating and loading
+    it on first use.
+    """
+    repository = current_app.extensions.get('item_repository')
+    if repository is None:
+        with _init_lock:
+            repository = current_app.extensions.get('item_repository')
+            if repository is None:
+                repository = init_repository(current_app)
+                repository.load()
+    return repository
@@ -1,19 +1,56 @@
-from flask import Blueprint, request, jsonify
-from .items import load_data, save_data, item_schema, items_schema
+from flask import Blueprint, Response, current_app, request, jsonify
+from .items import item_schema, timed
+from .repository import get_repository
+from .bulk import (
+    BULK_STATUS,
+    BULK_ERRORS,
+    read_operations,
+    prepare_operations
+)
+from .streaming import stream_items, stream_mimetype
+from .events import get_broadcaster, publish_event, stream_events
+from .serialization import items_response, item_response, page_response
+from .conditional import (
+    get_response_cache,
+    is_conditional,
+    is_modified,
+    with_validators,
+    not_modified,
+    cached_response,
+    expected_etags
+)
+from .compression import compress_response
+from .pagination import (
+    encode_cursor,
+    decode_cursor,
+    encode_offset,
+    decode_offset,
+    parse_limit,
+    parse_fields
+)
 from marshmallow import ValidationError
+from werkzeug.http import quote_etag
 import logging
 from .exceptions import (
     ItemNotFoundError,
     ItemAlreadyExistsError,
-    ItemNameTooShortError
-)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+    ItemNameTooShortError,
+    InvalidQueryError,
+    VersionMismatchError
 )
 
 main_bp = Blueprint('main', __name__)
+main_bp.after_request(compress_response)
+
+
+@main_bp.errorhandler(ItemNotFoundError)
+def handle_item_not_found(error):
+    return jsonify({"error": "Item not found"}), 404
+
+
+@main_bp.errorhandler(InvalidQueryError)
+def handle_invalid_query(error):
+    return jsonify({"error": str(error)}), 400
 
 
 @main_bp.route('/', methods=['GET'])
@@ -23,37 +60,224 @@ def index():
 
 @main_bp.route('/api/items', methods=['GET'])
 def get_items():
-    items = load_data()
+    fields = parse_fields(request.args.get('fields'))
+
+    if request.args.get('stream') in ('1', 'true'):
+        fmt = request.args.get('format', 'json')
+        mimetype = stream_mimetype(fmt)
+        logging.info("GET /api/items - Streaming items as %s", fmt)
+        return Response(
+            stream_items(get_repository(), fields, fmt),
+            mimetype=mimetype
+        )
+
+    page = None
+    if 'limit' in request.args or 'cursor' in request.args:
+        cursor = request.args.get('cursor')
+        page = (
+            decode_cursor(cursor) if cursor else None,
+            parse_limit(request.args.get('limit'))
+        )
+
+    repository = get_repository()
+    return _collection_response(
+        repository, lambda: _list_items(repository, fields, page)
+    )
+
+
+def _collection_response(repository, build):
+    """
+    Returns the response ``build`` makes from the whole collection,
+    or 304 Not Modified, cached and validated by the collection version.
+    """
+    version = repository.version()
+    if version is None:
+        return build(), 200
+    if not is_modified(version):
+        return not_modified(version)
+
+    cache = get_response_cache()
+    key = (version.etag, request.full_path)
+    payload = cache.get(key)
+    if payload is not None:
+        return with_validators(cached_response(payload), version), 200
+    response = build()
+    if repository.version() != version:
+        # Written to while reading: the body may be newer than the tag.
+        return response, 200
+    cache.put(key, response.get_data())
+    return with_validators(response, version), 200
+
+
+def _list_items(repository, fields, page):
+    """
+    Builds the name lookup, page or full list response for ``get_items``;
+    ``page`` is an ``(after, limit)`` tuple or None.
+    """
+    name = request.args.get('name')
+    if name is not None:
+        items = repository.find_by_name(name)
+        logging.info(
+            "GET /api/items?name=%s - %d items found", name, len(items)
+        )
+        with timed('serialize'):
+            return items_response(
+                items, fields, repository.encoded_items
+            )
+
+    if page is not None:
+        after, limit = page
+        items, last_id = repository.page(after=after, limit=limit)
+        logging.info("GET /api/items - Page of %d items retrieved", len(items))
+        with timed('serialize'):
+            return page_response(
+                items,
+                encode_cursor(last_id),
+                fields,
+                repository.encoded_items
+            )
+
+    items = repository.all()
     logging.info("GET /api/items - Items retrieved successfully")
-    return jsonify(items_schema.dump(items)), 200
+    with timed('serialize'):
+        return items_response(items, fields, repository.encoded_items)
+
+
+@main_bp.route('/api/items/search', methods=['GET'])
+def search_items():
+    query = request.args.get('q', '')
+    if not query.strip():
+        raise InvalidQueryError("q must not be empty.")
+    fields = parse_fields(request.args.get('fields'))
+    cursor = request.args.get('cursor')
+    offset = decode_offset(cursor) if cursor else 0
+    limit = parse_limit(request.args.get('limit'))
+
+    repository = get_repository()
+
+    def search():
+        items, next_offset = repository.search(query, offset, limit)
+        logging.info(
+            "GET /api/items/search?q=%s - %d items found", query, len(items)
+        )
+        with timed('serialize'):
+            return page_response(
+                items,
+                encode_offset(next_offset),
+                fields,
+                repository.encoded_items
+            )
+
+    return _collection_response(repository, search)
+
+
+@main_bp.route('/api/items/events', methods=['GET'])
+def item_events():
+    broadcaster = get_broadcaster()
+    subscription = broadcaster.subscribe()
+    if subscription is None:
+        logging.warning("GET /api/items/events - Too many streams")
+        return jsonify({"error": "Too many event streams"}), 503
+    logging.info(
+        "GET /api/items/events - Stream opened, %d open", len(broadcaster)
+    )
+    response = Response(
+        stream_events(
+            broadcaster,
+            subscription,
+            float(current_app.config.get('EVENT_HEARTBEAT', 15))
+        ),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    # Tell nginx to pass events on as they come instead of buffering.
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _publish(kind, item, repository):
+    """
+    Publishes a change event for ``item``, as returned by a write, with
+    the ETag header a read of it would now carry.
+    """
+    if item is None:
+        return
+    version = None
+    if kind != 'deleted':
+        version = repository.version_of(item)
+    publish_event(
+        kind,
+        item_schema.dump(item),
+        None if version is None else quote_etag(version.etag)
+    )
+
+
+@main_bp.route('/api/items/_bulk', methods=['POST'])
+def bulk_items():
+    try:
+        raw_operations = read_operations(request)
+    except ValueError as e:
+        logging.error("POST /api/items/_bulk - Invalid body: %s", str(e))
+        return jsonify({"error": "Invalid bulk request body"}), 400
+
+    with timed('validate'):
+        operations, errors = prepare_operations(raw_operations)
+    try:
+        outcomes = get_repository().bulk(
+            [(op, key, item) for _, op, key, item in operations]
+        )
+    except Exception as e:
+        logging.error("Error applying bulk operations: %s", str(e))
+        return jsonify({"error": "Internal Server Error"}), 500
+
+    results = [None] * len(raw_operations)
+    for position, messages in errors.items():
+        results[position] = {
+            "status": BULK_STATUS['invalid'],
+            "errors": messages
+        }
+    for (position, _, _, _), (outcome, item) in zip(operations, outcomes):
+        result = {"status": BULK_STATUS[outcome]}
+        if item is not None:
+            result["item"] = item_schema.dump(item)
+        if outcome in BULK_ERRORS:
+            result["error"] = BULK_ERRORS[outcome]
+        else:
+            _publish(outcome, item, get_repository())
+        results[position] = result
+
+    logging.info(
+        "POST /api/items/_bulk - %d operations applied, %d rejected",
+        sum(1 for result in results if result["status"] < 400),
+        sum(1 for result in results if result["status"] >= 400)
+    )
+    return jsonify({"results": results}), 200
 
 
 @main_bp.route('/api/items/<int:item_id>', methods=['GET'])
 def get_item(item_id):
-    items = load_data()
-    if item_id < 0 or item_id >= len(items):
+    repository = get_repository()
+    if is_conditional():
+        version = repository.item_version(item_id)
+        if version is not None and not is_modified(version):
+            return not_modified(version)
+
+    item, version = repository.get_versioned(item_id)
+    if item is None:
         logging.warning("GET /api/items/%d - Item not found", item_id)
         raise ItemNotFoundError(f"Item with id {item_id} not found.")
-    return jsonify(item_schema.dump(items[item_id])), 200
+    with timed('serialize'):
+        response = item_response(item, repository.encoded_items)
+    if version is not None:
+        with_validators(response, version)
+    return response, 200
 
 
 @main_bp.route('/api/items', methods=['POST'])
 def add_item():
     try:
-        new_item = item_schema.load(request.json)
-        items = load_data()
-
-        for item in items:
-            if item['name'] == new_item['name']:
-                logging.warning(
-                    "POST /api/items - Item already exists: %s",
-                    new_item['name']
-                )
-                raise ItemAlreadyExistsError(
-                    new_item[
-                        'name'
-                    ]
-                )
+        with timed('validate'):
+            new_item = item_schema.load(request.json)
 
         if len(new_item['name']) < 3:
             logging.warning(
@@ -62,8 +286,9 @@ def add_item():
             )
             raise ItemNameTooShortError(new_item['name'])
 
-        items.append(new_item)
-        save_data(items)
+        repository = get_repository()
+        new_item = repository.add(new_item)
+        _publish('created', new_item, repository)
 
         logging.info("POST /api/items - Item added successfully: %s", new_item)
         return jsonify(
@@ -81,8 +306,7 @@ def add_item():
             {
                 "error": "Item name must be at least 3 characters long"
             }
-        ),
-        400
+        ), 400
     except ValidationError as err:
         logging.error("Validation error: %s", err.messages)
         return jsonify({"errors": err.messages}), 400
@@ -93,15 +317,20 @@ def add_item():
 
 @main_bp.route('/api/items/<int:item_id>', methods=['PUT'])
 def update_item(item_id):
-    items = load_data()
-    if item_id < 0 or item_id >= len(items):
+    repository = get_repository()
+    if repository.get(item_id) is None:
         logging.warning("PUT /api/items/%d - Item not found", item_id)
         raise ItemNotFoundError(f"Item with id {item_id} not found.")
 
     try:
-        updated_item = item_schema.load(request.json)
-        items[item_id] = updated_item
-        save_data(items)
+        with timed('validate'):
+            updated_item = item_schema.load(request.json)
+        updated_item = repository.update(
+            item_id, updated_item, expected_etags()
+        )
+        if updated_item is None:
+            raise ItemNotFoundError(f"Item with id {item_id} not found.")
+        _publish('updated', updated_item, repository)
 
         logging.info(
             "PUT /api/items/%d - Item updated successfully: %s",
@@ -112,8 +341,16 @@ def update_item(item_id):
             item_schema.dump(
                 updated_item
             )
-        ),
-        200
+        ), 200
+    except ItemNotFoundError:
+        logging.warning("PUT /api/items/%d - Item not found", item_id)
+        raise
+    except ItemAlreadyExistsError as e:
+        logging.error("Item already exists: %s", str(e))
+        return jsonify({"error": "Item already exists"}), 400
+    except VersionMismatchError:
+        logging.warning("PUT /api/items/%d - Item version mismatch", item_id)
+        return jsonify({"error": "Item has been modified"}), 412
     except ValidationError as err:
         logging.error(
             "Validation error: %s",
@@ -123,8 +360,7 @@ def update_item(item_id):
             {
                 "errors": err.messages
             }
-        ),
-        400
+        ), 400
     except Exception as e:
         logging.error(
             "Error saving to JSON: %s",
@@ -136,21 +372,22 @@ def update_item(item_id):
             {
                 "error": "Internal Server Error"
             }
-        ),
-        500
+        ), 500
 
 
 @main_bp.route('/api/items/<int:item_id>', methods=['DELETE'])
 def delete_item(item_id):
-    items = load_data()
+    repository = get_repository()
 
-    if item_id < 0 or item_id >= len(items):
+    if repository.get(item_id) is None:
         logging.warning("DELETE /api/items/%d - Item not found", item_id)
         raise ItemNotFoundError(f"Item with id {item_id} not found.")
 
     try:
-        deleted_item = items.pop(item_id)
-        save_data(items)
+        deleted_item = repository.delete(item_id, expected_etags())
+        if deleted_item is None:
+            raise ItemNotFoundError(f"Item with id {item_id} not found.")
+        _publish('deleted', deleted_item, repository)
 
         logging.info(
             "DELETE /api/items/%d - Item deleted successfully: %s",
@@ -160,10 +397,17 @@ def delete_item(item_id):
         return jsonify(
             {
                 "message": "Item deleted successfully",
-                "item": deleted_item
+                "item": item_schema.dump(deleted_item)
             }
-        ),
-        200
+        ), 200
+    except ItemNotFoundError:
+        logging.warning("DELETE /api/items/%d - Item not found", item_id)
+        raise
+    except VersionMismatchError:
+        logging.warning(
+            "DELETE /api/items/%d - Item version mismatch", item_id
+        )
+        return jsonify({"error": "Item has been modified"}), 412
     except Exception as e:
         logging.error(
             "Error during item deletion: %s",
@@ -175,5 +419,4 @@ def delete_item(item_id):
             {
                 "error": "Internal Server Error"
             }
-        ),
-        500
+        ), 500
@@ -0,0 +1,218 @@
+"""
+In-memory full-text search over item names and descriptions.
+
+``SearchIndex`` maps every token of the indexed fields, case and accent
+folded, to the ids of the items containing it, and keeps the tokens in a
+sorted vocabulary so that the last word of a query can be completed as a
+prefix while the user is still typing it. Items are added and removed one
+at a time as they change, so the index never needs rebuilding.
+"""
+import re
+import math
+import heapq
+import bisect
+import unicodedata
+
+# Indexed fields, with the bit recording a match in each one and the
+# weight of that match in an item's score.
+SEARCH_FIELDS = {'name': (1, 2.0), 'description': (2, 1.0)}
+
+# The last word of a query matches at most this many tokens starting
+# with it, taken in alphabetical order.
+MAX_EXPANSIONS = 64
+
+_TOKEN = re.compile(r'\w+')
+_PARTIAL = re.compile(r'\w$')
+
+# Score weight of each combination of field bits.
+_MASK_WEIGHTS = [
+    sum(weight for bit, weight in SEARCH_FIELDS.values() if mask & bit)
+    for mask in range(1 << len(SEARCH_FIELDS))
+]
+
+
+def fold(text):
+    """Returns ``text`` casefolded, with accents and other marks removed."""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(
+        char for char in decomposed if not unicodedata.combining(char)
+    ).casefold()
+
+
+def tokenize(text):
+    """Returns the folded words of ``text``."""
+    return _TOKEN.findall(fold(text))
+
+
+def _terms(item):
+    """Returns ``{token: field bits}`` for the indexed fields of ``item``."""
+    terms = {}
+    for field, (bit, _) in SEARCH_FIELDS.items():
+        value = item.get(field)
+        if isinstance(value, str):
+            for token in tokenize(value):
+                terms[token] = terms.get(token, 0) | bit
+    return terms
+
+
+def _merge(buckets, score, ids):
+    """Adds ``ids`` to the bucket of items scoring ``score``."""
+    # Rounded so that sums reached in a different order share a bucket.
+    score = round(score, 9)
+    bucket = buckets.get(score)
+    buckets[score] = ids if bucket is None else bucket | ids
+
+
+class SearchIndex:
+    """
+    Inverted index over the ``SEARCH_FIELDS`` of items keyed by ``id``.
+
+    Queries match items containing every word, and the last word also
+    matches longer tokens it is a prefix of unless the query ends with a
+    space. Results are ranked by the rarity of the matched tokens, the
+    fields they were found in and, for completions, how much of the token
+    was typed; ties are broken by id.
+
+    Postings are kept per combination of fields, so an item's score only
+    depends on which postings it is in: queries group items by score with
+    set operations instead of scoring them one at a time, and even words
+    found in every item are answered in tens of milliseconds on a million
+    items. A token found in a single item is stored as its bare id.
+
+    The index is not thread-safe: callers serialize ``add`` and ``remove``
+    with ``search``, as ItemStore does with its reader/writer lock.
+    """
+
+    def __init__(self, items=()):
+        # ``_postings[bits]`` maps tokens to the ids of the items that
+        # have them in exactly the fields ``bits`` stands for.
+        self._postings = [{} for _ in _MASK_WEIGHTS]
+        self._size = 0
+        for item in items:
+            for token, mask in _terms(item).items():
+                self._post(mask, token, item['id'])
+            self._size += 1
+        self._vocabulary = sorted(set().union(*self._postings))
+
+    def _post(self, mask, token, item_id):
+        postings = self._postings[mask]
+        ids = postings.get(token)
+        if ids is None:
+            postings[token] = item_id
+        elif isinstance(ids, set):
+            ids.add(item_id)
+        else:
+            postings[token] = {ids, item_id}
+
+    def _known(self, token):
+        return any(token in postings for postings in self._postings)
+
+    def add(self, item):
+        """Indexes ``item``, which must not be indexed already."""
+        for token, mask in _terms(item).items():
+            if not self._known(token):
+                bisect.insort(self._vocabulary, token)
+            self._post(mask, token, item['id'])
+        self._size += 1
+
+    def remove(self, item):
+        """Removes ``item``, as it was indexed, from the index."""
+        item_id = item['id']
+        for token, mask in _terms(item).items():
+            postings = self._postings[mask]
+            ids = postings.get(token)
+            if isinstance(ids, set):
+                ids.discard(item_id)
+                if len(ids) == 1:
+                    postings[token] = ids.pop()
+            elif ids == item_id:
+                del postings[token]
+                if not self._known(token):
+                    del self._vocabulary[
+                        bisect.bisect_left(self._vocabulary, token)
+                    ]
+        self._size -= 1
+
+    def _expand(self, prefix):
+        """Returns the ``(token, closeness)`` completions of ``prefix``."""
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        completions = []
+        for token in self._vocabulary[start:start + MAX_EXPANSIONS]:
+            if not token.startswith(prefix):
+                break
+            completions.append((token, len(prefix) / len(token)))
+        return completions
+
+    def _groups(self, matches):
+        """
+        Returns the ``(score, ids)`` groups of the items matching one query
+        word as ``(token, closeness)`` pairs, highest score first.
+        """
+        groups = []
+        for token, closeness in matches:
+            postings = [
+                (mask, ids if isinstance(ids, set) else {ids})
+                for mask, ids in enumerate(self._postings)
+                for ids in [ids.get(token)] if ids is not None
+            ]
+            if not postings:
+                continue
+            matched = sum(len(ids) for _, ids in postings)
+            idf = math.log(1 + self._size / matched)
+            for mask, ids in postings:
+                groups.append((idf * closeness * _MASK_WEIGHTS[mask], ids))
+        groups.sort(key=lambda group: group[0], reverse=True)
+        return groups
+
+    def search(self, query, offset=0, limit=20):
+        """
+        Returns ``(ids, more)``: the ids ranked ``offset`` to
+        ``offset + limit`` for ``query`` and whether any follow.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return [], False
+        words = dict.fromkeys(tokens)
+        terms = []
+        if _PARTIAL.search(query):
+            del words[tokens[-1]]
+            terms.append(self._groups(self._expand(tokens[-1])))
+        terms.extend(self._groups([(word, 1.0)]) for word in words)
+        # Start from the rarest word, then narrow down with the others.
+        terms.sort(key=lambda groups: sum(len(ids) for _, ids in groups))
+
+        # An item matching a word several ways scores its best match.
+        buckets = {}
+        seen = set()
+        for position, (score, ids) in enumerate(terms[0]):
+            fresh = ids - seen if seen else ids
+            if fresh:
+                _merge(buckets, score, fresh)
+                if position < len(terms[0]) - 1:
+                    seen |= fresh
+        for groups in terms[1:]:
+            narrowed = {}
+            for score, ids in buckets.items():
+                for extra, matching in groups:
+                    matched = ids & matching
+                    if matched:
+                        _merge(narrowed, score + extra, matched)
+                        if len(matched) == len(ids):
+                            break
+                        ids = ids - matched
+            buckets = narrowed
+
+        wanted = offset + limit + 1
+        ranked = []
+        for score in sorted(buckets, reverse=True):
+            ranked.extend(
+                heapq.nsmallest(wanted - len(ranked), buckets[score])
+            )
+            if len(ranked) >= wanted:
+                break
+        return ranked[offset:offset + limit], len(ranked) > offset + limit
+
+    def __len__(self):
+        return self._size
@@ -0,0 +1,191 @@
+"""
+Fast JSON encoding for items read back from the repository.
+
+Items in the repository were validated by ``ItemSchema`` when they were
+written, so reads can skip ``items_schema.dump`` and the generic encoder
+behind ``jsonify``. Instead a per-projection encoder, compiled once from
+the schema fields, writes each item directly, and encoded items are
+cached per repository. The output is byte-for-byte what
+``jsonify(schema.dump(items))`` produces with Flask's default, compact,
+sorted, ASCII-only JSON provider. Under any other provider settings,
+e.g. in debug mode, responses go through ``jsonify`` as before.
+"""
+from functools import lru_cache
+from json.encoder import encode_basestring_ascii
+from flask import current_app, jsonify
+from flask.json.provider import DefaultJSONProvider
+from marshmallow import fields as schema_fields
+from .items import ItemSchema
+from .pagination import projection_schema
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# How each supported schema field type serializes a non-null value.
+_CASTS = {
+    schema_fields.Integer: int,
+    schema_fields.String: str,
+}
+
+_ALL_FIELDS = frozenset(ItemSchema().fields)
+
+
+def _encode_value(value):
+    if value is None:
+        return b'null'
+    if isinstance(value, str):
+        return encode_basestring_ascii(value).encode('ascii')
+    return str(value).encode('ascii')
+
+
+def _safe(encoded):
+    # orjson writes non-ASCII characters and DEL unescaped, the standard
+    # encoder with ensure_ascii does not.
+    return encoded.isascii() and b'\x7f' not in encoded
+
+
+@lru_cache(maxsize=64)
+def item_encoder(fields=None):
+    """
+    Returns a function encoding one item with only ``fields`` (all by
+    default), or None if a field has a type the fast path cannot encode.
+    """
+    declared = ItemSchema().fields
+    steps = []
+    for name in set(fields or declared):
+        field = declared[name]
+        cast = _CASTS.get(type(field))
+        if cast is None:
+            return None
+        steps.append((field.data_key or name, name, cast))
+    steps.sort()
+    prefixes = [(f'"{key}":'.encode('ascii'), name, cast)
+                for key, name, cast in steps]
+
+    def encode_standard(item):
+        parts = []
+        for prefix, name, cast in prefixes:
+            if name in item:
+                value = item[name]
+                parts.append(prefix + _encode_value(
+                    None if value is None else cast(value)
+                ))
+        return b'{' + b','.join(parts) + b'}'
+
+    if orjson is None:
+        return encode_standard
+
+    def encode(item):
+        projected = {}
+        for key, name, cast in steps:
+            if name in item:
+                value = item[name]
+                projected[key] = None if value is None else cast(value)
+        try:
+            encoded = orjson.dumps(projected)
+        except TypeError:
+            return encode_standard(item)
+        return encoded if _safe(encoded) else encode_standard(item)
+
+    return encode
+
+
+class EncodedItems:
+    """
+    Cache of each item's full JSON encoding, keyed by id.
+
+    An entry is only reused while the repository still holds the very same
+    dict, so replacing an item on update invalidates it without further
+    bookkeeping; ``discard`` frees the entries of deleted items.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def encode(self, item, encoder):
+        key = item.get('id')
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is item:
+            return entry[1]
+        encoded = encoder(item)
+        self._entries[key] = (item, encoded)
+        return encoded
+
+    def discard(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def encode_items(items, fields=None, cache=None):
+    """
+    Returns the JSON array of ``items`` as bytes, or None if ``fields``
+    cannot be encoded on the fast path.
+    """
+    encoder = item_encoder(fields)
+    if encoder is None:
+        return None
+    if cache is not None and (fields is None or set(fields) == _ALL_FIELDS):
+        return b'[' + b','.join(
+            [cache.encode(item, encoder) for item in items]
+        ) + b']'
+    return b'[' + b','.join([encoder(item) for item in items]) + b']'
+
+
+def fast_path_enabled():
+    """True when the app's JSON provider emits what the fast path does."""
+    app = current_app
+    provider = app.json
+    if not app.config.get('FAST_SERIALIZATION', True):
+        return False
+    if not isinstance(provider, DefaultJSONProvider):
+        return False
+    compact = provider.compact
+    if compact is None:
+        compact = not app.debug
+    return bool(compact and provider.sort_keys and provider.ensure_ascii)
+
+
+def _response(payload):
+    return current_app.response_class(
+        payload + b'\n', mimetype=current_app.json.mimetype
+    )
+
+
+def items_response(items, fields=None, cache=None):
+    """Same response as ``jsonify(projection_schema(fields).dump(items))``."""
+    if fast_path_enabled():
+        payload = encode_items(items, fields, cache)
+        if payload is not None:
+            return _response(payload)
+    return jsonify(projection_schema(fields).dump(items))
+
+
+def item_response(item, cache=None):
+    """Same response as ``jsonify(item_schema.dump(item))``."""
+    if fast_path_enabled():
+        payload = encode_items((item,), None, cache)
+        if payload is not None:
+            return _response(payload[1:-1])
+    return jsonify(ItemSchema().dump(item))
+
+
+def page_response(items, next_cursor, fields=None, cache=None):
+    """Same response as jsonify of the ``{"items", "next"}`` envelope."""
+    if fast_path_enabled():
+        payload = encode_items(items, fields, cache)
+        if payload is not None:
+            return _response(
+                b'{"items":' + payload + b',"next":'
+                + _encode_value(next_cursor) + b'}'
+            )
+    return jsonify({
+        "items": projection_schema(fields).dump(items),
+        "next": next_cursor
+    })
@@ -0,0 +1,444 @@
+"""
+Binary item snapshots that workers map into memory instead of parsing.
+
+A snapshot is read through ``mmap``: opening one costs the same whatever
+the number of items, records are only decoded when they are read, and
+every worker mapping the file shares its pages through the OS page
+cache. The layout, all integers little-endian, is:
+
+    header    b'ITEMSNAP', u32 version, u32 reserved, u64 count, the u64
+              offsets of the four columns below, and the SHA-256 of
+              everything after the header
+    records   count x (u32 length, record), in ascending id order
+    ids       count x i64, ascending
+    offsets   count x u64, where each record starts
+    hashes    count x i64 name hashes, ascending
+    named     count x i64, the id of the item each hash belongs to
+
+A record starts with a kind byte, the item id and its name hash. Items
+with only ``id``, a string ``name`` and an optional string
+``description`` follow as length-prefixed UTF-8 strings; any other item
+follows as a JSON object.
+
+Run ``python -m api.snapshot SOURCE TARGET`` to convert a data.json file
+to a snapshot or back.
+"""
+import sys
+import json
+import heapq
+import mmap
+import bisect
+import struct
+import hashlib
+from array import array
+from .items import atomic_file, save_data
+from .records import FIELDS, new_item, as_dict
+
+MAGIC = b'ITEMSNAP'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sIIQQQQQ32s')
+_LENGTH = struct.Struct('<I')
+_RECORD = struct.Struct('<Bqq')
+_STRING = struct.Struct('<i')
+
+_ITEM = 0
+_JSON = 1
+
+_FIELD_SET = frozenset(FIELDS)
+
+
+def name_hash(name):
+    """Returns the signed 64-bit hash a snapshot indexes ``name`` under."""
+    if type(name) is str:
+        key = name.encode('utf-8', 'surrogatepass')
+    else:
+        key = b'\0' + json.dumps(name).encode()
+    return int.from_bytes(
+        hashlib.blake2b(key, digest_size=8).digest(), 'little', signed=True
+    )
+
+
+def _encode_string(value):
+    encoded = value.encode('utf-8', 'surrogatepass')
+    return _STRING.pack(len(encoded)) + encoded
+
+
+def encode_record(item):
+    """Returns the snapshot record of ``item``."""
+    item_id = item['id']
+    if type(item_id) is not int:
+        raise ValueError(f"Snapshot items need integer ids: {item_id!r}")
+    name = item['name']
+    hashed = name_hash(name)
+    described = 'description' in item
+    if _FIELD_SET.issuperset(item) and type(name) is str and (
+            not described or type(item['description']) is str):
+        return _RECORD.pack(_ITEM, item_id, hashed) + _encode_string(name) + (
+            _encode_string(item['description']) if described
+            else _STRING.pack(-1)
+        )
+    return _RECORD.pack(_JSON, item_id, hashed) + json.dumps(
+        item, separators=(',', ':'), default=as_dict
+    ).encode()
+
+
+def write_snapshot(path, records):
+    """
+    Atomically replaces ``path`` with a snapshot of ``records`` and
+    returns its digest.
+
+    ``records`` are items, or records already encoded by
+    ``encode_record`` or read with ``Snapshot.record``, in ascending id
+    order.
+    """
+    ids = array('q')
+    offsets = array('Q')
+    hashes = array('q')
+    digest = hashlib.sha256()
+    with atomic_file(path) as snapshot_file:
+        def write(chunk):
+            snapshot_file.write(chunk)
+            digest.update(chunk)
+
+        snapshot_file.write(bytes(_HEADER.size))
+        position = _HEADER.size
+        for record in records:
+            if not isinstance(record, bytes):
+                record = encode_record(record)
+            _, item_id, hashed = _RECORD.unpack_from(record)
+            if ids and item_id <= ids[-1]:
+                raise ValueError("Snapshot records must be in id order")
+            ids.append(item_id)
+            offsets.append(position)
+            hashes.append(hashed)
+            write(_LENGTH.pack(len(record)) + record)
+            position += _LENGTH.size + len(record)
+        write(bytes(-position % 8))
+        position += -position % 8
+
+        named = sorted(zip(hashes, ids))
+        columns = (
+            ids,
+            offsets,
+            array('q', [hashed for hashed, _ in named]),
+            array('q', [item_id for _, item_id in named]),
+        )
+        starts = []
+        for column in columns:
+            starts.append(position)
+            write(column.tobytes())
+            position += len(column) * column.itemsize
+
+        snapshot_file.seek(0)
+        snapshot_file.write(_HEADER.pack(
+            MAGIC, VERSION, 0, len(ids), *starts, digest.digest()
+        ))
+    return digest.hexdigest()
+
+
+class Snapshot:
+    """
+    Read-only view of a snapshot file.
+
+    Items are looked up by id and by name through binary searches over
+    the mapped columns and decoded on every access, so holding a
+    Snapshot open costs no memory per item. ``close`` unmaps the file.
+    """
+
+    def __init__(self, snapshot_file):
+        self._file = snapshot_file
+        self._map = mmap.mmap(
+            snapshot_file.fileno(), 0, access=mmap.ACCESS_READ
+        )
+        try:
+            (magic, version, _, count, ids_at, offsets_at, hashes_at,
+             named_at, digest) = _HEADER.unpack_from(self._map)
+        except struct.error:
+            self._map.close()
+            raise ValueError(f"{snapshot_file.name} is truncated")
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(
+                f"{snapshot_file.name} is not a version {VERSION} snapshot"
+            )
+        self.digest = digest.hex()
+        view = memoryview(self._map)
+        self._views = [view] + [
+            view[start:start + 8 * count].cast(code)
+            for start, code in ((ids_at, 'q'), (offsets_at, 'Q'),
+                                (hashes_at, 'q'), (named_at, 'q'))
+        ]
+        _, self.ids, self._offsets, self._hashes, self._named = self._views
+
+    @classmethod
+    def open(cls, path, verify=False):
+        """
+        Returns the Snapshot in ``path``, or None if ``path`` holds
+        something else, such as JSON. Raises FileNotFoundError if there is
+        no file and ValueError if it is a damaged snapshot; with
+        ``verify``, damage is also looked for with ``verify``.
+        """
+        snapshot_file = open(path, 'rb')
+        try:
+            if snapshot_file.read(len(MAGIC)) != MAGIC:
+                snapshot_file.close()
+                return None
+            snapshot = cls(snapshot_file)
+        except BaseException:
+            snapshot_file.close()
+            raise
+        if verify:
+            try:
+                snapshot.verify()
+            except BaseException:
+                snapshot.close()
+                raise
+        return snapshot
+
+    def verify(self):
+        """
+        Raises ValueError unless the file matches the digest in its
+        header. This reads the whole file, so it costs time in proportion
+        to its size.
+        """
+        body = self._views[0][_HEADER.size:]
+        try:
+            if hashlib.sha256(body).hexdigest() != self.digest:
+                raise ValueError(
+                    f"{self._file.name} is damaged: its digest does not "
+                    "match its contents"
+                )
+        finally:
+            body.release()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def position(self, item_id):
+        """Returns the position of the item ``item_id``, or None."""
+        position = bisect.bisect_left(self.ids, item_id)
+        if position < len(self.ids) and self.ids[position] == item_id:
+            return position
+        return None
+
+    def record(self, position):
+        """Returns the encoded record at ``position``."""
+        offset = self._offsets[position]
+        (length,) = _LENGTH.unpack_from(self._map, offset)
+        start = offset + _LENGTH.size
+        return self._map[start:start + length]
+
+    def item(self, position):
+        """Decodes the item at ``position``."""
+        offset = self._offsets[position]
+        (length,) = _LENGTH.unpack_from(self._map, offset)
+        offset += _LENGTH.size
+        kind, item_id, _ = _RECORD.unpack_from(self._map, offset)
+        if kind == _JSON:
+            return json.loads(
+                self._map[offset + _RECORD.size:offset + length]
+            )
+        offset += _RECORD.size
+        name, offset = self._string(offset)
+        description, _ = self._string(offset)
+        if description is None:
+            return new_item(item_id, name)
+        return new_item(item_id, name, description)
+
+    def _string(self, offset):
+        (length,) = _STRING.unpack_from(self._map, offset)
+        offset += _STRING.size
+        if length < 0:
+            return None, offset
+        value = str(
+            self._map[offset:offset + length], 'utf-8', 'surrogatepass'
+        )
+        return value, offset + length
+
+    def ids_named(self, name):
+        """Returns the ids of the items named ``name``, ascending."""
+        hashed = name_hash(name)
+        position = bisect.bisect_left(self._hashes, hashed)
+        ids = []
+        while (position < len(self._hashes)
+               and self._hashes[position] == hashed):
+            item_id = self._named[position]
+            if self.item(self.position(item_id))['name'] == name:
+                ids.append(item_id)
+            position += 1
+        return ids
+
+    def id_array(self):
+        """Returns a copy of the id column that can be modified."""
+        ids = array('q')
+        ids.frombytes(self.ids.cast('B'))
+        return ids
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._map.close()
+        self._file.close()
+
+
+# Marks deleted items and names in SnapshotItems and SnapshotNames.
+_DELETED = object()
+
+
+class SnapshotItems:
+    """
+    Mapping of ids to items that reads a Snapshot and keeps the items
+    added, replaced or deleted since in memory, for ItemStore.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._changed = {}
+        self._size = len(snapshot)
+
+    def get(self, item_id, default=None):
+        if item_id in self._changed:
+            item = self._changed[item_id]
+            return default if item is _DELETED else item
+        position = self.snapshot.position(item_id)
+        return default if position is None else self.snapshot.item(position)
+
+    def __getitem__(self, item_id):
+        item = self.get(item_id)
+        if item is None:
+            raise KeyError(item_id)
+        return item
+
+    def __contains__(self, item_id):
+        if item_id in self._changed:
+            return self._changed[item_id] is not _DELETED
+        return self.snapshot.position(item_id) is not None
+
+    def __setitem__(self, item_id, item):
+        if item_id not in self:
+            self._size += 1
+        self._changed[item_id] = item
+
+    def pop(self, item_id):
+        item = self[item_id]
+        self._changed[item_id] = _DELETED
+        self._size -= 1
+        return item
+
+    def __len__(self):
+        return self._size
+
+    def _merged(self):
+        """Yields ``(id, position)`` in id order, position None if new."""
+        changed = self._changed
+        kept = (
+            (item_id, position)
+            for position, item_id in enumerate(self.snapshot.ids)
+            if changed.get(item_id) is not _DELETED
+        )
+        added = sorted(
+            (item_id, None) for item_id, item in changed.items()
+            if item is not _DELETED
+            and self.snapshot.position(item_id) is None
+        )
+        return heapq.merge(kept, added)
+
+    def __iter__(self):
+        return (item_id for item_id, _ in self._merged())
+
+    def values(self):
+        """Yields every item in id order, decoding them one by one."""
+        for item_id, position in self._merged():
+            if item_id in self._changed:
+                yield self._changed[item_id]
+            else:
+                yield self.snapshot.item(position)
+
+    def records(self):
+        """
+        Yields every item in id order for ``write_snapshot``: unchanged
+        ones as their encoded records, so they are copied, not decoded.
+        """
+        for item_id, position in self._merged():
+            if item_id in self._changed:
+                yield self._changed[item_id]
+            else:
+                yield self.snapshot.record(position)
+
+
+class SnapshotNames:
+    """
+    Name index for SnapshotItems, with ItemStore's convention that a name
+    maps to an id, or a list of ids when repeated. Lookups search the
+    snapshot; only names whose items changed are held in memory.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._changed = {}
+
+    def get(self, name, default=None):
+        if name in self._changed:
+            ids = self._changed[name]
+            return default if ids is _DELETED else ids
+        ids = self.snapshot.ids_named(name)
+        if not ids:
+            return default
+        if len(ids) == 1:
+            return ids[0]
+        # Keep the list, which the caller may change in place.
+        self._changed[name] = ids
+        return ids
+
+    def __getitem__(self, name):
+        ids = self.get(name)
+        if ids is None:
+            raise KeyError(name)
+        return ids
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __setitem__(self, name, ids):
+        self._changed[name] = ids
+
+    def __delitem__(self, name):
+        self._changed[name] = _DELETED
+
+
+def convert(source, target):
+    """
+    Writes the items of ``source``, a data.json file or a snapshot, to
+    ``target`` in the other format, numbering items without ids as
+    ItemStore does. Returns the number of items written.
+    """
+    from .store import ItemStore
+
+    # Loading the store checks a snapshot's digest before it is read.
+    store = ItemStore(source)
+    store.load()
+    try:
+        snapshot = Snapshot.open(source)
+        if snapshot is None:
+            write_snapshot(target, store.all())
+        else:
+            snapshot.close()
+            save_data(store.all(), target)
+        return len(store)
+    finally:
+        store.close()
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) != 2:
+        print("usage: python -m api.snapshot SOURCE TARGET", file=sys.stderr)
+        return 2
+    count = convert(*args)
+    print(f"Wrote {count} items to {args[1]}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+import logging
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from models import db, Item
+from .repository import ItemRepository, check_version
+from .exceptions import ItemAlreadyExistsError
+
+logger = logging.getLogger(__name__)
+
+
+def build_engine(url=None, pool_size=5, max_overflow=10, pool_recycle=1800,
+                 pool_timeout=30):
+    """
+    Creates a pooled SQLAlchemy engine.
+
+    Without ``url`` the PostgreSQL connection is built from
+    ``parse_database_url()``. Pooled connections are pinged before use and
+    recycled after ``pool_recycle`` seconds, so connections dropped by the
+    server or a proxy are replaced instead of failing a request. In-memory
+    SQLite shares one connection across threads.
+    """
+    if url is None:
+        from utils.database_utils import parse_database_url
+        info = parse_database_url()
+        url = URL.create(
+            'postgresql+psycopg2',
+            username=info['user'],
+            password=info['password'],
+            host=info['host'],
+            port=info['port'],
+            database=info['dbname']
+        )
+    url = make_url(url)
+
+    if url.get_backend_name() == 'sqlite':
+        connect_args = {'check_same_thread': False}
+        if url.database in (None, '', ':memory:'):
+            return create_engine(
+                url, poolclass=StaticPool, connect_args=connect_args
+            )
+        return create_engine(
+            url,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_pre_ping=True,
+            connect_args=connect_args
+        )
+    return create_engine(
+        url,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_recycle=pool_recycle,
+        pool_timeout=pool_timeout,
+        pool_pre_ping=True
+    )
+
+
+def to_dict(row):
+    item = {'id': row.id, 'name': row.name}
+    if row.description is not None:
+        item['description'] = row.description
+    return item
+
+
+class SQLItemRepository(ItemRepository):
+    """
+    Item repository stored in the ``item`` table of the ``Item`` model.
+
+    Each call runs in its own transaction. Name lookups and duplicate
+    checks use the unique index on ``name``; a duplicate that slips past
+    the check because of a concurrent insert is still rejected by the
+    index.
+
+    Rows carry no version, so ``version`` and ``item_version`` return None
+    and writes given ``expected`` ETags only proceed on a wildcard.
+    """
+
+    def __init__(self, engine, addressing='id'):
+        self.engine = engine
+        self.addressing = addressing
+
+    def load(self):
+        db.metadata.create_all(self.engine, tables=[Item.__table__])
+
+    def _resolve(self, session, key):
+        if self.addressing == 'position':
+            if key < 0:
+                return None
+            return session.scalar(
+                select(Item.id).order_by(Item.id).offset(key).limit(1)
+            )
+        return key
+
+    def _check_unique(self, session, name, item_id=None):
+        query = select(Item.id).where(Item.name == name).limit(1)
+        existing = session.scalar(query)
+        if existing is not None and existing != item_id:
+            raise ItemAlreadyExistsError(name)
+
+    def _apply(self, session, op, key, item=None, expected=None):
+        """Runs one mutation and returns an ``(outcome, item)`` pair."""
+        if op == 'create':
+            self._check_unique(session, item['name'])
+            row = Item(name=item['name'], description=item.get('description'))
+            session.add(row)
+            session.flush()
+            return 'created', to_dict(row)
+
+        item_id = self._resolve(session, key)
+        row = None if item_id is None else session.get(Item, item_id)
+        if row is None:
+            return 'not_found', None
+        check_version(expected, None, key)
+        if op == 'delete':
+            deleted = to_dict(row)
+            session.delete(row)
+            session.flush()
+            return 'deleted', deleted
+
+        self._check_unique(session, item['name'], row.id)
+        row.name = item['name']
+        row.description = item.get('description')
+        session.flush()
+        return 'updated', to_dict(row)
+
+    def _mutate(self, op, key, item=None, expected=None):
+        try:
+            with Session(self.engine) as session, session.begin():
+                return self._apply(session, op, key, item, expected)[1]
+        except IntegrityError:
+            # Only names are unique; a delete has no name to blame.
+            if item is None:
+                raise
+            raise ItemAlreadyExistsError(item['name'])
+
+    def all(self):
+        with Session(self.engine) as session:
+            rows = session.scalars(select(Item).order_by(Item.id))
+            return [to_dict(row) for row in rows]
+
+    def get(self, key):
+        with Session(self.engine) as session:
+            item_id = self._resolve(session, key)
+            row = None if item_id is None else session.get(Item, item_id)
+            return None if row is None else to_dict(row)
+
+    def find_by_name(self, name):
+        with Session(self.engine) as session:
+            rows = session.scalars(select(Item).where(Item.name == name))
+            return [to_dict(row) for row in rows]
+
+    def page(self, after=None, limit=100):
+        query = select(Item).order_by(Item.id).limit(limit + 1)
+        if after is not None:
+            query = query.where(Item.id > after)
+        with Session(self.engine) as session:
+            items = [to_dict(row) for row in session.scalars(query)]
+        if len(items) <= limit:
+            return items, None
+        return items[:limit], items[limit - 1]['id']
+
+    def add(self, item):
+        return self._mutate('create', None, item)
+
+    def update(self, key, item, expected=None):
+        return self._mutate('update', key, item, expected)
+
+    def delete(self, key, expected=None):
+        return self._mutate('delete', key, expected=expected)
+
+    def bulk(self, operations):
+        """
+        Applies ``(op, key, item)`` operations in a single transaction.
+
+        Each operation runs in a savepoint, so a rejected one does not
+        abort the others.
+        """
+        results = []
+        with Session(self.engine) as session, session.begin():
+            for op, key, item in operations:
+                try:
+                    with session.begin_nested():
+                        results.append(self._apply(session, op, key, item))
+                except ItemAlreadyExistsError:
+                    results.append(('exists', None))
+                except IntegrityError:
+                    if item is None:
+                        raise
+                    results.append(('exists', None))
+        return results
+
+    def __len__(self):
+        with Session(self.engine) as session:
+            return session.scalar(select(func.count(Item.id)))
+
+    def close(self):
+        self.engine.dispose()
+
+
+def init_sql_repository(app):
+    """Creates the SQL repository for ``app`` from its configuration."""
+    config = app.config
+    url = config.get('DATABASE_URL')
+    engine = build_engine(
+        url if url and url.startswith('sqlite') else None,
+        pool_size=int(config.get('DB_POOL_SIZE', 5)),
+        max_overflow=int(config.get('DB_MAX_OVERFLOW', 10)),
+        pool_recycle=int(config.get('DB_POOL_RECYCLE', 1800)),
+        pool_timeout=int(config.get('DB_POOL_TIMEOUT', 30))
+    )
+    repository = SQLItemRepository(
+        engine, addressing=config.get('ITEM_ADDRESSING', 'id')
+    )
+    app.extensions['item_repository'] = repository
+    logger.info("Using SQL item repository on %s", engine.url)
+    return repository
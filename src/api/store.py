@@ -0,0 +1,771 @@
+import os
+import json
+import time
+import bisect
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from .items import save_data, write_atomic, timed
+from .exceptions import ItemAlreadyExistsError
+from .wal import WriteAheadLog, snapshot_digest
+from .locks import ReadWriteLock, FileLock
+from .repository import ItemRepository, Version, check_version
+from .serialization import EncodedItems
+from .search import SearchIndex
+from .records import compact, gc_paused, as_dict
+from .loader import ItemReader
+from .snapshot import Snapshot, SnapshotItems, SnapshotNames, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+_NOT_LOADED = object()
+
+PERSISTENCE_MODES = ('snapshot', 'wal')
+ADDRESSING_MODES = ('id', 'position')
+SNAPSHOT_FORMATS = ('json', 'binary')
+
+
+class ItemStore(ItemRepository):
+    """
+    Process-resident item collection backed by a JSON file.
+
+    The file is parsed once and reads are served from memory. Every
+    mutation is written through to disk, and the file is reloaded when
+    another process replaces or modifies it. A name index, rebuilt on
+    load and maintained on every mutation, makes uniqueness checks and
+    lookups by name O(1). A full-text SearchIndex is built on the first
+    search and maintained the same way from then on. Items are held as
+    compact ``records.Item`` mappings rather than dicts, at a fraction of
+    the memory per item.
+
+    Items are keyed by a persistent, monotonically increasing ``id``, so
+    lookups, updates and deletes are O(1) and never renumber other items.
+    Records without an ``id`` are numbered in file order when loaded. With
+    ``addressing='position'`` the keys passed to ``get``, ``update`` and
+    ``delete`` are list positions instead, for older clients.
+
+    JSON data files are read incrementally by a ``loader.ItemReader``,
+    across ``load_workers`` processes when they are large, and items are
+    compacted and indexed as they are read. Malformed items are skipped
+    and quarantined.
+
+    In ``snapshot`` mode each mutation rewrites ``data.json``. In ``wal``
+    mode it is appended to ``data.json.wal`` instead, and the log is folded
+    back into a fresh snapshot in the background once it holds
+    ``compact_threshold`` records.
+
+    The data file is either JSON or a binary ``snapshot.Snapshot``, told
+    apart when it is loaded. A binary snapshot is mapped into memory
+    rather than parsed: items are decoded when read, and only those
+    changed since the snapshot was written are held in memory. With
+    ``snapshot_format='binary'`` the store writes binary snapshots too.
+
+    Within a process, reads share a reader/writer lock and writes hold it
+    exclusively. Across processes, writes and reloads hold an advisory
+    ``fcntl`` lock on ``data.json.lock`` and refresh from disk first, so
+    several workers can share one data file without losing updates.
+
+    Every mutation bumps a collection version counter. The counter
+    restarts under a generation derived from the signature of the data
+    file whenever that file is loaded or replaced, by this process or
+    another one, and log records only move it on. So workers that read
+    the same data file, and applied the same log records since, report
+    the same collection ETag however they got there, and a new data file
+    never reuses one. Item ETags are digests of the item's fields: every
+    worker agrees on them, and they only change with the item.
+    """
+
+    def __init__(self, path='data.json', persistence='snapshot',
+                 wal_sync_every=64, wal_sync_interval=0.05,
+                 compact_threshold=10000, addressing='id',
+                 snapshot_format='json', load_workers=1):
+        if persistence not in PERSISTENCE_MODES:
+            raise ValueError(f"Unknown persistence mode: {persistence}")
+        if addressing not in ADDRESSING_MODES:
+            raise ValueError(f"Unknown addressing mode: {addressing}")
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            raise ValueError(f"Unknown snapshot format: {snapshot_format}")
+        self.path = path
+        self.persistence = persistence
+        self.compact_threshold = compact_threshold
+        self.addressing = addressing
+        self.snapshot_format = snapshot_format
+        self.load_workers = load_workers
+        self._items = {}
+        self._ids = []
+        self._by_name = {}
+        self._next_id = 1
+        self._generation = None
+        self._version = 0
+        self._modified = None
+        self._loaded_at = None
+        self._item_modified = {}
+        self._item_tags = {}
+        self.encoded_items = EncodedItems()
+        self._search_index = None
+        self._snapshot = None
+        self._signature = _NOT_LOADED
+        self._lock = ReadWriteLock()
+        self._file_lock = FileLock(path + '.lock')
+        self._wal = None
+        self._wal_offset = 0
+        self._compactor = None
+        if persistence == 'wal':
+            self._wal = WriteAheadLog(
+                path + '.wal',
+                sync_every=wal_sync_every,
+                sync_interval=wal_sync_interval
+            )
+
+    @staticmethod
+    def _stat_file(path):
+        """Returns an (inode, mtime, size) tuple for ``path``."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _stat(self):
+        if self._wal is None:
+            return self._stat_file(self.path)
+        return (self._stat_file(self.path), self._stat_file(self._wal.path))
+
+    def _mtime(self, signature):
+        """Returns the newest modification time in a ``_stat`` result."""
+        stats = (signature,) if self._wal is None else signature
+        times = [stat[1] for stat in stats if stat is not None]
+        return max(times) / 1e9 if times else time.time()
+
+    def load(self):
+        """
+        Reads the data file, and any pending log, into memory.
+
+        Raises ValueError if the data file is empty, does not hold a JSON
+        array or is a damaged snapshot. Reads and writes then raise it
+        too until the file is repaired, so the store never replaces it.
+        """
+        with self._lock.write(), self._file_lock.hold():
+            self._load()
+
+    def _load(self):
+        signature = self._stat()
+        if self._wal is None:
+            snapshot = self._open_snapshot()
+            if snapshot is not None:
+                self._reset(snapshot)
+            else:
+                self._load_json()
+        elif self._load_with_wal():
+            signature = self._stat()
+        self._signature = signature
+        self._generation = self._generation_of(signature)
+        self._loaded_at = self._modified = self._mtime(signature)
+        logger.info("Loaded %d items from %s", len(self._items), self.path)
+
+    def _generation_of(self, signature):
+        """
+        Returns the generation of versions for the files in ``signature``,
+        which depends on the data file only: in ``wal`` mode the log
+        grows, and its records are counted in the versions instead.
+        """
+        data_signature = signature if self._wal is None else signature[0]
+        return hashlib.blake2b(
+            repr((self.path, data_signature)).encode(), digest_size=8
+        ).hexdigest()
+
+    def _rebase(self):
+        """
+        Restarts the versions after this process replaced the data file,
+        as they restart in every other process that loads it.
+        """
+        signature = self._stat()
+        self._signature = signature
+        self._generation = self._generation_of(signature)
+        self._version = 0
+        self._item_modified = {}
+        self._loaded_at = self._modified = self._mtime(signature)
+
+    @contextmanager
+    def _reading(self):
+        """Holds the read lock after reloading any change made on disk."""
+        if self._stat() != self._signature:
+            exclusive = self._wal is not None
+            with self._lock.write(), self._file_lock.hold(exclusive):
+                self._refresh()
+        with self._lock.read():
+            yield
+
+    @contextmanager
+    def _writing(self):
+        """Holds both write locks, with the store refreshed from disk."""
+        with self._lock.write(), self._file_lock.hold():
+            self._refresh()
+            yield
+
+    def _open_snapshot(self):
+        """
+        Returns the data file as a Snapshot, or None if it is not one.
+
+        The first load checks the snapshot against its digest. Later ones
+        reload snapshots that a worker wrote whole and renamed into place,
+        and skip the check to stay independent of the file's size.
+        """
+        try:
+            with timed('load'):
+                return Snapshot.open(
+                    self.path, verify=self._signature is _NOT_LOADED
+                )
+        except FileNotFoundError:
+            return None
+
+    def _load_json(self):
+        """
+        Streams the JSON data file into the store and returns the digest of
+        the file, or None if there is none.
+        """
+        reader = ItemReader(self.path, workers=self.load_workers)
+        try:
+            with timed('load'):
+                self._reset(reader)
+        except FileNotFoundError:
+            logger.warning(
+                "Data file %s does not exist, starting empty", self.path
+            )
+            self._reset([])
+            return None
+        return reader.digest
+
+    def _load_with_wal(self):
+        """Loads the snapshot and replays the log; True if it was reset."""
+        snapshot = self._open_snapshot()
+        if snapshot is not None:
+            self._reset(snapshot)
+            digest = snapshot.digest
+        else:
+            digest = self._load_json()
+
+        header, records, offset = self._wal.read()
+        if header is None or header.get('snapshot') != digest:
+            if header is not None:
+                logger.warning(
+                    "Discarding write-ahead log %s: it does not match %s",
+                    self._wal.path,
+                    self.path
+                )
+            self._wal_offset = self._wal.reset(digest)
+            return True
+        modified = self._mtime(self._stat())
+        for record in records:
+            self._apply(record, modified)
+        self._wal.records = len(records)
+        self._wal_offset = offset
+        return False
+
+    def _refresh(self):
+        signature = self._stat()
+        if signature == self._signature:
+            return
+        if (self._wal is not None
+                and self._signature is not _NOT_LOADED
+                and self._log_appended(signature)):
+            _, records, offset = self._wal.read(self._wal_offset)
+            modified = self._mtime(signature)
+            for record in records:
+                self._apply(record, modified)
+            self._wal.records += len(records)
+            self._wal_offset = offset
+            self._signature = signature
+            return
+        self._load()
+
+    def _log_appended(self, signature):
+        """True if only the log changed, by growing in place."""
+        old_data, old_log = self._signature
+        new_data, new_log = signature
+        return (
+            old_data == new_data
+            and old_log is not None
+            and new_log is not None
+            and old_log[0] == new_log[0]
+            and new_log[2] >= old_log[2]
+        )
+
+    def _reset(self, items):
+        """
+        Replaces every item with ``items``, a Snapshot or an iterable of
+        dicts that is compacted and indexed as it is consumed.
+        """
+        self._version = 0
+        self._item_modified = {}
+        self._item_tags = {}
+        self._search_index = None
+        if isinstance(items, Snapshot):
+            self._map(items)
+            self._ids = items.id_array()
+            self._next_id = self._ids[-1] + 1 if self._ids else 1
+            return
+        self._unmap()
+        self._items = {}
+        self._by_name = {}
+        self.encoded_items = EncodedItems()
+
+        # Items without an id are numbered after the highest id in the
+        # file, so they wait until it is known.
+        unnumbered = []
+        last_id = 0
+        ordered = True
+        with gc_paused():
+            for item in items:
+                if 'id' not in item:
+                    unnumbered.append(item)
+                    continue
+                item_id = item['id']
+                item = compact(item)
+                if item_id > last_id:
+                    last_id = item_id
+                else:
+                    ordered = False
+                    old = self._items.get(item_id)
+                    if old is not None:
+                        self._unindex(old)
+                self._items[item_id] = item
+                self._index(item)
+            next_id = last_id + 1
+            for item in unnumbered:
+                item = compact(dict(item, id=next_id))
+                self._items[next_id] = item
+                self._index(item)
+                next_id += 1
+        if not ordered:
+            self._items = dict(sorted(self._items.items()))
+            for ids in self._by_name.values():
+                if type(ids) is list:
+                    ids.sort()
+        self._ids = list(self._items)
+        self._next_id = next_id
+
+    def _map(self, snapshot):
+        """Serves the items of ``snapshot``, closing any previous one."""
+        self._unmap()
+        self._snapshot = snapshot
+        self._items = SnapshotItems(snapshot)
+        self._by_name = SnapshotNames(snapshot)
+        # Mapped items are decoded anew on every read, so there are no
+        # item objects for EncodedItems to remember encodings of.
+        self.encoded_items = None
+
+    def _unmap(self):
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
+
+    def _index(self, item):
+        # Names are unique unless an older file repeats them, so a name
+        # maps to a bare id, and to a list of ids only when repeated.
+        name = item['name']
+        ids = self._by_name.get(name)
+        if ids is None:
+            self._by_name[name] = item['id']
+        elif type(ids) is list:
+            ids.append(item['id'])
+        else:
+            self._by_name[name] = [ids, item['id']]
+
+    def _unindex(self, item):
+        name = item['name']
+        ids = self._by_name[name]
+        if type(ids) is not list:
+            del self._by_name[name]
+            return
+        ids.remove(item['id'])
+        if len(ids) == 1:
+            self._by_name[name] = ids[0]
+
+    def _resolve(self, key):
+        """Maps a client key to an item id, or None if there is no item."""
+        if self.addressing == 'position':
+            if 0 <= key < len(self._ids):
+                return self._ids[key]
+            return None
+        return key if key in self._items else None
+
+    def _check_unique(self, name):
+        if name in self._by_name:
+            raise ItemAlreadyExistsError(name)
+
+    def _apply(self, record, modified=None):
+        """
+        Applies one mutation to the items, the indexes and the versions.
+        """
+        if modified is None:
+            modified = time.time()
+        version = self._version + 1
+        op = record['op']
+        if op == 'add':
+            item = compact(record['item'])
+            self._items[item['id']] = item
+            if self._ids and item['id'] < self._ids[-1]:
+                bisect.insort(self._ids, item['id'])
+            else:
+                self._ids.append(item['id'])
+            self._index(item)
+            if self._search_index is not None:
+                self._search_index.add(item)
+            self._next_id = max(self._next_id, item['id'] + 1)
+            self._item_modified[item['id']] = modified
+            self._item_tags.pop(item['id'], None)
+        elif op == 'update':
+            item = compact(record['item'])
+            old = self._items[item['id']]
+            self._unindex(old)
+            self._items[item['id']] = item
+            self._index(item)
+            if self._search_index is not None:
+                self._search_index.remove(old)
+                self._search_index.add(item)
+            self._item_modified[item['id']] = modified
+            self._item_tags.pop(item['id'], None)
+        elif op == 'delete':
+            item = self._items.pop(record['id'])
+            del self._ids[bisect.bisect_left(self._ids, record['id'])]
+            self._unindex(item)
+            if self._search_index is not None:
+                self._search_index.remove(item)
+            self._item_modified.pop(record['id'], None)
+            self._item_tags.pop(record['id'], None)
+            if self.encoded_items is not None:
+                self.encoded_items.discard(record['id'])
+        else:
+            raise ValueError(f"Unknown log operation: {op}")
+        self._version = version
+        self._modified = modified
+
+    def _persist(self, *records):
+        """
+        Writes ``records``, already applied in memory, to disk. If that
+        fails, the files still hold the state before them, so the store
+        reloads it and the error is raised to the caller.
+        """
+        try:
+            if self._wal is None:
+                if self.snapshot_format == 'binary':
+                    self._write_snapshot()
+                else:
+                    save_data(
+                        list(self._items.values()), self.path, lock=False
+                    )
+            else:
+                with timed('save'):
+                    self._wal_offset = self._wal.append(*records)
+        except Exception:
+            logger.error("Rolling back unsaved changes to %s", self.path)
+            self._load()
+            raise
+        if self._wal is None:
+            self._rebase()
+            return
+        if self._wal.records >= self.compact_threshold:
+            self._start_compaction()
+        self._signature = self._stat()
+
+    def _write_snapshot(self):
+        """
+        Replaces the data file with a binary snapshot of the items, maps
+        it in place of the previous one and returns its digest.
+        """
+        if isinstance(self._items, SnapshotItems):
+            records = self._items.records()
+        else:
+            records = (self._items[item_id] for item_id in self._ids)
+        with timed('save'):
+            digest = write_snapshot(self.path, records)
+        self._map(Snapshot.open(self.path))
+        return digest
+
+    def _start_compaction(self):
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(
+            target=self.compact, name='item-store-compactor', daemon=True
+        )
+        self._compactor.start()
+
+    def compact(self):
+        """
+        Folds the write-ahead log into a fresh snapshot.
+
+        The snapshot is replaced before the log is reset. A crash in
+        between leaves a log whose header no longer matches the snapshot,
+        and that stale log is discarded on the next load.
+        """
+        if self._wal is None:
+            return
+        with self._writing():
+            if self.snapshot_format == 'binary':
+                digest = self._write_snapshot()
+            else:
+                payload = json.dumps(
+                    list(self._items.values()), default=as_dict
+                ).encode()
+                write_atomic(self.path, payload)
+                digest = snapshot_digest(payload)
+            self._wal_offset = self._wal.reset(digest)
+            self._rebase()
+            logger.info(
+                "Compacted write-ahead log into %s (%d items)",
+                self.path,
+                len(self._items)
+            )
+
+    def close(self):
+        """
+        Flushes and closes the write-ahead log and the lock file, and
+        unmaps any binary snapshot.
+        """
+        if self._wal is not None:
+            self._wal.close()
+        self._unmap()
+        self._file_lock.close()
+
+    def all(self):
+        """Returns every item, ordered by id."""
+        with self._reading():
+            return list(self._items.values())
+
+    def get(self, key):
+        """Returns the item for ``key`` or None if it does not exist."""
+        with self._reading():
+            item_id = self._resolve(key)
+            return None if item_id is None else self._items[item_id]
+
+    def get_versioned(self, key):
+        """
+        Returns the item for ``key`` and its Version, read under one lock,
+        or ``(None, None)`` if it does not exist.
+        """
+        with self._reading():
+            item_id = self._resolve(key)
+            if item_id is None:
+                return None, None
+            return self._items[item_id], self._item_version(item_id)
+
+    def page(self, after=None, limit=100):
+        """
+        Returns up to ``limit`` items with an id greater than ``after``.
+
+        The result is an ``(items, last_id)`` tuple where ``last_id`` is
+        the id to resume after, or None once the collection is exhausted.
+        Seeking uses the sorted id list, so each page costs
+        O(log N + limit) regardless of how deep it is.
+        """
+        with self._reading():
+            start = 0 if after is None else bisect.bisect_right(
+                self._ids, after
+            )
+            ids = self._ids[start:start + limit]
+            items = [self._items[item_id] for item_id in ids]
+            if start + limit >= len(self._ids):
+                return items, None
+            return items, ids[-1]
+
+    def find_by_name(self, name):
+        """Returns the items named exactly ``name``."""
+        with self._reading():
+            ids = self._by_name.get(name)
+            if ids is None:
+                return []
+            if type(ids) is not list:
+                ids = [ids]
+            return [self._items[item_id] for item_id in ids]
+
+    def search(self, query, offset=0, limit=100):
+        """
+        Returns ``(items, next_offset)`` for the items best matching
+        ``query``, ranked as described by SearchIndex.
+
+        The index is built on the first search, which takes seconds on a
+        million items, and kept up to date by every mutation after that.
+        A full reload, e.g. after another process rewrote the snapshot,
+        drops it; in ``wal`` mode other workers' writes are replayed onto
+        it instead.
+        """
+        with self._reading():
+            index = self._search_index
+            if index is not None:
+                ids, more = index.search(query, offset, limit)
+                return (
+                    [self._items[item_id] for item_id in ids],
+                    offset + limit if more else None
+                )
+        with self._lock.write():
+            if self._search_index is None:
+                with timed('index'):
+                    self._search_index = SearchIndex(self._items.values())
+        return self.search(query, offset, limit)
+
+    def version(self):
+        """Returns the Version of the whole collection."""
+        with self._reading():
+            return Version(f"{self._generation}-{self._version}",
+                           self._modified)
+
+    def item_version(self, key):
+        """Returns the Version of the item for ``key``, or None."""
+        with self._reading():
+            item_id = self._resolve(key)
+            return None if item_id is None else self._item_version(item_id)
+
+    def version_of(self, item):
+        """
+        Returns the Version a read of ``item``, as returned by a write,
+        would carry, whatever key it is addressed by.
+        """
+        with self._reading():
+            return self._item_version(item['id'], item)
+
+    def _item_version(self, item_id, item=None):
+        """
+        Returns the Version of the stored item ``item_id``, or of ``item``
+        under that id. Tags of stored items are cached until they change,
+        so revalidating an item does not encode it again.
+        """
+        if item is None:
+            tag = self._item_tags.get(item_id)
+            if tag is None:
+                tag = _content_tag(self._items[item_id])
+                self._item_tags[item_id] = tag
+        else:
+            tag = _content_tag(item)
+        modified = self._item_modified.get(item_id, self._loaded_at)
+        return Version(f"{item_id}.{tag}", modified)
+
+    def _prepare(self, op, key, item=None, expected=None):
+        """
+        Builds the log record for one mutation without applying it.
+
+        Returns None if ``key`` does not name an item. Raises
+        VersionMismatchError if ``expected`` is given and lacks the item's
+        ETag, and ItemAlreadyExistsError if the mutation would duplicate a
+        name.
+        """
+        if op == 'create':
+            self._check_unique(item['name'])
+            return {'op': 'add', 'item': dict(item, id=self._next_id)}
+        item_id = self._resolve(key)
+        if item_id is None:
+            return None
+        check_version(expected, self._item_version(item_id).etag, key)
+        if op == 'delete':
+            return {'op': 'delete', 'id': item_id}
+        if item['name'] != self._items[item_id]['name']:
+            self._check_unique(item['name'])
+        return {'op': 'update', 'item': dict(item, id=item_id)}
+
+    def add(self, item):
+        """
+        Stores ``item`` under the next id and returns the stored record.
+
+        Raises ItemAlreadyExistsError if the name is taken.
+        """
+        with self._writing():
+            record = self._prepare('create', None, item)
+            self._apply(record)
+            self._persist(record)
+            return record['item']
+
+    def update(self, key, item, expected=None):
+        """
+        Replaces the item for ``key``; returns None if it is missing.
+
+        Raises ItemAlreadyExistsError if the new name belongs to another
+        item, and VersionMismatchError if ``expected`` ETags are given and
+        the item's current one is not among them.
+        """
+        with self._writing():
+            record = self._prepare('update', key, item, expected)
+            if record is None:
+                return None
+            self._apply(record)
+            self._persist(record)
+            return record['item']
+
+    def delete(self, key, expected=None):
+        """
+        Removes the item for ``key``; returns None if it is missing.
+
+        Raises VersionMismatchError like ``update``.
+        """
+        with self._writing():
+            record = self._prepare('delete', key, expected=expected)
+            if record is None:
+                return None
+            item = self._items[record['id']]
+            self._apply(record)
+            self._persist(record)
+            return item
+
+    def bulk(self, operations):
+        """
+        Applies ``(op, key, item)`` operations in order under one lock.
+
+        ``op`` is 'create', 'update' or 'delete'. Every operation is
+        attempted and all resulting changes are persisted with a single
+        flush. Returns one ``(outcome, item)`` pair per operation, where
+        ``outcome`` is 'created', 'updated', 'deleted', 'exists' or
+        'not_found'.
+        """
+        outcomes = {'create': 'created', 'update': 'updated',
+                    'delete': 'deleted'}
+        results = []
+        records = []
+        with self._writing():
+            for op, key, item in operations:
+                try:
+                    record = self._prepare(op, key, item)
+                except ItemAlreadyExistsError:
+                    results.append(('exists', None))
+                    continue
+                if record is None:
+                    results.append(('not_found', None))
+                    continue
+                if op == 'delete':
+                    item = self._items[record['id']]
+                else:
+                    item = record['item']
+                self._apply(record)
+                records.append(record)
+                results.append((outcomes[op], item))
+            if records:
+                self._persist(*records)
+        return results
+
+    def __len__(self):
+        with self._reading():
+            return len(self._items)
+
+
+def _content_tag(item):
+    """Returns a digest of ``item``'s fields, the same in every process."""
+    payload = json.dumps(
+        item, default=as_dict, sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+
+def init_store(app, path=None):
+    """Creates the item store for ``app`` and registers it as an extension."""
+    config = app.config
+    store = ItemStore(
+        path or config.get('DATA_FILE', 'data.json'),
+        persistence=config.get('ITEM_PERSISTENCE', 'snapshot'),
+        wal_sync_every=int(config.get('WAL_SYNC_EVERY', 64)),
+        wal_sync_interval=float(config.get('WAL_SYNC_INTERVAL', 0.05)),
+        compact_threshold=int(config.get('WAL_COMPACT_THRESHOLD', 10000)),
+        addressing=config.get('ITEM_ADDRESSING', 'id'),
+        snapshot_format=config.get('ITEM_SNAPSHOT_FORMAT', 'json'),
+        load_workers=int(config.get('LOAD_WORKERS', 1))
+    )
+    app.extensions['item_repository'] = store
+    return store
@@ -0,0 +1,54 @@
+import json
+from .items import ItemSchema
+from .exceptions import InvalidQueryError
+
+STREAM_CHUNK_SIZE = 500
+
+STREAM_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson'
+}
+
+
+def stream_mimetype(fmt):
+    if fmt not in STREAM_FORMATS:
+        raise InvalidQueryError(
+            f"format must be one of: {', '.join(STREAM_FORMATS)}."
+        )
+    return STREAM_FORMATS[fmt]
+
+
+def stream_items(repository, fields=None, fmt='json',
+                 chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yields the collection as a JSON array or as NDJSON, one chunk at a time.
+
+    Items are read from the repository page by page and dumped individually,
+    so memory use is bounded by ``chunk_size`` rather than by the size of
+    the collection. Each page is read separately; items added
+    while the export is running are included if their id sorts after the
+    current page.
+    """
+    schema = ItemSchema(only=fields)
+    separator = '\n' if fmt == 'ndjson' else ','
+    after = None
+    first = True
+
+    if fmt == 'json':
+        yield '['
+    while True:
+        items, after = repository.page(after=after, limit=chunk_size)
+        if items:
+            chunk = separator.join(
+                json.dumps(schema.dump(item), separators=(',', ':'))
+                for item in items
+            )
+            if fmt == 'ndjson':
+                yield chunk + '\n'
+            else:
+                yield chunk if first else ',' + chunk
+            first = False
+        if after is None:
+            break
+    if fmt == 'json':
+        yield ']'
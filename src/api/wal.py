@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from .items import write_atomic
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot_digest(payload):
+    """Returns the digest that ties a log to the snapshot it applies to."""
+    if payload is None:
+        return None
+    return hashlib.sha256(payload).hexdigest()
+
+
+def encode_record(record):
+    return (json.dumps(record, separators=(',', ':')) + '\n').encode()
+
+
+class WriteAheadLog:
+    """
+    Append-only JSON-lines log of item mutations.
+
+    The first line is a header naming the digest of the snapshot the log
+    applies to; every following line is one mutation. Appends are fsynced
+    in groups: after ``sync_every`` records or ``sync_interval`` seconds,
+    whichever comes first, which bounds how much a crash can lose.
+    """
+
+    def __init__(self, path, sync_every=64, sync_interval=0.05):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.records = 0
+        self._fd = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        """
+        Returns the descriptor to append to, reopening the log if another
+        process has replaced it, e.g. by compacting, since it was opened.
+        """
+        if self._fd is not None and self._replaced():
+            self._close_fd()
+        if self._fd is None:
+            self._fd = os.open(
+                self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644
+            )
+        return self._fd
+
+    def _replaced(self):
+        """True if ``path`` no longer names the file ``_fd`` is open on."""
+        opened = os.fstat(self._fd)
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        return (opened.st_dev, opened.st_ino) != (
+            current.st_dev, current.st_ino
+        )
+
+    def read(self, offset=0):
+        """
+        Reads complete lines starting at ``offset``.
+
+        Returns a ``(header, records, end_offset)`` tuple. ``header`` is
+        None unless reading from the start of an existing log. A torn
+        last line left by a crash is ignored.
+        """
+        try:
+            with open(self.path, 'rb') as log_file:
+                log_file.seek(offset)
+                data = log_file.read()
+        except FileNotFoundError:
+            return None, [], 0
+
+        header = None
+        records = []
+        position = 0
+        while True:
+            end = data.find(b'\n', position)
+            if end < 0:
+                break
+            try:
+                entry = json.loads(data[position:end])
+            except ValueError:
+                logger.warning(
+                    "Ignoring corrupt write-ahead log entry at offset %d",
+                    offset + position
+                )
+                break
+            if offset == 0 and position == 0:
+                header = entry
+            else:
+                records.append(entry)
+            position = end + 1
+        return header, records, offset + position
+
+    def reset(self, digest):
+        """Atomically replaces the log with an empty one for ``digest``."""
+        with self._lock:
+            self._close_fd()
+            write_atomic(self.path, encode_record({'snapshot': digest}))
+            self.records = 0
+            self._pending = 0
+            self._last_sync = time.monotonic()
+            return os.stat(self.path).st_size
+
+    def append(self, *records):
+        """
+        Appends mutations with a single write and returns the new end
+        offset.
+        """
+        with self._lock:
+            fd = self._open()
+            start = os.lseek(fd, 0, os.SEEK_END)
+            try:
+                os.write(fd, b''.join(encode_record(r) for r in records))
+            except OSError:
+                # Drop a partial write so that later records do not
+                # follow a torn line.
+                os.ftruncate(fd, start)
+                raise
+            offset = os.lseek(fd, 0, os.SEEK_CUR)
+            self.records += len(records)
+            self._pending += len(records)
+            if (self._pending >= self.sync_every
+                    or time.monotonic() - self._last_sync
+                    >= self.sync_interval):
+                self._sync_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.sync_interval, self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+            return offset
+
+    def _sync_locked(self):
+        if self._pending and self._fd is not None:
+            os.fsync(self._fd)
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        """Flushes pending records to stable storage."""
+        with self._lock:
+            self._timer = None
+            self._sync_locked()
+
+    def _close_fd(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._fd is not None:
+            self._sync_locked()
+            os.close(self._fd)
+            self._fd = None
+
+    def close(self):
+        with self._lock:
+            self._close_fd()
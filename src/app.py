@@ -1,16 +1,6 @@
-import logging
-from flask import Flask
-from config import Config
-from api.routes import main_bp
+from app import create_app
 
-logging.basicConfig(level=logging.INFO)
-
-app = Flask(__name__)
-app.config.from_object(Config)
-
-Config.validate()
-
-app.register_blueprint(main_bp)
+app = create_app()
 
 
 if __name__ == '__main__':
@@ -1,42 +1,110 @@
+"""
+Application factory.
+
+``create_app`` only builds the Flask app and registers its blueprints.
+The item repository, the data file and the optional dependencies behind
+them (SQLAlchemy, pika, prometheus_client) are loaded on first use, or up
+front by ``warmup``, so importing this package and forking workers stays
+cheap.
+"""
 import os
-import json
 import logging
+import threading
+from collections.abc import Mapping
 from flask import Flask
-from api.routes import main_bp
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-
-app.config.from_object('config.Config')
-
-data_file_path = os.path.join(
-    os.path.dirname(
-        os.path.dirname(__file__)
-    ),
-    'data.json'
-)
-
-if not os.path.exists(data_file_path):
-    logger.error("Data file does not exist at path: %s", data_file_path)
-    raise FileNotFoundError(f"Data file not found at {data_file_path}")
-
-try:
-    with open(data_file_path) as data_file:
-        app.config['DATA'] = json.load(data_file)
-        logger.info("Data loaded successfully.")
-except FileNotFoundError as fnf_error:
-    logger.error("Data file not found: %s", fnf_error)
-    raise
-except json.JSONDecodeError as json_error:
-    logger.error("Error decoding JSON: %s", json_error)
-    raise
-except Exception as e:
-    logger.error("Error loading data from JSON: %s", e)
-    raise
-
-app.register_blueprint(main_bp)
-
-if __name__ == '__main__':
-    app.run(debug=app.config['DEBUG'])
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_default_app = None
+_default_app_lock = threading.Lock()
+
+
+def _load_config(app, config):
+    from config import Config, config_by_name
+
+    if config is None:
+        config = os.getenv('APP_CONFIG', 'development')
+    if isinstance(config, str):
+        config = config_by_name[config]
+    if isinstance(config, Mapping):
+        app.config.from_object(Config)
+        app.config.from_mapping(config)
+    else:
+        app.config.from_object(config)
+    Config.validate()
+
+
+def create_app(config=None):
+    """
+    Creates the application.
+
+    ``config`` is a name from ``config.config_by_name``, a config class or
+    object, or a mapping of overrides applied on top of ``Config``. It
+    defaults to ``$APP_CONFIG`` or ``development``.
+    """
+    app = Flask(__name__, root_path=SRC_DIR)
+    _load_config(app, config)
+
+    from utils.log_utils import setup_logging
+    setup_logging(app.config.get('LOG_TO_RABBITMQ', False))
+
+    from api.routes import main_bp
+    from .health import health_bp
+    from .metrics import init_metrics
+    app.register_blueprint(main_bp)
+    app.register_blueprint(health_bp)
+    init_metrics(app)
+
+    if app.config.get('WARMUP_ON_START'):
+        warmup(app)
+    return app
+
+
+def warmup(app):
+    """
+    Loads the item repository and creates the metrics now rather than on
+    the first request, e.g. from a gunicorn ``post_fork`` hook.
+    """
+    from api.repository import get_repository
+    from .metrics import get_metrics
+
+    with app.app_context():
+        repository = get_repository()
+    get_metrics()
+    logger.info("Warmed up with %d items", len(repository))
+    return app
+
+
+def shutdown(app):
+    """
+    Flushes and releases the item repository, the item event streams and
+    the log shipping queue, e.g. from a gunicorn ``worker_exit`` hook.
+    """
+    from utils.log_utils import RabbitMQLogHandler
+    from api.events import close_event_streams
+
+    close_event_streams()
+
+    repository = app.extensions.pop('item_repository', None)
+    if repository is not None:
+        repository.close()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, RabbitMQLogHandler):
+            root.removeHandler(handler)
+            handler.close()
+
+
+def __getattr__(name):
+    # ``from app import app`` and ``flask --app app`` keep working, but the
+    # default app is only built when something asks for it.
+    global _default_app
+    if name != 'app':
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if _default_app is None:
+        with _default_app_lock:
+            if _default_app is None:
+                _default_app = create_app()
+    return _default_app
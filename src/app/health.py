@@ -0,0 +1,48 @@
+import logging
+import threading
+from flask import Blueprint, jsonify
+from api.repository import get_repository
+from api.events import close_event_streams
+
+logger = logging.getLogger(__name__)
+
+health_bp = Blueprint('health', __name__)
+
+_draining = threading.Event()
+
+
+def begin_shutdown():
+    """
+    Marks this process as draining: /readyz starts failing so the load
+    balancer moves traffic away while in-flight requests finish.
+    """
+    if not _draining.is_set():
+        logger.info("Draining: /readyz now reports not ready")
+    _draining.set()
+    # Event streams never finish on their own; end them so that clients
+    # reconnect to another worker.
+    close_event_streams()
+
+
+def reset_shutdown():
+    """Clears the draining flag, e.g. in a freshly forked worker."""
+    _draining.clear()
+
+
+@health_bp.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return jsonify({"status": "ok"}), 200
+
+
+@health_bp.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: the item repository is loaded and we are not draining."""
+    if _draining.is_set():
+        return jsonify({"status": "draining"}), 503
+    try:
+        items = len(get_repository())
+    except Exception as e:
+        logger.error("Readiness check failed: %s", e)
+        return jsonify({"status": "unavailable"}), 503
+    return jsonify({"status": "ready", "items": items}), 200
@@ -1,17 +1,229 @@
-from flask import Blueprint
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST, Counter
+import os
+import time
+import threading
+from flask import Blueprint, g, request
+from api.items import observe_storage
+from api.cache import observe_cache
+from api.events import observe_events
 
 metrics_bp = Blueprint('metrics', __name__)
 
-REQUEST_COUNT = Counter(
-    'http_requests_total',
-    'Total HTTP Requests', [
-        'method',
-        'endpoint'
-    ]
-)
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+class _Metrics:
+    """
+    The process's metric objects.
+
+    prometheus_client is imported when they are first created rather than
+    when the app is, and only after gunicorn has had the chance to set
+    PROMETHEUS_MULTIPROC_DIR.
+    """
+
+    def __init__(self):
+        from prometheus_client import Counter, Gauge, Histogram, Summary
+
+        self.REQUEST_COUNT = Counter(
+            'http_requests_total',
+            'Total HTTP Requests', [
+                'method',
+                'endpoint'
+            ]
+        )
+        self.RESPONSE_COUNT = Counter(
+            'http_responses_total',
+            'HTTP responses by status code', [
+                'method',
+                'endpoint',
+                'status'
+            ]
+        )
+        self.REQUEST_LATENCY = Histogram(
+            'http_request_duration_seconds',
+            'HTTP request latency', [
+                'method',
+                'endpoint'
+            ]
+        )
+        self.REQUESTS_IN_PROGRESS = Gauge(
+            'http_requests_in_progress',
+            'HTTP requests being handled', [
+                'method',
+                'endpoint'
+            ],
+            multiprocess_mode='livesum'
+        )
+        self.RESPONSE_SIZE = Summary(
+            'http_response_size_bytes',
+            'HTTP response body size', [
+                'method',
+                'endpoint'
+            ]
+        )
+        self.STORAGE_LATENCY = Histogram(
+            'item_storage_duration_seconds',
+            'Item storage load, save, serialize and validate time', [
+                'operation'
+            ],
+            buckets=(
+                .0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1,
+                .25, .5, 1.0, 2.5, float('inf')
+            )
+        )
+        self.CACHE_REQUESTS = Counter(
+            'cache_requests_total',
+            'Cache lookups by tier and result', [
+                'tier',
+                'result'
+            ]
+        )
+        self.CACHE_EVICTIONS = Counter(
+            'cache_evictions_total',
+            'Cache entries dropped for space or by TTL', [
+                'tier',
+                'reason'
+            ]
+        )
+        self.EVENT_STREAMS = Gauge(
+            'item_event_streams',
+            'Open /api/items/events streams',
+            multiprocess_mode='livesum'
+        )
+        self.ITEM_EVENTS = Counter(
+            'item_events_total',
+            'Item change events published, received from other workers '
+            'or lost to evicted streams', [
+                'outcome'
+            ]
+        )
+
+
+def get_metrics():
+    """Returns the metric objects, creating them on first use."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = _Metrics()
+    return _metrics
+
+
+def __getattr__(name):
+    # Keeps ``from app.metrics import REQUEST_COUNT`` working.
+    if name.isupper() and not name.startswith('_'):
+        metric = getattr(get_metrics(), name, None)
+        if metric is not None:
+            return metric
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def multiprocess_enabled():
+    """
+    True when prometheus_client writes metrics to PROMETHEUS_MULTIPROC_DIR,
+    which has to be set before the first import, e.g. by gunicorn.
+    """
+    return bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+
+
+def mark_process_dead(pid):
+    """Drops the live gauges of an exited worker; call from child_exit."""
+    if multiprocess_enabled():
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
+
+
+def _endpoint():
+    # The URL rule keeps label cardinality bounded: /api/items/<int:item_id>
+    # rather than one series per id, and one series for every unknown path.
+    if request.url_rule is None:
+        return 'unmatched'
+    return request.url_rule.rule
+
+
+def _before_request():
+    labels = (request.method, _endpoint())
+    get_metrics().REQUESTS_IN_PROGRESS.labels(*labels).inc()
+    g.metrics_request = (labels, time.perf_counter())
+
+
+def _after_request(response):
+    started = g.get('metrics_request')
+    if started is None:
+        return response
+    labels, start = started
+    metrics = get_metrics()
+    metrics.REQUEST_LATENCY.labels(*labels).observe(
+        time.perf_counter() - start
+    )
+    metrics.REQUEST_COUNT.labels(*labels).inc()
+    metrics.RESPONSE_COUNT.labels(*labels, str(response.status_code)).inc()
+    size = response.calculate_content_length()
+    if size is not None:
+        metrics.RESPONSE_SIZE.labels(*labels).observe(size)
+    return response
+
+
+def _teardown_request(error=None):
+    started = g.pop('metrics_request', None)
+    if started is not None:
+        get_metrics().REQUESTS_IN_PROGRESS.labels(*started[0]).dec()
+
+
+def _observe_storage(operation, seconds):
+    get_metrics().STORAGE_LATENCY.labels(operation).observe(seconds)
+
+
+def _observe_cache(tier, event):
+    metrics = get_metrics()
+    if event == 'eviction':
+        metrics.CACHE_EVICTIONS.labels(tier, 'size').inc()
+    elif event == 'expiration':
+        metrics.CACHE_EVICTIONS.labels(tier, 'ttl').inc()
+    else:
+        metrics.CACHE_REQUESTS.labels(tier, event).inc()
+
+
+def _observe_event(event):
+    metrics = get_metrics()
+    if event == 'opened':
+        metrics.EVENT_STREAMS.inc()
+    elif event == 'closed':
+        metrics.EVENT_STREAMS.dec()
+    else:
+        metrics.ITEM_EVENTS.labels(event).inc()
+
+
+def init_metrics(app):
+    """Instruments every request of ``app`` and exposes ``/metrics``."""
+    if 'metrics' in app.blueprints:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.register_blueprint(metrics_bp)
+    observe_storage(_observe_storage)
+    observe_cache(_observe_cache)
+    observe_events(_observe_event)
 
 
 @metrics_bp.route('/metrics')
 def metrics():
-    return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+    from prometheus_client import (
+        REGISTRY,
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        generate_latest,
+        multiprocess
+    )
+
+    get_metrics()
+    registry = REGISTRY
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return (
+        generate_latest(registry),
+        200,
+        {'Content-Type': CONTENT_TYPE_LATEST}
+    )
@@ -0,0 +1,18 @@
+"""
+Optional ASGI entry point, for ASGI servers and proxies:
+
+    uvicorn asgi:application --workers 4
+
+The Flask app stays synchronous; asgiref runs each request in a thread
+pool. Prefer gunicorn with wsgi:app unless an ASGI server is required.
+"""
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError as e:
+    raise ImportError(
+        "The ASGI entry point requires asgiref: pip install asgiref"
+    ) from e
+
+from wsgi import app
+
+application = WsgiToAsgi(app)
@@ -0,0 +1,210 @@
+"""
+Runs the benchmark suite, writes the results as JSON and compares them
+with a stored baseline.
+
+    cd src
+    python -m benchmarks                          # micro + inprocess
+    python -m benchmarks --suite http --clients 32
+    python -m benchmarks --suite memory --sizes 100000,1000000
+    python -m benchmarks --sizes 10,1000,1000000 --output results.json
+    python -m benchmarks --update-baseline        # accept current numbers
+
+The exit status is 1 when any result regressed by more than
+``--tolerance`` against the baseline.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess  # nosec B404
+from . import micro, memory, load
+from .workload import MixedWorkload
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+SUITES = ('micro', 'memory', 'inprocess', 'http')
+
+# For each kind of result: the metric compared with the baseline and
+# whether a higher value is better.
+REGRESSION_METRICS = {
+    'micro': ('p50_ms', False),
+    'memory': ('bytes_per_item', False),
+    'inprocess': ('rps', True),
+    'http': ('rps', True),
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(  # nosec B603 B607
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(args):
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'arguments': {
+            key: value for key, value in vars(args).items()
+            if key not in ('output', 'baseline', 'update_baseline')
+        },
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns one entry per result that is worse than its baseline by more
+    than ``tolerance`` (0.25 = 25%). Results missing from either side are
+    ignored.
+    """
+    regressions = []
+    for key, record in results.items():
+        reference = baseline.get(key)
+        metric, higher_is_better = REGRESSION_METRICS[key.split('/')[0]]
+        if not reference or not reference.get(metric) or (
+                record.get(metric) is None):
+            continue
+        change = (record[metric] - reference[metric]) / reference[metric]
+        if higher_is_better:
+            change = -change
+        if change > tolerance:
+            regressions.append({
+                'key': key,
+                'metric': metric,
+                'baseline': reference[metric],
+                'current': record[metric],
+                'change': round(change, 3),
+            })
+    return regressions
+
+
+def _print(key, record):
+    if 'bytes_per_item' in record:
+        mapped = record.get('mapped_bytes_per_item')
+        print(
+            f"{key:<40}{record['bytes_per_item']:>10} bytes/item"
+            f"   {record['bytes'] / 2 ** 20:.1f} MiB"
+            + (f"   + {mapped} bytes/item mapped" if mapped else ""),
+            flush=True
+        )
+        return
+    if 'rps' in record:
+        line = f"{record['rps']:>10} req/s"
+    else:
+        line = f"{record['ops_per_sec']:>10} ops/s"
+    print(
+        f"{key:<40}{line}   p50 {record['p50_ms']} ms"
+        f"   p95 {record['p95_ms']} ms   p99 {record['p99_ms']} ms",
+        flush=True
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--suite', default='micro,inprocess',
+                        help=f"comma-separated subset of {', '.join(SUITES)}")
+    parser.add_argument('--sizes', default=','.join(
+        str(size) for size in micro.DEFAULT_SIZES
+    ), help="collection sizes for the micro and memory benchmarks")
+    parser.add_argument('--only', help="comma-separated micro-benchmarks "
+                        "and memory datasets")
+    parser.add_argument('--load-size', type=int, default=1000,
+                        help="items in the data file for load runs")
+    parser.add_argument('--write-ratios', default='0,0.1,0.5',
+                        help="write ratios of the mixed load runs")
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--processes', type=int, default=1,
+                        help="client processes for HTTP load")
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--url', help="existing server for the http suite")
+    parser.add_argument('--output', help="write the results to this file")
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="store these results as the new baseline")
+    args = parser.parse_args(argv)
+    args.suite = [suite for suite in args.suite.split(',') if suite]
+    for suite in args.suite:
+        if suite not in SUITES:
+            parser.error(f"unknown suite: {suite}")
+    args.sizes = [int(size) for size in args.sizes.split(',') if size]
+    args.only = args.only.split(',') if args.only else None
+    args.write_ratios = [
+        float(ratio) for ratio in args.write_ratios.split(',') if ratio
+    ]
+    return args
+
+
+def run(args):
+    results = {}
+    if 'micro' in args.suite:
+        results.update(micro.run(args.sizes, args.only, progress=_print))
+    if 'memory' in args.suite:
+        results.update(memory.run(args.sizes, args.only, progress=_print))
+    for suite in ('inprocess', 'http'):
+        if suite not in args.suite:
+            continue
+        for ratio in args.write_ratios:
+            workload = MixedWorkload(args.load_size, write_ratio=ratio)
+            if suite == 'inprocess':
+                record = load.run_inprocess(
+                    workload, args.load_size, args.clients, args.duration
+                )
+            else:
+                record = load.run_http(
+                    workload, args.load_size, args.clients, args.processes,
+                    args.duration, url=args.url
+                )
+            key = f"{suite}/mixed-w{int(ratio * 100)}/{args.load_size}"
+            results[key] = record
+            _print(key, record)
+    return results
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = {'meta': metadata(args), 'results': run(args)}
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+
+    if args.update_baseline:
+        baseline = {'meta': report['meta'], 'results': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as existing:
+                baseline['results'] = json.load(existing)['results']
+        baseline['results'].update(report['results'])
+        with open(args.baseline, 'w') as output:
+            json.dump(baseline, output, indent=2, sort_keys=True)
+            output.write('\n')
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against.")
+        return 0
+    with open(args.baseline) as existing:
+        baseline = json.load(existing)['results']
+    regressions = compare(report['results'], baseline, args.tolerance)
+    for regression in regressions:
+        print(
+            "REGRESSION {key}: {metric} {baseline} -> {current} "
+            "({change:+.0%} worse)".format(**regression)
+        )
+    if not regressions:
+        print(f"No regressions beyond {args.tolerance:.0%} of the baseline.")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+HTTP load generator for a running server.
+
+Opens ``--clients`` keep-alive connections spread over ``--processes``
+processes, sends requests back to back for ``--duration`` seconds and
+reports throughput and latency percentiles.
+
+    python -m benchmarks.http_load http://127.0.0.1:50010/api/items \\
+        --clients 32 --processes 4 --duration 10
+"""
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit
+from concurrent.futures import ProcessPoolExecutor
+from .stats import summarize
+from .workload import FixedRequest
+
+
+def _client(base_url, workload, headers, deadline, seed, latencies,
+            errors):
+    parts = urlsplit(base_url)
+    prefix = parts.path.rstrip('/')
+    rng = random.Random(seed)  # nosec B311
+    connection = None
+    while time.monotonic() < deadline:
+        method, path, body = workload(rng)
+        reused = connection is not None
+        if connection is None:
+            connection = http.client.HTTPConnection(
+                parts.hostname, parts.port or 80, timeout=30
+            )
+        start = time.perf_counter()
+        try:
+            connection.request(
+                method, prefix + path, body=body, headers=headers
+            )
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            # A kept-alive connection closed by the server (worker recycled,
+            # keepalive expired) is retried on a new one, as a proxy would.
+            if not reused:
+                errors.append(1)
+            connection.close()
+            connection = None
+            continue
+        latencies.append(time.perf_counter() - start)
+        if response.will_close:
+            connection.close()
+            connection = None
+        if response.status >= 500:
+            errors.append(1)
+    if connection is not None:
+        connection.close()
+
+
+def _run_process(base_url, workload, headers, clients, duration, seed):
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(
+            target=_client,
+            args=(
+                base_url, workload, headers, deadline, seed + index,
+                latencies, errors
+            )
+        )
+        for index in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, len(errors)
+
+
+def run_workload(base_url, workload, clients=8, processes=1, duration=10.0,
+                 seed=0):
+    """
+    Drives ``workload`` against the server at ``base_url`` and returns the
+    ``summarize`` record.
+    """
+    headers = {'Content-Type': 'application/json'}
+    processes = max(1, min(processes, clients))
+    shares = [
+        clients // processes + (1 if index < clients % processes else 0)
+        for index in range(processes)
+    ]
+    seeds = [seed + index * clients for index in range(processes)]
+    start = time.monotonic()
+    if processes == 1:
+        results = [
+            _run_process(
+                base_url, workload, headers, clients, duration, seed
+            )
+        ]
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(
+                _run_process,
+                [base_url] * processes,
+                [workload] * processes,
+                [headers] * processes,
+                shares,
+                [duration] * processes,
+                seeds
+            ))
+    elapsed = time.monotonic() - start
+    latencies = [value for result in results for value in result[0]]
+    return summarize(latencies, sum(result[1] for result in results), elapsed)
+
+
+def run(url, clients=8, processes=1, duration=10.0, method='GET', body=None):
+    """Sends the same request to ``url`` over and over."""
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    base_url = f"{parts.scheme}://{parts.netloc}"
+    return run_workload(
+        base_url,
+        FixedRequest(method, path, body),
+        clients=clients,
+        processes=processes,
+        duration=duration
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('url')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--method', default='GET')
+    parser.add_argument('--body', help="JSON request body")
+    args = parser.parse_args(argv)
+
+    result = run(
+        args.url,
+        clients=args.clients,
+        processes=args.processes,
+        duration=args.duration,
+        method=args.method,
+        body=args.body
+    )
+    print(json.dumps(dict(result, url=args.url, clients=args.clients)))
+
+
+if __name__ == '__main__':
+    main()
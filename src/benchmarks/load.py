@@ -0,0 +1,148 @@
+"""
+Mixed read/write load, either in-process through the Flask test client
+or over HTTP against a local gunicorn started for the run.
+"""
+import os
+import sys
+import time
+import random
+import socket
+import tempfile
+import threading
+import subprocess  # nosec B404
+import urllib.request
+from contextlib import contextmanager
+from api.items import save_data
+from .http_load import run_workload
+from .stats import summarize
+from .workload import make_items
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed_data_file(directory, size):
+    path = os.path.join(directory, 'data.json')
+    save_data(make_items(size), path)
+    return path
+
+
+def _inprocess_client(app, workload, deadline, seed, latencies, errors):
+    rng = random.Random(seed)  # nosec B311
+    client = app.test_client()
+    while time.monotonic() < deadline:
+        method, path, body = workload(rng)
+        start = time.perf_counter()
+        response = client.open(
+            path, method=method, data=body, content_type='application/json'
+        )
+        response.get_data()
+        latencies.append(time.perf_counter() - start)
+        if response.status_code >= 500:
+            errors.append(1)
+
+
+def run_inprocess(workload, size, clients=4, duration=5.0, config=None,
+                  seed=0):
+    """
+    Drives ``workload`` through the test client of a fresh app whose data
+    file holds ``size`` items. No sockets are involved, so this isolates
+    the cost of the app itself.
+    """
+    from app import create_app, warmup, shutdown
+
+    with tempfile.TemporaryDirectory() as directory:
+        overrides = dict(config or {})
+        overrides['DATA_FILE'] = seed_data_file(directory, size)
+        app = create_app(overrides)
+        warmup(app)
+        latencies, errors = [], []
+        deadline = time.monotonic() + duration
+        threads = [
+            threading.Thread(
+                target=_inprocess_client,
+                args=(app, workload, deadline, seed + index, latencies,
+                      errors)
+            )
+            for index in range(clients)
+        ]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+        shutdown(app)
+    return summarize(latencies, len(errors), elapsed)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def local_server(size, env=None, timeout=30.0):
+    """
+    Starts gunicorn on a free local port with a seeded data file and
+    yields its base URL once /readyz answers.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        port = _free_port()
+        server_env = dict(
+            os.environ,
+            DATA_FILE=seed_data_file(directory, size),
+            GUNICORN_BIND=f"127.0.0.1:{port}",
+            GUNICORN_ACCESS_LOG='',
+            PROMETHEUS_MULTIPROC_DIR=os.path.join(directory, 'metrics')
+        )
+        server_env.update(env or {})
+        process = subprocess.Popen(  # nosec B603
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+             'wsgi:app'],
+            cwd=SRC_DIR,
+            env=server_env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            _wait_ready(base_url, process, timeout)
+            yield base_url
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+
+def _wait_ready(base_url, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn exited before becoming ready")
+        try:
+            with urllib.request.urlopen(  # nosec B310
+                    f"{base_url}/readyz", timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{base_url} did not become ready in {timeout}s")
+
+
+def run_http(workload, size, clients=16, processes=1, duration=5.0,
+             url=None, env=None, seed=0):
+    """
+    Drives ``workload`` over HTTP: against ``url`` if given, otherwise
+    against a local gunicorn seeded with ``size`` items.
+    """
+    if url:
+        return run_workload(url, workload, clients, processes, duration, seed)
+    with local_server(size, env) as base_url:
+        return run_workload(
+            base_url, workload, clients, processes, duration, seed
+        )
@@ -0,0 +1,77 @@
+"""
+Memory an ItemStore holds per item once loaded, at growing collection
+sizes, for items with distinct values and for items repeating a few,
+read from JSON, and for distinct items mapped from a binary snapshot.
+
+``bytes`` counts the Python heap only. A snapshot is read through the
+mapping of its file, which tracemalloc does not see, so its records also
+carry ``mapped_bytes`` and ``mapped_bytes_per_item``: the size of the
+file every worker shares in the page cache.
+"""
+import gc
+import os
+import tempfile
+import tracemalloc
+from api.items import save_data
+from api.store import ItemStore
+from api.snapshot import write_snapshot
+from .workload import make_items, make_repeated_items
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+
+def write_json(path, items):
+    save_data(items, path)
+
+
+# name: (items, writer of the data file)
+DATASETS = {
+    'unique': (make_items, write_json),
+    'repeated': (make_repeated_items, write_json),
+    'snapshot': (make_items, write_snapshot),
+}
+
+
+def measure_store(path):
+    """Returns the bytes allocated by loading ``path`` into an ItemStore."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        store = ItemStore(path)
+        store.load()
+        gc.collect()
+        allocated, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    store.close()
+    return allocated
+
+
+def run(sizes=DEFAULT_SIZES, names=None, progress=None):
+    """
+    Measures the selected datasets and returns
+    ``{'memory/<dataset>/<size>': record}``.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            for name, (make, write) in DATASETS.items():
+                if names and name not in names:
+                    continue
+                path = os.path.join(directory, f'{name}.data')
+                write(path, make(size))
+                allocated = measure_store(path)
+                record = {
+                    'items': size,
+                    'bytes': allocated,
+                    'bytes_per_item': round(allocated / size, 1),
+                }
+                if write is write_snapshot:
+                    mapped = os.path.getsize(path)
+                    record['mapped_bytes'] = mapped
+                    record['mapped_bytes_per_item'] = round(mapped / size, 1)
+                key = f"memory/{name}/{size}"
+                results[key] = record
+                if progress is not None:
+                    progress(key, record)
+    return results
@@ -0,0 +1,127 @@
+"""
+Micro-benchmarks of the storage and serialization steps behind every
+request, at growing collection sizes.
+"""
+import os
+import json
+import tempfile
+from api.items import load_data, save_data, items_schema
+from api.store import ItemStore
+from api.serialization import EncodedItems, encode_items
+from api.search import SearchIndex, fold
+from .stats import measure, summarize_calls
+from .workload import make_items
+
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000)
+
+
+def bench_load_data(items, directory):
+    path = os.path.join(directory, 'load.json')
+    save_data(items, path)
+    return measure(lambda: load_data(path))
+
+
+def bench_save_data(items, directory):
+    path = os.path.join(directory, 'save.json')
+    return measure(lambda: save_data(items, path))
+
+
+def bench_duplicate_scan(items, directory):
+    # The store's check before every create or rename: a name index hit.
+    path = os.path.join(directory, 'store.json')
+    save_data(items, path)
+    store = ItemStore(path)
+    store.load()
+    timings = measure(
+        lambda: store.find_by_name('No such item'), max_repeat=100000
+    )
+    store.close()
+    return timings
+
+
+def bench_duplicate_scan_linear(items, directory):
+    # The original check: compare the new name against every item.
+    def scan():
+        for item in items:
+            if item['name'] == 'No such item':
+                return True
+        return False
+    return measure(scan)
+
+
+def bench_schema_dump(items, directory):
+    return measure(lambda: items_schema.dump(items))
+
+
+def bench_schema_encode(items, directory):
+    # What jsonify(items_schema.dump(items)) does for a list response.
+    return measure(lambda: json.dumps(
+        items_schema.dump(items), sort_keys=True, separators=(',', ':')
+    ))
+
+
+def bench_fast_encode(items, directory):
+    return measure(lambda: encode_items(items))
+
+
+def bench_fast_encode_cached(items, directory):
+    cache = EncodedItems()
+    encode_items(items, cache=cache)
+    return measure(lambda: encode_items(items, cache=cache))
+
+
+def bench_search(items, directory):
+    # A typeahead query: a rare word and the start of another one.
+    index = SearchIndex(items)
+    return measure(lambda: index.search('number 12', 0, 20))
+
+
+def bench_search_broad(items, directory):
+    # A word found in every item, so all of them have to be ranked.
+    index = SearchIndex(items)
+    return measure(lambda: index.search('benchmark item', 0, 20))
+
+
+def bench_search_linear(items, directory):
+    # Filtering the whole list, as the UI did before the search endpoint.
+    def scan():
+        return [
+            item for item in items
+            if 'number 12' in fold(item['description'])
+        ][:20]
+    return measure(scan)
+
+
+BENCHMARKS = {
+    'load_data': bench_load_data,
+    'save_data': bench_save_data,
+    'duplicate_scan': bench_duplicate_scan,
+    'duplicate_scan_linear': bench_duplicate_scan_linear,
+    'schema_dump': bench_schema_dump,
+    'schema_encode': bench_schema_encode,
+    'fast_encode': bench_fast_encode,
+    'fast_encode_cached': bench_fast_encode_cached,
+    'search': bench_search,
+    'search_broad': bench_search_broad,
+    'search_linear': bench_search_linear,
+}
+
+
+def run(sizes=DEFAULT_SIZES, names=None, progress=None):
+    """
+    Runs the selected micro-benchmarks and returns
+    ``{'micro/<name>/<size>': record}``.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            items = make_items(size)
+            for name, bench in BENCHMARKS.items():
+                if names and name not in names:
+                    continue
+                record = summarize_calls(bench(items, directory), size)
+                key = f"micro/{name}/{size}"
+                results[key] = record
+                if progress is not None:
+                    progress(key, record)
+    return results
@@ -0,0 +1,67 @@
+import time
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    rank = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _ms(value):
+    return None if value is None else round(value * 1000, 4)
+
+
+def summarize(latencies, errors, elapsed):
+    """Builds a load-test record from request latencies in seconds."""
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'rps': round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': _ms(percentile(ordered, 0.50)),
+        'p95_ms': _ms(percentile(ordered, 0.95)),
+        'p99_ms': _ms(percentile(ordered, 0.99)),
+        'max_ms': _ms(ordered[-1] if ordered else None),
+    }
+
+
+def measure(func, setup=None, min_time=0.5, min_repeat=3, max_repeat=1000):
+    """
+    Calls ``func`` repeatedly and returns the per-call timings in seconds.
+
+    It stops once ``min_time`` seconds have been spent and ``min_repeat``
+    calls made, or after ``max_repeat`` calls. ``setup``, when given, runs
+    untimed before each call and its return value is passed to ``func``.
+    """
+    timings = []
+    spent = 0.0
+    while len(timings) < max_repeat and (
+            spent < min_time or len(timings) < min_repeat):
+        argument = setup() if setup is not None else None
+        start = time.perf_counter()
+        if setup is not None:
+            func(argument)
+        else:
+            func()
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        spent += elapsed
+    return timings
+
+
+def summarize_calls(timings, size):
+    """Builds a micro-benchmark record from per-call timings."""
+    ordered = sorted(timings)
+    p50 = percentile(ordered, 0.50)
+    return {
+        'size': size,
+        'calls': len(ordered),
+        'p50_ms': _ms(p50),
+        'p95_ms': _ms(percentile(ordered, 0.95)),
+        'p99_ms': _ms(percentile(ordered, 0.99)),
+        'ops_per_sec': round(1 / p50, 1) if p50 else None,
+        'items_per_sec': round(size / p50) if p50 else None,
+    }
@@ -0,0 +1,85 @@
+"""
+Request mixes for the load generators.
+
+A workload is a picklable callable taking a ``random.Random`` and
+returning the next ``(method, path, body)`` to send; ``body`` is a JSON
+string or None.
+"""
+import json
+import uuid
+
+
+def make_items(size):
+    """Returns ``size`` items shaped like the ones the API stores."""
+    return [
+        {
+            'id': index,
+            'name': f"Item {index}",
+            'description': f"Benchmark item number {index}"
+        }
+        for index in range(1, size + 1)
+    ]
+
+
+def make_repeated_items(size):
+    """
+    Returns ``size`` items sharing a few names and descriptions, like the
+    bundled data.json.
+    """
+    names = ('Item 1', 'Item de prueba')
+    return [
+        {
+            'id': index,
+            'name': names[index % len(names)],
+            'description': "Descripción del Item 1"
+        }
+        for index in range(1, size + 1)
+    ]
+
+
+class FixedRequest:
+    """Sends the same request every time."""
+
+    def __init__(self, method='GET', path='/', body=None):
+        self.method = method
+        self.path = path
+        self.body = body
+
+    def __call__(self, rng):
+        return self.method, self.path, self.body
+
+
+class MixedWorkload:
+    """
+    Random mix of reads and writes against items ``1..size``, as seeded
+    by ``make_items``.
+
+    ``write_ratio`` of the requests are writes, split evenly between
+    creating an item with a fresh name and updating a random existing
+    one. ``list_ratio`` are paginated list reads; the rest fetch a random
+    item by id.
+    """
+
+    def __init__(self, size, write_ratio=0.1, list_ratio=0.05, page_size=50):
+        if not 0 <= write_ratio + list_ratio <= 1:
+            raise ValueError("write_ratio + list_ratio must be in [0, 1]")
+        self.size = size
+        self.write_ratio = write_ratio
+        self.list_ratio = list_ratio
+        self.page_size = page_size
+
+    def __call__(self, rng):
+        roll = rng.random()
+        item_id = rng.randint(1, self.size)
+        if roll < self.write_ratio:
+            if rng.random() < 0.5:
+                body = {'name': f"bench-{uuid.uuid4().hex}"}
+                return 'POST', '/api/items', json.dumps(body)
+            body = {
+                'name': f"Item {item_id}",
+                'description': f"Updated {rng.random()}"
+            }
+            return 'PUT', f"/api/items/{item_id}", json.dumps(body)
+        if roll < self.write_ratio + self.list_ratio:
+            return 'GET', f"/api/items?limit={self.page_size}", None
+        return 'GET', f"/api/items/{item_id}", None
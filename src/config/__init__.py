@@ -1,8 +1,9 @@
-class Config:
-    pass
-
+from .config import Config, TestingConfig, get_env_variable
 
 config_by_name = {
-    'development': Config(),
-    'local': Config()
+    'development': Config,
+    'local': Config,
+    'testing': TestingConfig
 }
+
+__all__ = ['Config', 'TestingConfig', 'get_env_variable', 'config_by_name']
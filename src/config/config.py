@@ -1,12 +1,11 @@
 import os
 import logging
+import tempfile
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 
 def get_env_variable(var_name, default=None):
     """Gets the environment variable or raises an error if not found."""
@@ -21,6 +20,86 @@ class Config:
     """Configuration class for the application."""
     DEBUG = os.getenv('DEBUG', 'False').lower() in ['true', '1']
 
+    DATA_FILE = os.getenv('DATA_FILE', os.path.join(BASE_DIR, 'data.json'))
+    # 'snapshot' rewrites DATA_FILE on every change, 'wal' appends to a log
+    ITEM_PERSISTENCE = os.getenv('ITEM_PERSISTENCE', 'snapshot')
+    WAL_SYNC_EVERY = int(os.getenv('WAL_SYNC_EVERY', '64'))
+    WAL_SYNC_INTERVAL = float(os.getenv('WAL_SYNC_INTERVAL', '0.05'))
+    WAL_COMPACT_THRESHOLD = int(os.getenv('WAL_COMPACT_THRESHOLD', '10000'))
+    # 'id' addresses items by their stable id, 'position' by list index
+    ITEM_ADDRESSING = os.getenv('ITEM_ADDRESSING', 'id')
+    # 'binary' writes DATA_FILE as a memory-mapped snapshot instead of JSON
+    ITEM_SNAPSHOT_FORMAT = os.getenv('ITEM_SNAPSHOT_FORMAT', 'json')
+    # Processes parsing a JSON DATA_FILE of 64 MiB or more
+    LOAD_WORKERS = int(os.getenv('LOAD_WORKERS', str(os.cpu_count() or 1)))
+
+    # 'json' keeps items in DATA_FILE, 'sql' in the DATABASE_URL database
+    ITEM_BACKEND = os.getenv('ITEM_BACKEND', 'json')
+    DATABASE_URL = os.getenv('DATABASE_URL')
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+
+    RABBITMQ_URI = os.getenv('RABBITMQ_URI')
+    RABBITMQ_POOL_SIZE = int(os.getenv('RABBITMQ_POOL_SIZE', '2'))
+    RABBITMQ_BATCH_SIZE = int(os.getenv('RABBITMQ_BATCH_SIZE', '100'))
+    RABBITMQ_BATCH_INTERVAL = float(
+        os.getenv('RABBITMQ_BATCH_INTERVAL', '0.05')
+    )
+    # Commit each batch in an AMQP transaction so the broker acknowledges it
+    RABBITMQ_TRANSACTIONAL = os.getenv(
+        'RABBITMQ_TRANSACTIONAL', 'True'
+    ).lower() in ['true', '1']
+
+    # Ship application logs to the 'logs' fanout exchange in the background
+    LOG_TO_RABBITMQ = os.getenv('LOG_TO_RABBITMQ', 'False').lower() in [
+        'true', '1'
+    ]
+    LOG_SHIPPING_CAPACITY = int(os.getenv('LOG_SHIPPING_CAPACITY', '10000'))
+    # 'drop' discards records when the buffer is full, 'block' waits
+    LOG_SHIPPING_POLICY = os.getenv('LOG_SHIPPING_POLICY', 'drop')
+
+    # 'rabbitmq' relays item change events between workers and instances
+    ITEM_EVENTS_RELAY = os.getenv('ITEM_EVENTS_RELAY', 'none')
+    # Events buffered per /api/items/events stream before it is evicted
+    EVENT_BUFFER_SIZE = int(os.getenv('EVENT_BUFFER_SIZE', '256'))
+    EVENT_MAX_STREAMS = int(os.getenv('EVENT_MAX_STREAMS', '1000'))
+    EVENT_HEARTBEAT = float(os.getenv('EVENT_HEARTBEAT', '15'))
+
+    # Load the item repository in create_app instead of on first use
+    WARMUP_ON_START = os.getenv('WARMUP_ON_START', 'False').lower() in [
+        'true', '1'
+    ]
+
+    # Encode item reads directly instead of through the marshmallow schema
+    FAST_SERIALIZATION = os.getenv(
+        'FAST_SERIALIZATION', 'True'
+    ).lower() in ['true', '1']
+    # Encoded list responses kept per collection version; 0 disables
+    RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '256'))
+    RESPONSE_CACHE_MAX_BYTES = int(
+        os.getenv('RESPONSE_CACHE_MAX_BYTES', str(32 * 1024 * 1024))
+    )
+    # gzip, or brotli when installed, for JSON bodies of COMPRESS_MIN_SIZE+
+    COMPRESS_RESPONSES = os.getenv(
+        'COMPRESS_RESPONSES', 'True'
+    ).lower() in ['true', '1']
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', '5'))
+
+    # 'none', 'local' for an in-process LRU of item reads, or 'redis' to
+    # add a tier on REDIS_URL shared by every worker and instance
+    ITEM_CACHE = os.getenv('ITEM_CACHE', 'none')
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_TTL = float(os.getenv('CACHE_TTL', '60'))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '1024'))
+    CACHE_MAX_BYTES = int(
+        os.getenv('CACHE_MAX_BYTES', str(64 * 1024 * 1024))
+    )
+    CACHE_NAMESPACE = os.getenv('CACHE_NAMESPACE', 'items')
+
     # DATABASE_URL = get_env_variable('DATABASE_URL')  # Commented out
     # SECRET_KEY = get_env_variable('SECRET_KEY')      # Commented out
 
@@ -44,5 +123,12 @@ class Config:
         logger.info("All required environment variables are present.")
 
 
+class TestingConfig(Config):
+    """Configuration for the test suite, which keeps data out of src/."""
+    TESTING = True
+    # The tests' conftest.py moves this to a fresh temporary file per test
+    DATA_FILE = os.path.join(tempfile.gettempdir(), 'crud-python-test.json')
+
+
 if __name__ == "__main__":
     Config.validate()
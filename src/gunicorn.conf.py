@@ -0,0 +1,96 @@
+"""
+Gunicorn settings for serving wsgi:app in production.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting can be overridden through the environment variable named
+next to it. See docs/guides/DEPLOYMENT.md for the measured trade-offs.
+"""
+import os
+import glob
+import tempfile
+import multiprocessing
+
+
+def _env_bool(name, default):
+    return os.getenv(name, str(default)).lower() in ['true', '1']
+
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:50010')
+
+# 'gthread' (default) runs ``threads`` request threads per worker; 'gevent'
+# serves ``worker_connections`` greenlets per worker and needs gevent
+# installed; 'sync' handles one request at a time per worker.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv(
+    'GUNICORN_WORKERS', str(multiprocessing.cpu_count() * 2 + 1)
+))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+
+# Importing the app once in the master lets workers share its memory and
+# fork in milliseconds. gevent has to patch the standard library before
+# the app is imported, so it is not preloaded.
+preload_app = _env_bool('GUNICORN_PRELOAD', worker_class != 'gevent')
+
+# Keep connections from nginx open between requests.
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Recycle workers after a jittered number of requests so leaks stay bounded
+# and workers do not all restart at once.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+# Time in-flight requests get to finish after SIGTERM.
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+# Every worker writes its metrics here and /metrics aggregates them. It
+# has to be set before prometheus_client is first imported.
+os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    os.path.join(tempfile.gettempdir(), 'crud-python-metrics')
+)
+
+
+def on_starting(server):
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    os.makedirs(path, exist_ok=True)
+    for stale in glob.glob(os.path.join(path, '*.db')):
+        os.remove(stale)
+
+
+def post_fork(server, worker):
+    from app.health import begin_shutdown, reset_shutdown
+
+    reset_shutdown()
+    # Fail readiness as soon as the worker is asked to stop, so nginx
+    # retries new requests elsewhere while this one drains.
+    handle_exit = worker.handle_exit
+
+    def draining_exit(sig, frame):
+        begin_shutdown()
+        handle_exit(sig, frame)
+
+    worker.handle_exit = draining_exit
+
+
+def post_worker_init(worker):
+    # Runs after gevent has patched the worker and the app is loaded, so
+    # the first request does not pay for reading the data file.
+    from app import warmup
+    warmup(worker.wsgi)
+
+
+def worker_exit(server, worker):
+    from app import shutdown
+    shutdown(worker.wsgi)
+
+
+def child_exit(server, worker):
+    from app.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
@@ -4,6 +4,8 @@ db = SQLAlchemy()
 
 
 class Item(db.Model):
+    __table_args__ = {'sqlite_autoincrement': True}
+
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, unique=True, index=True)
     description = db.Column(db.String(200), nullable=True)
@@ -1,10 +1,7 @@
 import os
-from flask import Flask
-from api.routes import main_bp
+from app import create_app
 
-app = Flask(__name__)
-
-app.register_blueprint(main_bp)
+app = create_app()
 
 if __name__ == "__main__":
     debug_mode = os.getenv('FLASK_DEBUG', '0') == '1'
@@ -3,8 +3,38 @@ let statusMessage = document.getElementById('statusMessage');
 
 window.onload = () => {
     fetchItems();
+    watchItems();
 };
 
+// Applies the changes the backend streams, whoever made them. After a
+// reconnect, events may have been missed, so the list is fetched again.
+function watchItems() {
+    if (!window.EventSource) return;
+    const source = new EventSource('http://localhost:50010/api/items/events');
+    let connected = false;
+    source.onopen = () => {
+        if (connected) fetchItems();
+        connected = true;
+    };
+    ['created', 'updated', 'deleted'].forEach(type => {
+        source.addEventListener(type, event => applyEvent(JSON.parse(event.data)));
+    });
+}
+
+function applyEvent(event) {
+    // Search results are not kept in step; the next search reads afresh.
+    if (document.getElementById('searchBox').value.trim().length > 0) return;
+    const index = items.findIndex(item => item.id === event.id);
+    if (event.type === 'deleted') {
+        if (index !== -1) items.splice(index, 1);
+    } else if (index !== -1) {
+        items[index] = event.item;
+    } else {
+        items.push(event.item);
+    }
+    renderItems();
+}
+
 async function fetchItems() {
     statusMessage.textContent = "Loading items...";
     try {
@@ -21,6 +51,33 @@ async function fetchItems() {
     }
 }
 
+let searchTimer = null;
+let searchRequest = 0;
+
+document.getElementById('searchBox').oninput = function (event) {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => searchItems(event.target.value), 250);
+};
+
+async function searchItems(query) {
+    const request = ++searchRequest;
+    if (query.trim().length === 0) {
+        fetchItems();
+        return;
+    }
+    try {
+        const response = await fetch(`http://localhost:50010/api/items/search?q=${encodeURIComponent(query)}&limit=50`);
+        if (!response.ok) throw new Error("Search failed");
+        const { items: results } = await response.json();
+        // Drop answers to queries the user has already typed past.
+        if (request !== searchRequest) return;
+        items = results;
+        renderItems();
+    } catch (error) {
+        handleError(error);
+    }
+}
+
 function renderItems() {
     const itemsList = document.getElementById('itemsList');
     itemsList.innerHTML = '';
@@ -77,7 +134,8 @@ document.getElementById('crudForm').onsubmit = async function (event) {
             });
 
             if (!response.ok) throw new Error("Failed to update item");
-            items[itemId].name = itemName;
+            const updated = items.find(item => item.id === Number(itemId));
+            if (updated) updated.name = itemName;
             renderItems();
             resetForm();
             statusMessage.textContent = "Item updated successfully!";
@@ -90,8 +148,9 @@ document.getElementById('crudForm').onsubmit = async function (event) {
             });
 
             if (!response.ok) throw new Error("Failed to create item");
-            const newItem = await response.json();
-            items.push(newItem);
+            const { item: newItem } = await response.json();
+            // The change feed may have delivered it already.
+            if (!items.some(item => item.id === newItem.id)) items.push(newItem);
             renderItems();
             resetForm();
             statusMessage.textContent = "Item created successfully!";
@@ -104,10 +163,12 @@ document.getElementById('crudForm').onsubmit = async function (event) {
 function deleteItem(index) {
     if (confirm(`Are you sure you want to delete "${items[index].name}"?`)) {
         statusMessage.textContent = "Deleting the item...";
-        fetch(`http://localhost:50010/api/items/${items[index].id}`, { method: 'DELETE' })
+        const id = items[index].id;
+        fetch(`http://localhost:50010/api/items/${id}`, { method: 'DELETE' })
             .then(response => {
                 if (!response.ok) throw new Error("Failed to delete item");
-                items.splice(index, 1);
+                const deleted = items.findIndex(item => item.id === id);
+                if (deleted !== -1) items.splice(deleted, 1);
                 renderItems();
                 statusMessage.textContent = "Item deleted successfully!";
             })
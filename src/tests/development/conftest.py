@@ -1,7 +1,45 @@
 import pytest
 import os
+import sys
+import shutil
 import psycopg2
 
+# Seed data for apps built with the testing config; tests read a copy.
+SEED_DATA_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data.json'
+)
+
+
+def pytest_configure(config):
+    # Apps built while tests are collected, like ``src.app.app``, use the
+    # testing config instead of the development one and its src/data.json.
+    os.environ.setdefault('APP_CONFIG', 'testing')
+
+
+@pytest.fixture(autouse=True)
+def testing_data_file(tmp_path_factory, monkeypatch):
+    """
+    Points apps built with the testing config, including an already built
+    default app, at a copy of src/data.json in a temporary directory of
+    the test's own.
+    """
+    path = str(tmp_path_factory.mktemp('testing') / 'data.json')
+    shutil.copyfile(SEED_DATA_FILE, path)
+    testing = sys.modules.get('config')
+    if testing is not None and hasattr(testing, 'TestingConfig'):
+        monkeypatch.setattr(testing.TestingConfig, 'DATA_FILE', path)
+    apps = []
+    for name in ('app', 'src.app'):
+        app = getattr(sys.modules.get(name), '_default_app', None)
+        if app is not None and app.testing:
+            monkeypatch.setitem(app.config, 'DATA_FILE', path)
+            apps.append(app)
+    yield path
+    for app in apps:
+        repository = app.extensions.pop('item_repository', None)
+        if repository is not None:
+            repository.close()
+
 
 @pytest.fixture(scope="session")
 def postgres_connection():
@@ -0,0 +1,73 @@
+import pytest
+from src.app import create_app, warmup
+
+
+@pytest.fixture
+def app(tmp_path):
+    return create_app({'DATA_FILE': str(tmp_path / 'data.json')})
+
+
+def test_create_app_does_not_load_data(app):
+    if 'item_repository' in app.extensions:
+        raise Exception("Expected the repository to be created lazily")
+    if 'metrics' not in app.blueprints:
+        raise Exception("Expected /metrics to be registered")
+
+
+def test_missing_data_file_starts_empty(app):
+    with app.test_client() as client:
+        response = client.get('/api/items')
+        if response.status_code != 200 or response.json != []:
+            raise Exception(
+                "Expected an empty list, got {} {}".format(
+                    response.status_code, response.json
+                )
+            )
+        response = client.post('/api/items', json={'name': 'First'})
+        if response.status_code != 201:
+            raise Exception(
+                "Expected status code 201, got {}".format(
+                    response.status_code
+                )
+            )
+    if 'item_repository' not in app.extensions:
+        raise Exception("Expected the repository after the first request")
+
+
+def test_warmup_loads_repository(app, tmp_path):
+    (tmp_path / 'data.json').write_text('[{"name": "Preloaded"}]')
+    warmup(app)
+    repository = app.extensions.get('item_repository')
+    if repository is None or len(repository) != 1:
+        raise Exception("Expected warmup to load the data file")
+
+
+def test_apps_are_independent(tmp_path):
+    first = create_app({'DATA_FILE': str(tmp_path / 'first.json')})
+    second = create_app({'DATA_FILE': str(tmp_path / 'second.json')})
+    first.test_client().post('/api/items', json={'name': 'Only first'})
+    if second.test_client().get('/api/items').json != []:
+        raise Exception("Expected each app to have its own repository")
+
+
+def test_health_endpoints(app):
+    from src.app.health import begin_shutdown, reset_shutdown
+
+    with app.test_client() as client:
+        if client.get('/healthz').status_code != 200:
+            raise Exception("Expected /healthz to report live")
+        response = client.get('/readyz')
+        if response.status_code != 200 or response.json['items'] != 0:
+            raise Exception(
+                "Expected /readyz to report ready, got {}".format(
+                    response.json
+                )
+            )
+        begin_shutdown()
+        try:
+            if client.get('/readyz').status_code != 503:
+                raise Exception("Expected /readyz to fail while draining")
+            if client.get('/healthz').status_code != 200:
+                raise Exception("Expected /healthz to stay live")
+        finally:
+            reset_shutdown()
@@ -0,0 +1,62 @@
+import random
+from src.benchmarks.stats import percentile, summarize
+from src.benchmarks.workload import MixedWorkload, make_items
+from src.benchmarks.__main__ import compare, parse_args, run
+from src.benchmarks import micro
+
+
+def test_percentile_nearest_rank():
+    ordered = list(range(1, 101))
+    for fraction, expected in ((0.5, 50), (0.95, 95), (0.99, 99)):
+        if percentile(ordered, fraction) != expected:
+            raise Exception(
+                "Expected p{} of 1..100 to be {}".format(
+                    int(fraction * 100), expected
+                )
+            )
+    if summarize([], 0, 1.0)['p50_ms'] is not None:
+        raise Exception("Expected no percentiles without samples")
+
+
+def test_mixed_workload_ratio():
+    workload = MixedWorkload(100, write_ratio=0.2, list_ratio=0.0)
+    rng = random.Random(1)  # nosec B311
+    requests = [workload(rng) for _ in range(5000)]
+    writes = sum(1 for method, _, _ in requests if method != 'GET')
+    if not 900 <= writes <= 1100:
+        raise Exception("Expected about 20% writes, got {}".format(writes))
+
+
+def test_compare_flags_regressions_only():
+    baseline = {
+        'micro/load_data/10': {'p50_ms': 1.0},
+        'inprocess/mixed-w10/1000': {'rps': 1000.0},
+    }
+    results = {
+        'micro/load_data/10': {'p50_ms': 1.5},
+        'inprocess/mixed-w10/1000': {'rps': 1100.0},
+        'micro/save_data/10': {'p50_ms': 9.0},
+    }
+    regressions = compare(results, baseline, 0.25)
+    if [regression['key'] for regression in regressions] != [
+            'micro/load_data/10']:
+        raise Exception("Unexpected regressions: {}".format(regressions))
+
+
+def test_micro_benchmark_records():
+    results = micro.run(sizes=[10], names=['load_data', 'schema_dump'])
+    if sorted(results) != ['micro/load_data/10', 'micro/schema_dump/10']:
+        raise Exception("Unexpected results: {}".format(sorted(results)))
+    record = results['micro/load_data/10']
+    if record['size'] != 10 or record['calls'] < 3 or not record['p50_ms']:
+        raise Exception("Incomplete record: {}".format(record))
+    if len(make_items(3)) != 3:
+        raise Exception("Expected make_items to build three items")
+
+
+def test_only_selects_memory_datasets():
+    results = run(parse_args(
+        ['--suite', 'memory', '--sizes', '10', '--only', 'repeated']
+    ))
+    if sorted(results) != ['memory/repeated/10']:
+        raise Exception("Unexpected results: {}".format(sorted(results)))
@@ -0,0 +1,161 @@
+import json
+import pytest
+from prometheus_client import REGISTRY
+from src.api.cache import LRUCache, RedisCache
+from src.api import cached_repository
+from src.api.cached_repository import CachedRepository
+from src.api.store import ItemStore
+from src.app import create_app
+from src.app.metrics import _observe_cache
+
+
+class FakeRedis:
+    """In-memory stand-in for the redis-py client calls the cache makes."""
+
+    def __init__(self):
+        self.data = {}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("Connection refused")
+
+    def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self._check()
+        self.data[key] = value
+
+    def incr(self, key):
+        self._check()
+        value = int(self.data.get(key, b'0')) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+    def close(self):
+        pass
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps([{"name": "Item 1"}, {"name": "Item 2"}]))
+    return str(path)
+
+
+def cached_store(data_file, redis):
+    store = ItemStore(data_file)
+    store.load()
+    calls = []
+    all_items = store.all
+    store.all = lambda: calls.append('all') or all_items()
+    return CachedRepository(
+        store, LRUCache(ttl=60), RedisCache(redis, ttl=60)
+    ), calls
+
+
+def test_lru_expires_and_evicts_by_size():
+    clock = Clock()
+    cache = LRUCache(max_entries=10, max_bytes=8, ttl=5, clock=clock)
+    cache.put('a', b'1234')
+    clock.now = 6
+    if cache.get('a') is not None:
+        raise Exception("Expected the entry to expire after the TTL")
+    cache.put('a', b'1234')
+    cache.put('b', b'1234')
+    cache.put('c', b'1234')
+    if cache.get('a') is not None or cache.get('c') != b'1234':
+        raise Exception("Expected the oldest entry evicted for space")
+
+
+def test_instances_share_the_remote_tier(data_file):
+    redis = FakeRedis()
+    first, first_calls = cached_store(data_file, redis)
+    second, second_calls = cached_store(data_file, redis)
+
+    first.all()
+    items = second.all()
+    if second_calls or [item['name'] for item in items] != [
+            'Item 1', 'Item 2']:
+        raise Exception("Expected the second instance to read from Redis")
+    second.all()
+    if len(second.local) != 1:
+        raise Exception("Expected the result in the local tier")
+
+    first.update(1, {'name': 'Renamed'})
+    if second.all()[0]['name'] != 'Renamed' or second_calls != ['all']:
+        raise Exception("Expected the write to invalidate both instances")
+
+
+def test_missing_items_and_pages_are_cached(data_file):
+    repository, _ = cached_store(data_file, FakeRedis())
+    for _ in range(2):
+        if repository.get(99) is not None:
+            raise Exception("Expected no item 99")
+        items, last_id = repository.page(limit=1)
+        if [item['id'] for item in items] != [1] or last_id != 1:
+            raise Exception("Unexpected page {} {}".format(items, last_id))
+
+
+def test_local_tier_sizes_entries_without_encoding(data_file, monkeypatch):
+    store = ItemStore(data_file)
+    store.load()
+    repository = CachedRepository(store, LRUCache(ttl=60))
+    monkeypatch.setattr(cached_repository, 'json', None)
+    repository.all()
+    repository.page(limit=1)
+    repository.get(99)
+    if repository.local._bytes != 4 * cached_repository.ESTIMATED_ITEM_BYTES:
+        raise Exception("Expected entries sized by their item count")
+
+
+def test_unavailable_redis_falls_back_to_storage(data_file):
+    redis = FakeRedis()
+    repository, calls = cached_store(data_file, redis)
+    redis.down = True
+    repository.all()
+    repository.all()
+    if calls != ['all', 'all']:
+        raise Exception("Expected reads to bypass the cache")
+    repository.add({'name': 'Item 3'})
+    if len(repository.all()) != 3:
+        raise Exception("Expected writes to succeed without Redis")
+
+
+def test_cache_events_are_counted():
+    def count(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    hits = count('cache_requests_total', tier='local', result='hit')
+    evictions = count('cache_evictions_total', tier='local', reason='ttl')
+    _observe_cache('local', 'hit')
+    _observe_cache('local', 'expiration')
+    if count('cache_requests_total', tier='local', result='hit') != (
+            hits + 1):
+        raise Exception("Expected the hit to be counted")
+    if count('cache_evictions_total', tier='local', reason='ttl') != (
+            evictions + 1):
+        raise Exception("Expected the expiration to be counted")
+
+
+def test_local_cache_through_the_app(tmp_path):
+    app = create_app({
+        'DATA_FILE': str(tmp_path / 'data.json'),
+        'ITEM_CACHE': 'local'
+    })
+    with app.test_client() as client:
+        client.get('/api/items')
+        client.post('/api/items', json={'name': 'Cached'})
+        names = [item['name'] for item in client.get('/api/items').json]
+        if names != ['Cached']:
+            raise Exception("Expected the new item, got {}".format(names))
@@ -0,0 +1,58 @@
+import gzip
+import json
+import pytest
+from flask import Flask
+from src.api.routes import main_bp
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps(
+        [{"name": f"Item {index}"} for index in range(1, 201)]
+    ))
+    app = Flask(__name__)
+    app.config['DATA_FILE'] = str(path)
+    app.register_blueprint(main_bp)
+    with app.test_client() as client:
+        yield client
+
+
+def test_large_bodies_are_gzipped(client):
+    plain = client.get('/api/items')
+    packed = client.get('/api/items', headers=GZIP)
+    if packed.headers.get('Content-Encoding') != 'gzip':
+        raise Exception("Expected a gzip encoded list")
+    if gzip.decompress(packed.get_data()) != plain.get_data():
+        raise Exception("Expected the same JSON once decompressed")
+    if packed.headers['ETag'] != plain.headers['ETag'][:-1] + '-gzip"':
+        raise Exception(
+            "Unexpected variant ETag {}".format(packed.headers['ETag'])
+        )
+    if 'Accept-Encoding' not in plain.headers.get('Vary', ''):
+        raise Exception("Expected Vary: Accept-Encoding")
+    repeat = client.get('/api/items', headers=dict(
+        GZIP, **{'If-None-Match': packed.headers['ETag']}
+    ))
+    if repeat.status_code != 304:
+        raise Exception("Expected the gzip ETag to revalidate")
+
+
+def test_small_bodies_are_not_compressed(client):
+    response = client.get('/api/items/1', headers=GZIP)
+    if 'Content-Encoding' in response.headers:
+        raise Exception("Expected a small item to be sent as is")
+
+
+def test_if_match_accepts_variant_etags(client):
+    etag = client.get('/api/items/1').headers['ETag']
+    response = client.put(
+        '/api/items/1', json={'name': 'Renamed'},
+        headers={'If-Match': etag[:-1] + '-gzip"'}
+    )
+    if response.status_code != 200:
+        raise Exception(
+            "Expected status code 200, got {}".format(response.status_code)
+        )
@@ -0,0 +1,162 @@
+import json
+import pytest
+from flask import Flask
+from src.api import store
+from src.api.routes import main_bp
+from src.api.store import ItemStore
+from src.api.cache import LRUCache
+from src.api.exceptions import VersionMismatchError
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps([{"name": "Item 1"}, {"name": "Item 2"}]))
+    return str(path)
+
+
+@pytest.fixture
+def app(data_file):
+    app = Flask(__name__)
+    app.config['DATA_FILE'] = data_file
+    app.register_blueprint(main_bp)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    with app.test_client() as client:
+        yield client
+
+
+def test_if_none_match_returns_304(client):
+    first = client.get('/api/items')
+    etag = first.headers.get('ETag')
+    if not etag or not first.headers.get('Last-Modified'):
+        raise Exception("Expected ETag and Last-Modified on the list")
+    repeat = client.get('/api/items', headers={'If-None-Match': etag})
+    if repeat.status_code != 304 or repeat.get_data():
+        raise Exception(
+            "Expected an empty 304, got {}".format(repeat.status_code)
+        )
+    since = client.get(
+        '/api/items',
+        headers={'If-Modified-Since': first.headers['Last-Modified']}
+    )
+    if since.status_code != 304:
+        raise Exception("Expected If-Modified-Since to return 304")
+
+    client.post('/api/items', json={'name': 'Item 3'})
+    changed = client.get('/api/items', headers={'If-None-Match': etag})
+    if changed.status_code != 200 or len(changed.json) != 3:
+        raise Exception("Expected the new list after a write")
+    if changed.headers['ETag'] == etag:
+        raise Exception("Expected the ETag to change after a write")
+
+
+def test_item_etag_ignores_other_items(client):
+    etag = client.get('/api/items/1').headers['ETag']
+    client.put('/api/items/2', json={'name': 'Renamed'})
+    response = client.get('/api/items/1', headers={'If-None-Match': etag})
+    if response.status_code != 304:
+        raise Exception("Expected item 1 to be unchanged")
+
+
+def test_item_revalidation_reuses_its_tag(client, monkeypatch):
+    tagged = []
+
+    def content_tag(item, tag=store._content_tag):
+        tagged.append(item['id'])
+        return tag(item)
+
+    monkeypatch.setattr(store, '_content_tag', content_tag)
+    etag = client.get('/api/items/1').headers['ETag']
+    response = client.get('/api/items/1', headers={'If-None-Match': etag})
+    if response.status_code != 304 or tagged != [1]:
+        raise Exception("Expected one tag for both reads, got {}".format(
+            tagged
+        ))
+    client.put('/api/items/1', json={'name': 'Renamed'})
+    response = client.get('/api/items/1', headers={'If-None-Match': etag})
+    if response.status_code != 200 or response.headers['ETag'] == etag:
+        raise Exception("Expected a new ETag after the item changed")
+
+
+def test_if_match_rejects_stale_writes(client):
+    etag = client.get('/api/items/1').headers['ETag']
+    first = client.put(
+        '/api/items/1', json={'name': 'First'}, headers={'If-Match': etag}
+    )
+    if first.status_code != 200:
+        raise Exception(
+            "Expected status code 200, got {}".format(first.status_code)
+        )
+    for method in (client.put, client.delete):
+        stale = method(
+            '/api/items/1', json={'name': 'Second'},
+            headers={'If-Match': etag}
+        )
+        if stale.status_code != 412:
+            raise Exception(
+                "Expected status code 412, got {}".format(stale.status_code)
+            )
+    if client.get('/api/items/1').json['name'] != 'First':
+        raise Exception("Expected the stale writes to be rejected")
+
+
+def test_list_bodies_are_cached_per_version(app, client):
+    first = client.get('/api/items?fields=name').get_data()
+    second = client.get('/api/items?fields=name').get_data()
+    if first != second or len(app.extensions['response_cache']) != 1:
+        raise Exception("Expected the second body to come from the cache")
+
+
+def test_versions_agree_across_stores(data_file):
+    first = ItemStore(data_file)
+    second = ItemStore(data_file)
+    first.load()
+    second.load()
+    if first.version() != second.version():
+        raise Exception("Expected stores on the same file to agree")
+    stale = second.item_version(1).etag
+    first.update(1, {'name': 'Changed'})
+    current = first.item_version(1).etag
+    if second.item_version(1).etag != current or current == stale:
+        raise Exception("Expected the writer's new ETag in both stores")
+    if second.version() != first.version():
+        raise Exception("Expected stores to agree after a write")
+    with pytest.raises(VersionMismatchError):
+        second.delete(1, expected=(stale,))
+    second.update(1, {'name': 'Again'}, expected=(current,))
+    if first.item_version(1) != second.item_version(1):
+        raise Exception("Expected the writers to agree in turn")
+
+
+def test_versions_agree_across_log_replays(data_file):
+    first = ItemStore(data_file, persistence='wal')
+    first.load()
+    first.add({'name': 'Item 3'})
+    second = ItemStore(data_file, persistence='wal')
+    second.load()
+    first.update(3, {'name': 'Changed'})
+    if second.item_version(3) is None or (
+            second.item_version(3).etag != first.item_version(3).etag):
+        raise Exception("Expected a later load to agree with the writer")
+    first.compact()
+    if second.version().etag != first.version().etag:
+        raise Exception("Expected stores to agree after compaction")
+    first.close()
+    second.close()
+
+
+def test_response_cache_is_bounded():
+    cache = LRUCache(max_entries=2, max_bytes=10)
+    cache.put('a', b'1234')
+    cache.put('b', b'1234')
+    cache.get('a')
+    cache.put('c', b'1234')
+    if cache.get('b') is not None or cache.get('a') is None:
+        raise Exception("Expected the least recently used entry evicted")
+    cache.put('d', b'12345678901')
+    if cache.get('d') is not None:
+        raise Exception("Expected oversized bodies not to be cached")
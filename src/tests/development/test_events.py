@@ -0,0 +1,145 @@
+import json
+import pytest
+from flask import Flask
+from src.api import events
+from src.api.routes import main_bp
+from src.api.events import Broadcaster, stream_events
+
+
+class FakeRelay:
+    def __init__(self):
+        self.started = 0
+        self.published = []
+
+    def start(self):
+        self.started += 1
+
+    def publish(self, body):
+        self.published.append(body)
+
+    def close(self):
+        pass
+
+
+def event(kind='updated', item_id=1):
+    return {'type': kind, 'id': item_id, 'version': '"v"',
+            'item': {'id': item_id, 'name': 'Pear'}}
+
+
+def parse(frames):
+    return [
+        json.loads(line[len('data: '):])
+        for frame in frames
+        for line in frame.decode().splitlines()
+        if line.startswith('data: ')
+    ]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(events, '_broadcaster', None)
+    path = tmp_path / 'data.json'
+    path.write_text('[]')
+    app = Flask(__name__)
+    app.config['DATA_FILE'] = str(path)
+    app.config['EVENT_MAX_STREAMS'] = 1
+    app.register_blueprint(main_bp)
+    with app.test_client() as client:
+        yield client
+    events.close_event_streams()
+
+
+def test_every_subscriber_gets_each_event():
+    broadcaster = Broadcaster()
+    first, second = broadcaster.subscribe(), broadcaster.subscribe()
+    broadcaster.publish(event())
+    broadcaster.publish(event('deleted'))
+    for subscription in (first, second):
+        received = parse(subscription.get(0))
+        if [e['type'] for e in received] != ['updated', 'deleted']:
+            raise Exception("Unexpected events {}".format(received))
+    if broadcaster.subscribe() is None:
+        raise Exception("Expected room for another stream")
+
+
+def test_slow_subscriber_is_evicted():
+    broadcaster = Broadcaster(capacity=2, max_subscribers=2)
+    slow, fast = broadcaster.subscribe(), broadcaster.subscribe()
+    if broadcaster.subscribe() is not None:
+        raise Exception("Expected the stream limit to be enforced")
+    for number in range(3):
+        broadcaster.publish(event(item_id=number))
+        fast.get(0)
+    if slow.get(0) is not None or broadcaster.evictions != 1:
+        raise Exception("Expected the full subscription to be closed")
+    if len(broadcaster) != 1 or fast.closed:
+        raise Exception("Expected the other stream to stay open")
+
+
+def test_relay_skips_own_events():
+    relay = FakeRelay()
+    broadcaster = Broadcaster(relay=relay)
+    subscription = broadcaster.subscribe()
+    broadcaster.publish(event())
+    broadcaster.receive(relay.published[0])
+    other = json.dumps({'origin': 'other', 'event': event('created', 2)})
+    broadcaster.receive(other)
+    received = parse(subscription.get(0))
+    if [e['id'] for e in received] != [1, 2] or relay.started != 1:
+        raise Exception("Unexpected relayed events {}".format(received))
+
+
+def test_stream_ends_when_closed():
+    broadcaster = Broadcaster()
+    subscription = broadcaster.subscribe()
+    stream = stream_events(broadcaster, subscription, heartbeat=0)
+    if next(stream) != b'retry: 3000\n\n':
+        raise Exception("Expected the reconnect delay first")
+    if not next(stream).startswith(b':'):
+        raise Exception("Expected a heartbeat on an idle stream")
+    broadcaster.close()
+    if list(stream) != [b'event: closed\ndata: {}\n\n'] or len(broadcaster):
+        raise Exception("Expected a closed event and no subscription")
+
+
+def test_writes_publish_events(client):
+    with client.application.app_context():
+        broadcaster = events.get_broadcaster()
+    subscription = broadcaster.subscribe()
+    created = client.post('/api/items', json={'name': 'Fig'})
+    item_id = created.get_json()['item']['id']
+    client.put('/api/items/{}'.format(item_id), json={'name': 'Date'})
+    etag = client.get('/api/items/{}'.format(item_id)).headers['ETag']
+    client.delete('/api/items/{}'.format(item_id))
+
+    received = parse(subscription.get(0))
+    if [e['type'] for e in received] != ['created', 'updated', 'deleted']:
+        raise Exception("Unexpected events {}".format(received))
+    if received[1]['version'] != etag:
+        raise Exception("Expected the event to carry the new ETag")
+    if received[1]['item'] != {'id': item_id, 'name': 'Date'}:
+        raise Exception("Unexpected payload {}".format(received[1]))
+    if client.get('/api/items/events').status_code != 503:
+        raise Exception("Expected streams past the limit to be refused")
+
+
+def test_events_carry_versions_by_position(client):
+    client.application.config['ITEM_ADDRESSING'] = 'position'
+    with open(client.application.config['DATA_FILE'], 'w') as data_file:
+        data_file.write('[{"id": 5, "name": "Kiwi"}]')
+    with client.application.app_context():
+        broadcaster = events.get_broadcaster()
+    subscription = broadcaster.subscribe()
+    client.post('/api/items', json={'name': 'Fig'})
+    client.post('/api/items/_bulk', json=[
+        {'op': 'create', 'item': {'name': 'Lime'}},
+        {'op': 'update', 'id': 0, 'item': {'name': 'Plum'}},
+    ])
+
+    received = parse(subscription.get(0))
+    etags = [
+        client.get('/api/items/{}'.format(position)).headers['ETag']
+        for position in (1, 2, 0)
+    ]
+    if [e['version'] for e in received] != etags:
+        raise Exception("Unexpected versions {}".format(received))
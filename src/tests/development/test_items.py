@@ -0,0 +1,286 @@
+import json
+import os
+import errno
+import pytest
+from flask import Flask
+from src.api import items
+from src.api.routes import main_bp
+from src.api.store import ItemStore
+from src.api.exceptions import ItemAlreadyExistsError
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps([{"name": "Item 1"}, {"name": "Item 2"}]))
+    return str(path)
+
+
+@pytest.fixture
+def store(data_file):
+    store = ItemStore(data_file)
+    store.load()
+    return store
+
+
+@pytest.fixture
+def client(data_file):
+    app = Flask(__name__)
+    app.config['DATA_FILE'] = data_file
+    app.register_blueprint(main_bp)
+
+    with app.test_client() as client:
+        yield client
+
+
+def read_file(path):
+    with open(path) as data_file:
+        return json.load(data_file)
+
+
+def test_store_serves_reads_from_memory(store, data_file):
+    os.remove(data_file)
+    store._signature = None
+
+    if store.get(2) != {"id": 2, "name": "Item 2"}:
+        raise Exception(
+            "Expected the cached item, got {}".format(store.get(2))
+        )
+
+
+def test_store_writes_through(store, data_file):
+    store.add({"name": "Item 3"})
+    store.update(1, {"name": "Item 0"})
+    store.delete(2)
+
+    expected = [{"id": 1, "name": "Item 0"}, {"id": 3, "name": "Item 3"}]
+    if read_file(data_file) != expected:
+        raise Exception(
+            "Expected {}, got {}".format(expected, read_file(data_file))
+        )
+
+
+def test_store_reloads_after_external_change(store, data_file):
+    with open(data_file, 'w') as external:
+        json.dump([{"name": "External item"}], external)
+    os.utime(data_file, ns=(0, 0))
+
+    if store.all() != [{"id": 1, "name": "External item"}]:
+        raise Exception(
+            "Expected external change, got {}".format(store.all())
+        )
+
+
+def test_failed_save_is_rolled_back(client, data_file, monkeypatch):
+    def full_disk(path, payload):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setattr(items, 'write_atomic', full_disk)
+    response = client.post('/api/items', json={"name": "Item 3"})
+    if response.status_code != 500:
+        raise Exception(
+            "Expected status code 500, got {}".format(response.status_code)
+        )
+    monkeypatch.undo()
+
+    names = [item['name'] for item in client.get('/api/items').get_json()]
+    if names != ["Item 1", "Item 2"] or len(read_file(data_file)) != 2:
+        raise Exception("Expected the failed add undone, got {}".format(
+            names
+        ))
+
+
+def test_load_data_refuses_a_file_without_an_array(tmp_path):
+    if items.load_data(str(tmp_path / 'missing.json')) != []:
+        raise Exception("Expected a missing file to load as empty")
+    path = tmp_path / 'data.json'
+    for text in ('', '{"name": "Not a list"}'):
+        path.write_text(text)
+        with pytest.raises(ValueError):
+            items.load_data(str(path))
+
+
+def test_store_missing_item(store):
+    if store.get(5) is not None or store.delete(0) is not None:
+        raise Exception("Expected missing items to return None")
+
+
+def test_name_index_rejects_duplicates(store):
+    with pytest.raises(ItemAlreadyExistsError):
+        store.add({"name": "Item 1"})
+
+
+def test_name_index_follows_renames(store):
+    store.update(1, {"name": "Renamed"})
+
+    if store.find_by_name("Item 1") != []:
+        raise Exception("Old name must be released after a rename")
+    if store.find_by_name("Renamed") != [{"id": 1, "name": "Renamed"}]:
+        raise Exception("New name must be indexed after a rename")
+    store.add({"name": "Item 1"})
+
+
+def test_rename_to_existing_name_is_rejected(client):
+    response = client.put('/api/items/1', json={"name": "Item 2"})
+    if response.status_code != 400:
+        raise Exception(
+            "Expected status code 400, got {}".format(response.status_code)
+        )
+
+
+def test_get_items_by_name(client):
+    response = client.get('/api/items?name=Item 2')
+    if response.get_json() != [{"id": 2, "name": "Item 2"}]:
+        raise Exception(
+            "Expected one match, got {}".format(response.get_json())
+        )
+
+
+def test_delete_keeps_other_ids(store):
+    store.add({"name": "Item 3"})
+    store.delete(1)
+
+    if [item['id'] for item in store.all()] != [2, 3]:
+        raise Exception("Expected ids [2, 3], got {}".format(store.all()))
+    if store.add({"name": "Item 4"})['id'] != 4:
+        raise Exception("Ids must never be reused")
+
+
+def test_position_addressing(data_file):
+    store = ItemStore(data_file, addressing='position')
+    store.delete(0)
+
+    if store.get(0) != {"id": 2, "name": "Item 2"}:
+        raise Exception("Expected item 2 at position 0, got {}".format(
+            store.get(0)
+        ))
+
+
+def test_delete_through_the_api(client, data_file):
+    response = client.delete('/api/items/1')
+    if response.status_code != 200:
+        raise Exception(
+            "Expected status code 200, got {}".format(response.status_code)
+        )
+    if response.get_json()['item'] != {"id": 1, "name": "Item 1"}:
+        raise Exception("Expected the deleted item in the response")
+    if read_file(data_file) != [{"id": 2, "name": "Item 2"}]:
+        raise Exception("Expected item 1 removed from the data file")
+    if client.delete('/api/items/1').status_code != 404:
+        raise Exception("Expected a second delete to find nothing")
+
+
+def test_item_deleted_during_a_write_returns_404(client, monkeypatch):
+    delete = ItemStore.delete
+
+    def deleted_first(write):
+        def racing(self, key, *args):
+            delete(self, key)
+            return write(self, key, *args)
+        return racing
+
+    monkeypatch.setattr(ItemStore, 'update', deleted_first(ItemStore.update))
+    response = client.put('/api/items/1', json={"name": "Renamed"})
+    if response.status_code != 404:
+        raise Exception(
+            "Expected status code 404, got {}".format(response.status_code)
+        )
+    monkeypatch.setattr(ItemStore, 'delete', deleted_first(ItemStore.delete))
+    response = client.delete('/api/items/2')
+    if response.status_code != 404:
+        raise Exception(
+            "Expected status code 404, got {}".format(response.status_code)
+        )
+
+
+def test_get_missing_item_returns_404(client):
+    response = client.get('/api/items/10')
+    if response.status_code != 404:
+        raise Exception(
+            "Expected status code 404, got {}".format(response.status_code)
+        )
+
+
+def test_pagination_follows_cursor(client, store):
+    for number in range(3, 8):
+        store.add({"name": "Item {}".format(number)})
+
+    names = []
+    response = client.get('/api/items?limit=3&fields=name')
+    while True:
+        page = response.get_json()
+        names.extend(item['name'] for item in page['items'])
+        if page['next'] is None:
+            break
+        response = client.get(
+            '/api/items?limit=3&fields=name&cursor=' + page['next']
+        )
+
+    expected = ["Item {}".format(number) for number in range(1, 8)]
+    if names != expected:
+        raise Exception("Expected {}, got {}".format(expected, names))
+
+
+def test_field_projection(client):
+    response = client.get('/api/items?fields=id')
+    if response.get_json() != [{"id": 1}, {"id": 2}]:
+        raise Exception("Expected ids only, got {}".format(response.data))
+
+
+def test_invalid_page_parameters(client):
+    for query in ('limit=0', 'cursor=bogus', 'fields=secret'):
+        response = client.get('/api/items?' + query)
+        if response.status_code != 400:
+            raise Exception(
+                "Expected status code 400 for {}, got {}".format(
+                    query, response.status_code
+                )
+            )
+
+
+def test_stream_json_array(client, store):
+    for number in range(3, 8):
+        store.add({"name": "Item {}".format(number)})
+
+    response = client.get('/api/items?stream=1')
+    if json.loads(response.data) != client.get('/api/items').get_json():
+        raise Exception("Streamed export differs from the full listing")
+
+
+def test_stream_ndjson(client):
+    response = client.get('/api/items?stream=1&format=ndjson&fields=name')
+    lines = [json.loads(line) for line in response.data.splitlines()]
+    if lines != [{"name": "Item 1"}, {"name": "Item 2"}]:
+        raise Exception("Unexpected NDJSON export: {}".format(lines))
+
+
+def test_bulk_operations_report_per_item_results(client, data_file):
+    operations = [
+        {"name": "Item 3"},
+        {"op": "update", "id": 1, "item": {"name": "Item 1b"}},
+        {"op": "delete", "id": 2},
+        {"op": "delete", "id": 99},
+        {"name": "Item 3"},
+        {"name": "ab"},
+        {"description": "missing name"}
+    ]
+    response = client.post('/api/items/_bulk', json=operations)
+    statuses = [result['status'] for result in response.get_json()['results']]
+
+    if statuses != [201, 200, 200, 404, 400, 400, 400]:
+        raise Exception("Unexpected bulk statuses: {}".format(statuses))
+    names = [item['name'] for item in read_file(data_file)]
+    if names != ["Item 1b", "Item 3"]:
+        raise Exception("Unexpected items after bulk: {}".format(names))
+
+
+def test_bulk_accepts_ndjson(client):
+    body = '{"name": "Item 3"}\n{"name": "Item 4"}\n'
+    response = client.post(
+        '/api/items/_bulk',
+        data=body,
+        content_type='application/x-ndjson'
+    )
+    ids = [result['item']['id'] for result in response.get_json()['results']]
+    if ids != [3, 4]:
+        raise Exception("Expected ids [3, 4], got {}".format(ids))
@@ -0,0 +1,104 @@
+import json
+import hashlib
+import pytest
+from src.api.store import ItemStore
+from src.api.loader import ItemReader
+
+ITEMS = [
+    {"id": 1, "name": "Crème brûlée", "description": "Dessert"},
+    {"id": 2, "name": "Braces }, {", "description": "Not a boundary"},
+    {"id": 10, "name": "Ice", "extra": [1.5, {"deep": None}]},
+    {"name": "Unnumbered"},
+]
+
+MALFORMED = (
+    '[{"id": 1, "name": "Good"},\n'
+    ' {"id": 2, "name": },\n'
+    ' {"id": 3, "name": 42},\n'
+    ' "text",\n'
+    ' {"id": 4, "name": "Also good"} {"id": 5, "name": "No comma"},\n'
+    ' {"id": 6, "name": "Last"}]'
+)
+
+
+def write(tmp_path, text):
+    path = tmp_path / 'data.json'
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def read(path, **options):
+    reader = ItemReader(path, **options)
+    return list(reader), reader
+
+
+def test_small_chunks_read_like_json_load(tmp_path):
+    path = write(tmp_path, json.dumps(ITEMS, indent=1))
+    items, reader = read(path, chunk_size=7)
+    if items != ITEMS:
+        raise Exception("Unexpected items {}".format(items))
+    with open(path, 'rb') as data_file:
+        expected = hashlib.sha256(data_file.read()).hexdigest()
+    if reader.digest != expected:
+        raise Exception("Expected the digest of the whole file")
+
+
+def test_malformed_items_are_quarantined(tmp_path):
+    path = write(tmp_path, MALFORMED)
+    items, reader = read(path, chunk_size=16)
+    if [item['id'] for item in items] != [1, 4, 6]:
+        raise Exception("Unexpected items {}".format(items))
+    with open(path + '.quarantine') as quarantine_file:
+        rejects = [json.loads(line) for line in quarantine_file]
+    if [reject['index'] for reject in rejects] != [1, 2, 3, 5]:
+        raise Exception("Unexpected rejects {}".format(rejects))
+    if json.loads(rejects[1]['source']) != {"id": 3, "name": 42}:
+        raise Exception("Expected the invalid item's source kept")
+
+    read(path)
+    with open(path + '.quarantine') as quarantine_file:
+        if len(quarantine_file.readlines()) != 4:
+            raise Exception("Expected a reload not to repeat rejects")
+
+
+def test_truncated_file_keeps_complete_items(tmp_path):
+    path = write(tmp_path, json.dumps(ITEMS)[:-20])
+    items, reader = read(path)
+    if items != ITEMS[:3] or reader.rejected != 1:
+        raise Exception("Unexpected items {}".format(items))
+
+
+@pytest.mark.parametrize('range_size', [1, 40, 1000])
+def test_process_pool_reads_ranges(tmp_path, range_size):
+    items = [dict(item, id=i) for i, item in enumerate(ITEMS * 5, 1)]
+    text = json.dumps(items)
+    text = text[:-1] + ', {"id": 99, "name": ]'
+    path = write(tmp_path, text)
+    loaded, reader = read(path, workers=2, parallel_threshold=0,
+                          range_size=range_size)
+    if loaded != items or reader.rejected != 1:
+        raise Exception("Unexpected items {}".format(loaded))
+
+
+def test_store_keeps_loading_around_bad_items(tmp_path):
+    store = ItemStore(write(tmp_path, MALFORMED), persistence='wal')
+    store.load()
+    if [item['id'] for item in store.all()] != [1, 4, 6]:
+        raise Exception("Expected the valid items loaded")
+    if store.add({"name": "New"})['id'] != 7:
+        raise Exception("Expected ids to continue after the last item")
+    store.close()
+
+
+@pytest.mark.parametrize('text', ['{"name": "Not a list"}', '', '  \n'])
+def test_store_refuses_a_file_without_an_array(tmp_path, text):
+    path = write(tmp_path, text)
+    store = ItemStore(path)
+    with pytest.raises(ValueError):
+        store.load()
+    with pytest.raises(ValueError):
+        store.add({'name': 'Pear'})
+    store.close()
+    with open(path, encoding='utf-8') as data_file:
+        if data_file.read() != text:
+            raise Exception("Expected the file to be left intact")
@@ -0,0 +1,74 @@
+import json
+import threading
+import pytest
+from src.api.locks import ReadWriteLock
+from src.api.store import ItemStore
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps([]))
+    return str(path)
+
+
+def test_readers_share_the_lock():
+    lock = ReadWriteLock()
+    inside = threading.Barrier(2, timeout=5)
+
+    def reader():
+        with lock.read():
+            inside.wait()
+
+    threads = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_writer_excludes_readers():
+    lock = ReadWriteLock()
+    events = []
+
+    def reader():
+        with lock.read():
+            events.append('read')
+
+    lock.acquire_write()
+    reader = threading.Thread(target=reader)
+    reader.start()
+    reader.join(0.1)
+    events.append('write released')
+    lock.release_write()
+    reader.join()
+
+    if events != ['write released', 'read']:
+        raise Exception("Reader entered while a writer held the lock")
+
+
+@pytest.mark.parametrize('persistence', ['snapshot', 'wal'])
+def test_concurrent_stores_do_not_lose_updates(data_file, persistence):
+    stores = [ItemStore(data_file, persistence=persistence) for _ in range(2)]
+
+    def add_items(store, prefix):
+        for number in range(25):
+            store.add({"name": "{} {}".format(prefix, number)})
+
+    threads = [
+        threading.Thread(target=add_items, args=(stores[0], 'Thread A')),
+        threading.Thread(target=add_items, args=(stores[0], 'Thread B')),
+        threading.Thread(target=add_items, args=(stores[1], 'Process C'))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reopened = ItemStore(data_file, persistence=persistence)
+    reopened.load()
+    if len(reopened) != 75:
+        raise Exception("Expected 75 items, got {}".format(len(reopened)))
+    ids = [item['id'] for item in reopened.all()]
+    if ids != list(range(1, 76)):
+        raise Exception("Ids were reused or skipped: {}".format(ids))
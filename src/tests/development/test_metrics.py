@@ -0,0 +1,82 @@
+import pytest
+from flask import Flask
+from prometheus_client import REGISTRY
+from src.api.routes import main_bp
+from src.api.store import ItemStore
+from src.app.metrics import init_metrics, _observe_storage
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = Flask(__name__)
+    path = tmp_path / 'data.json'
+    path.write_text('[]')
+    app.extensions['item_repository'] = ItemStore(str(path))
+    app.extensions['item_repository'].load()
+    app.register_blueprint(main_bp)
+    init_metrics(app)
+
+    with app.test_client() as client:
+        yield client
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_requests_are_counted_per_rule(client):
+    labels = {'method': 'GET', 'endpoint': '/api/items/<int:item_id>'}
+    before = sample('http_requests_total', **labels)
+    status_before = sample('http_responses_total', status='404', **labels)
+    latency_before = sample('http_request_duration_seconds_count', **labels)
+
+    client.get('/api/items/41')
+    client.get('/api/items/42')
+
+    if sample('http_requests_total', **labels) != before + 2:
+        raise Exception("Expected both requests to be counted")
+    if sample('http_responses_total', status='404', **labels) != (
+            status_before + 2):
+        raise Exception("Expected two 404 responses to be counted")
+    if sample('http_request_duration_seconds_count', **labels) != (
+            latency_before + 2):
+        raise Exception("Expected two latency observations")
+    if sample('http_requests_in_progress', **labels) != 0:
+        raise Exception("Expected no requests left in progress")
+
+
+def test_unknown_paths_share_one_series(client):
+    labels = {'method': 'GET', 'endpoint': 'unmatched'}
+    before = sample('http_requests_total', **labels)
+
+    client.get('/no/such/path')
+    client.get('/another/missing/path')
+
+    if sample('http_requests_total', **labels) != before + 2:
+        raise Exception("Expected unknown paths to share a series")
+
+
+def test_response_size_and_storage_timings(client):
+    labels = {'method': 'POST', 'endpoint': '/api/items'}
+    size_before = sample('http_response_size_bytes_count', **labels)
+    client.post('/api/items', json={'name': 'Metered'})
+    if sample('http_response_size_bytes_count', **labels) != (
+            size_before + 1):
+        raise Exception("Expected the response size to be observed")
+
+    before = sample('item_storage_duration_seconds_count', operation='load')
+    _observe_storage('load', 0.01)
+    after = sample('item_storage_duration_seconds_count', operation='load')
+    if after != before + 1:
+        raise Exception("Expected the storage timing to be observed")
+
+
+def test_metrics_endpoint(client):
+    client.get('/')
+    response = client.get('/metrics')
+    if response.status_code != 200:
+        raise Exception(
+            "Expected status code 200, got {}".format(response.status_code)
+        )
+    if b'http_request_duration_seconds_bucket' not in response.data:
+        raise Exception("Expected the latency histogram in /metrics")
@@ -0,0 +1,262 @@
+import json
+import logging
+import threading
+from types import SimpleNamespace
+import pytest
+from pika.exceptions import AMQPConnectionError
+from src.utils.rabbitmq_utils import RabbitMQPublisher, RabbitMQSubscriber
+from src.utils.log_utils import RabbitMQLogHandler
+
+
+class FakeChannel:
+    def __init__(self, broker):
+        self.broker = broker
+        self.transactional = False
+        self.uncommitted = []
+
+    def queue_declare(self, queue, exclusive=False):
+        self.broker.declared.append(queue)
+        return SimpleNamespace(method=SimpleNamespace(queue=queue or 'amq.1'))
+
+    def queue_bind(self, exchange, queue):
+        self.broker.bound.append((exchange, queue))
+
+    def basic_consume(self, queue, on_message_callback, auto_ack):
+        self.callback = on_message_callback
+
+    def start_consuming(self):
+        for body in self.broker.messages:
+            self.callback(self, None, None, body)
+        self.broker.consuming.set()
+        self.broker.stopped.wait(5)
+
+    def stop_consuming(self):
+        self.broker.stopped.set()
+
+    def exchange_declare(self, exchange, exchange_type):
+        self.broker.declared.append(exchange)
+
+    def tx_select(self):
+        self.transactional = True
+
+    def tx_commit(self):
+        if self.broker.commit_failures:
+            self.broker.commit_failures -= 1
+            raise AMQPConnectionError("connection lost")
+        self.broker.messages.extend(self.uncommitted)
+        self.uncommitted = []
+        self.broker.commits += 1
+
+    def basic_publish(self, exchange, routing_key, body):
+        if self.broker.failures:
+            self.broker.failures -= 1
+            raise AMQPConnectionError("connection lost")
+        if self.transactional:
+            self.uncommitted.append(body)
+        else:
+            self.broker.messages.append(body)
+
+
+class FakeConnection:
+    def __init__(self, broker):
+        self.broker = broker
+        self.is_open = True
+
+    def channel(self):
+        return FakeChannel(self.broker)
+
+    def add_callback_threadsafe(self, callback):
+        callback()
+
+    def close(self):
+        self.is_open = False
+
+
+class FakeBroker:
+    def __init__(self, failures=0, refusals=0, commit_failures=0):
+        self.failures = failures
+        self.refusals = refusals
+        self.commit_failures = commit_failures
+        self.commits = 0
+        self.connections = 0
+        self.declared = []
+        self.messages = []
+        self.bound = []
+        self.consuming = threading.Event()
+        self.stopped = threading.Event()
+
+    def __call__(self, parameters):
+        self.connections += 1
+        if self.refusals:
+            self.refusals -= 1
+            raise AMQPConnectionError("connection refused")
+        return FakeConnection(self)
+
+
+@pytest.fixture
+def broker():
+    return FakeBroker()
+
+
+def make_publisher(broker, **kwargs):
+    return RabbitMQPublisher(
+        'fake-parameters',
+        connection_factory=broker,
+        backoff=0,
+        **kwargs
+    )
+
+
+def test_publisher_reuses_one_connection(broker):
+    publisher = make_publisher(broker)
+    for number in range(250):
+        publisher.publish('log {}'.format(number))
+    publisher.close()
+
+    if len(broker.messages) != 250:
+        raise Exception("Expected 250 messages, got {}".format(
+            len(broker.messages)
+        ))
+    if broker.connections != 1 or broker.declared != ['log_queue']:
+        raise Exception("Expected a single declared connection")
+    if not 1 <= broker.commits <= 3:
+        raise Exception("Expected one commit per batch, got {}".format(
+            broker.commits
+        ))
+
+
+def test_publisher_reconnects_after_failure():
+    broker = FakeBroker(failures=2)
+    publisher = make_publisher(broker)
+    publisher.publish('first')
+    publisher.publish('second')
+    publisher.close()
+
+    if broker.messages != ['first', 'second'] or publisher.dropped:
+        raise Exception("Messages were lost: {}".format(broker.messages))
+    if broker.connections != 3:
+        raise Exception("Expected 3 connections, got {}".format(
+            broker.connections
+        ))
+
+
+def test_uncommitted_batch_is_sent_again():
+    broker = FakeBroker(commit_failures=1)
+    publisher = make_publisher(broker)
+    publisher.send_batch(['first', 'second'])
+    publisher.close()
+
+    if broker.messages != ['first', 'second'] or publisher.published != 2:
+        raise Exception("Expected the batch once, got {}".format(
+            broker.messages
+        ))
+
+
+def test_publisher_drops_after_max_retries():
+    broker = FakeBroker(failures=10)
+    publisher = make_publisher(broker, max_retries=3)
+    publisher.publish('lost')
+    publisher.close()
+
+    if publisher.dropped != 1 or broker.messages:
+        raise Exception("Expected the message to be dropped")
+
+
+def test_subscriber_consumes_after_reconnecting():
+    broker = FakeBroker(refusals=2)
+    broker.messages.extend(['one', 'two'])
+    received = []
+    subscriber = RabbitMQSubscriber(
+        'fake-parameters',
+        exchange='item_events',
+        on_message=received.append,
+        backoff=0,
+        connection_factory=broker
+    )
+    subscriber.start()
+    if not broker.consuming.wait(5):
+        raise Exception("Expected the subscriber to start consuming")
+    subscriber.stop()
+
+    if received != ['one', 'two'] or broker.connections != 3:
+        raise Exception("Unexpected messages {}".format(received))
+    if broker.bound != [('item_events', 'amq.1')]:
+        raise Exception("Expected a server-named queue bound once")
+
+
+def test_publish_after_close_fails(broker):
+    publisher = make_publisher(broker)
+    publisher.close()
+    with pytest.raises(RuntimeError):
+        publisher.publish('late')
+
+
+class BlockingPublisher:
+    def __init__(self):
+        self.release = threading.Event()
+        self.sent = []
+        self.dropped = 0
+
+    def send_batch(self, batch):
+        self.release.wait(5)
+        self.sent.extend(batch)
+
+    def close(self):
+        pass
+
+
+def make_logger(handler):
+    logger = logging.getLogger('test_rabbitmq.{}'.format(id(handler)))
+    logger.propagate = False
+    logger.addHandler(handler)
+    return logger
+
+
+def test_log_handler_ships_json_to_logs_exchange(broker):
+    publisher = make_publisher(broker, exchange='logs', exchange_type='fanout')
+    handler = RabbitMQLogHandler(publisher, batch_interval=0.01)
+    logger = make_logger(handler)
+    for number in range(20):
+        logger.warning("record %d", number)
+    handler.close()
+
+    messages = [json.loads(body)['message'] for body in broker.messages]
+    if messages != ["record {}".format(number) for number in range(20)]:
+        raise Exception("Unexpected shipped records: {}".format(messages))
+    if broker.declared != ['logs'] or handler.shipped != 20:
+        raise Exception("Records were not shipped to the logs exchange")
+
+
+def test_log_handler_ships_messages_as_logged():
+    publisher = BlockingPublisher()
+    handler = RabbitMQLogHandler(publisher, batch_size=1)
+    logger = make_logger(handler)
+    names = ['Pear']
+    logger.warning("first")
+    logger.warning("names %s", names)
+    names.append('Fig')
+    publisher.release.set()
+    handler.close()
+
+    messages = [json.loads(body)['message'] for body in publisher.sent]
+    if messages != ["first", "names ['Pear']"]:
+        raise Exception("Unexpected shipped records: {}".format(messages))
+
+
+def test_log_handler_drops_when_full():
+    publisher = BlockingPublisher()
+    handler = RabbitMQLogHandler(
+        publisher, capacity=2, policy='drop', batch_size=1
+    )
+    logger = make_logger(handler)
+    for number in range(10):
+        logger.warning("record %d", number)
+    publisher.release.set()
+    handler.close()
+
+    if handler.dropped < 7:
+        raise Exception("Expected dropped records, got {}".format(
+            handler.dropped
+        ))
+    if len(publisher.sent) + handler.dropped != 10:
+        raise Exception("Every record must be shipped or counted as dropped")
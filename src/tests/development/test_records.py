@@ -0,0 +1,60 @@
+import json
+import pytest
+from src.api.records import Item, compact, as_dict
+from src.api.store import ItemStore
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps([
+        {"name": "Item 1"},
+        {"name": "Item 1", "description": "Repeated"},
+        {"name": "Legacy", "tags": ["kept"]}
+    ]))
+    return str(path)
+
+
+def test_item_reads_like_the_dict():
+    item = compact({"id": 1, "name": "Item"})
+    if type(item) is not Item or item != {"id": 1, "name": "Item"}:
+        raise Exception("Expected an equal Item, got {!r}".format(item))
+    if 'description' in item or item.get('description', 'none') != 'none':
+        raise Exception("Expected no description key")
+    try:
+        item['description']
+    except KeyError:
+        pass
+    else:
+        raise Exception("Expected KeyError for a missing field")
+    if json.dumps(item, default=as_dict) != '{"id": 1, "name": "Item"}':
+        raise Exception("Unexpected JSON {}".format(
+            json.dumps(item, default=as_dict)
+        ))
+
+
+def test_repeated_strings_are_shared():
+    first = compact({"id": 1, "name": "Item", "description": "Same text"})
+    second = compact(json.loads(
+        '{"id": 2, "name": "Item", "description": "Same text"}'
+    ))
+    if first.description is not second.description:
+        raise Exception("Expected one copy of the description")
+
+
+def test_store_holds_items_and_persists_them(data_file):
+    store = ItemStore(data_file)
+    store.load()
+    if [type(item) for item in store.all()] != [Item, Item, dict]:
+        raise Exception("Expected items with unknown fields to stay dicts")
+    if [item['id'] for item in store.find_by_name("Item 1")] != [1, 2]:
+        raise Exception("Expected both items named Item 1")
+    store.delete(1)
+    store.update(2, {"name": "Renamed"})
+    if store.find_by_name("Item 1") != []:
+        raise Exception("Expected the name index to drop Item 1")
+
+    with open(data_file) as saved:
+        names = [item['name'] for item in json.load(saved)]
+    if names != ["Renamed", "Legacy"]:
+        raise Exception("Unexpected saved items {}".format(names))
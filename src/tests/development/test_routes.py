@@ -4,8 +4,9 @@ from src.api.routes import main_bp
 
 
 @pytest.fixture
-def client():
+def client(testing_data_file):
     app = Flask(__name__)
+    app.config['DATA_FILE'] = testing_data_file
     app.register_blueprint(main_bp)
 
     with app.test_client() as client:
@@ -0,0 +1,102 @@
+import json
+import pytest
+from flask import Flask
+from src.api.routes import main_bp
+from src.api.store import ItemStore
+from src.api.search import SearchIndex, fold
+
+ITEMS = [
+    {"name": "Crème brûlée", "description": "Dessert"},
+    {"name": "Cream cheese", "description": "Spread made from cream"},
+    {"name": "Ice cream", "description": "Frozen dessert"},
+    {"name": "Creamery tour"},
+]
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps(ITEMS))
+    return str(path)
+
+
+@pytest.fixture
+def client(data_file):
+    app = Flask(__name__)
+    app.config['DATA_FILE'] = data_file
+    app.register_blueprint(main_bp)
+    with app.test_client() as client:
+        yield client
+
+
+def ids(index, query, offset=0, limit=20):
+    return index.search(query, offset, limit)[0]
+
+
+def test_fold_removes_case_and_accents():
+    if fold("Crème BRÛLÉE") != "creme brulee":
+        raise Exception("Unexpected folding {!r}".format(fold("Crème")))
+
+
+def test_words_are_anded_and_the_last_is_a_prefix():
+    index = SearchIndex(
+        dict(item, id=position) for position, item in enumerate(ITEMS, 1)
+    )
+    if ids(index, "CREME") != [1]:
+        raise Exception("Expected accents and case to be ignored")
+    if ids(index, "dessert ice") != [3]:
+        raise Exception("Expected every word to be required")
+    if ids(index, "cream ") != [2, 3]:
+        raise Exception("Expected a trailing space to end the word")
+    # Name matches rank first, and whole words before completions.
+    if ids(index, "cream") != [2, 3, 4]:
+        raise Exception(
+            "Unexpected ranking {}".format(ids(index, "cream"))
+        )
+    if ids(index, "cream", offset=1, limit=1) != [3]:
+        raise Exception("Expected the second result alone")
+
+
+def test_index_follows_mutations(data_file):
+    store = ItemStore(data_file)
+    store.load()
+    store.search("cream")
+    store.update(3, {"name": "Sorbet", "description": "Frozen"})
+    store.add({"name": "Whipped cream"})
+    store.delete(2)
+    names = [item['name'] for item in store.search("cream")[0]]
+    if names != ["Whipped cream", "Creamery tour"]:
+        raise Exception("Unexpected results {}".format(names))
+    if [i['id'] for i in store.search("sorb")[0]] != [3]:
+        raise Exception("Expected the updated item to be found")
+
+
+def test_search_route_pages_results(client):
+    first = client.get('/api/items/search?q=cre&limit=2&fields=name')
+    if first.status_code != 200 or len(first.json['items']) != 2:
+        raise Exception("Unexpected first page {}".format(first.json))
+    if set(first.json['items'][0]) != {'name'}:
+        raise Exception("Expected only the requested fields")
+    second = client.get(
+        '/api/items/search?q=cre&limit=2&cursor=' + first.json['next']
+    )
+    if len(second.json['items']) != 2 or second.json['next'] is not None:
+        raise Exception("Unexpected last page {}".format(second.json))
+    etag = first.headers['ETag']
+    repeat = client.get(
+        '/api/items/search?q=cre&limit=2&fields=name',
+        headers={'If-None-Match': etag}
+    )
+    if repeat.status_code != 304:
+        raise Exception("Expected search results to revalidate")
+
+
+def test_search_route_requires_a_query(client):
+    for url in ('/api/items/search', '/api/items/search?q=%20'):
+        response = client.get(url)
+        if response.status_code != 400:
+            raise Exception(
+                "Expected status code 400 for {}, got {}".format(
+                    url, response.status_code
+                )
+            )
@@ -0,0 +1,87 @@
+import pytest
+from flask import Flask, jsonify
+from src.api import serialization
+from src.api.items import ItemSchema
+from src.api.serialization import (
+    EncodedItems,
+    item_encoder,
+    items_response,
+    page_response
+)
+from src.app import create_app
+
+ITEMS = [
+    {'id': 1, 'name': 'Plain', 'description': 'ASCII only'},
+    {'id': 2, 'name': 'Café ☕ 𝄞', 'description': None},
+    {'id': 3, 'name': 'Quote " slash \\ tab\t', 'extra': 'dropped'},
+    {'id': '4', 'name': 'Control \x00\x1f\x7f', 'description': ' '},
+]
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def flask_app(request, monkeypatch):
+    if request.param == 'stdlib':
+        monkeypatch.setattr(serialization, 'orjson', None)
+    item_encoder.cache_clear()
+    yield Flask(__name__)
+    item_encoder.cache_clear()
+
+
+def test_items_match_jsonify(flask_app):
+    with flask_app.app_context():
+        for fields in (None, ('name',), ('name', 'id'), ('id', 'id')):
+            expected = jsonify(
+                ItemSchema(many=True, only=fields).dump(ITEMS)
+            ).get_data()
+            actual = items_response(ITEMS, fields).get_data()
+            if actual != expected:
+                raise Exception(
+                    "Expected {!r}, got {!r}".format(expected, actual)
+                )
+
+
+def test_page_matches_jsonify(flask_app):
+    with flask_app.app_context():
+        for cursor in (None, 'eyJhZnRlciI6IDR9'):
+            expected = jsonify(
+                {'items': ItemSchema(many=True).dump(ITEMS), 'next': cursor}
+            ).get_data()
+            actual = page_response(ITEMS, cursor).get_data()
+            if actual != expected:
+                raise Exception(
+                    "Expected {!r}, got {!r}".format(expected, actual)
+                )
+
+
+def test_debug_falls_back_to_jsonify(flask_app):
+    flask_app.debug = True
+    with flask_app.app_context():
+        expected = jsonify(ItemSchema(many=True).dump(ITEMS)).get_data()
+        if items_response(ITEMS).get_data() != expected:
+            raise Exception("Expected the indented debug output")
+
+
+def test_cache_follows_replaced_items():
+    cache = EncodedItems()
+    encoder = item_encoder()
+    item = {'id': 1, 'name': 'Before'}
+    cache.encode(item, encoder)
+    if cache.encode(dict(item, name='After'), encoder) != (
+            b'{"id":1,"name":"After"}'):
+        raise Exception("Expected a replaced item to be encoded again")
+    cache.discard(1)
+    if len(cache):
+        raise Exception("Expected discard to drop the entry")
+
+
+def test_routes_serve_updated_items(tmp_path):
+    app = create_app({'DATA_FILE': str(tmp_path / 'data.json')})
+    with app.test_client() as client:
+        client.post('/api/items', json={'name': 'Original'})
+        client.get('/api/items')
+        client.put('/api/items/1', json={'name': 'Renamed'})
+        for path in ('/api/items', '/api/items?limit=1', '/api/items/1'):
+            if b'Renamed' not in client.get(path).get_data():
+                raise Exception(
+                    "Expected {} to serve the update".format(path)
+                )
@@ -0,0 +1,105 @@
+import json
+import pytest
+from src.api.store import ItemStore
+from src.api.records import Item
+from src.api.snapshot import Snapshot, write_snapshot, convert
+
+ITEMS = [
+    {"id": 1, "name": "Apple", "description": "Red"},
+    {"id": 2, "name": "Pear"},
+    {"id": 5, "name": "Apple", "description": "Green"},
+    {"id": 7, "name": "Plum", "extra": [1, 2]},
+]
+
+
+@pytest.fixture
+def snapshot_file(tmp_path):
+    path = str(tmp_path / 'data.snap')
+    write_snapshot(path, ITEMS)
+    return path
+
+
+def test_items_round_trip(snapshot_file):
+    snapshot = Snapshot.open(snapshot_file)
+    try:
+        items = [snapshot.item(i) for i in range(len(snapshot))]
+        if [dict(item) for item in items] != ITEMS:
+            raise Exception("Unexpected items {}".format(items))
+        if type(items[0]) is not Item or snapshot.position(3) is not None:
+            raise Exception("Expected compact items looked up by id")
+        if snapshot.ids_named("Apple") != [1, 5]:
+            raise Exception("Expected both items named Apple")
+    finally:
+        snapshot.close()
+
+
+def test_json_files_are_not_snapshots(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps(ITEMS))
+    if Snapshot.open(str(path)) is not None:
+        raise Exception("Expected JSON to be told apart from a snapshot")
+
+
+def test_store_reads_and_writes_a_snapshot(snapshot_file):
+    store = ItemStore(snapshot_file, snapshot_format='binary')
+    store.load()
+    store.update(1, {"name": "Cherry"})
+    store.delete(2)
+    added = store.add({"name": "Pear"})
+    if added['id'] != 8 or [i['id'] for i in store.find_by_name(
+            "Apple")] != [5]:
+        raise Exception("Expected the name index to follow changes")
+    store.close()
+
+    reloaded = ItemStore(snapshot_file)
+    reloaded.load()
+    names = [item['name'] for item in reloaded.all()]
+    if names != ["Cherry", "Apple", "Plum", "Pear"]:
+        raise Exception("Unexpected items after reload {}".format(names))
+    if reloaded.page(after=5, limit=1) != ([reloaded.get(7)], 7):
+        raise Exception("Expected pages to seek in the id column")
+    reloaded.close()
+
+
+def test_wal_compacts_into_a_snapshot(snapshot_file):
+    store = ItemStore(snapshot_file, persistence='wal',
+                      snapshot_format='binary')
+    store.load()
+    store.add({"name": "Fig"})
+    store.compact()
+    store.add({"name": "Kiwi"})
+    store.close()
+
+    reloaded = ItemStore(snapshot_file, persistence='wal')
+    reloaded.load()
+    if [item['name'] for item in reloaded.all()][-2:] != ["Fig", "Kiwi"]:
+        raise Exception("Expected the log replayed onto the snapshot")
+    reloaded.close()
+
+
+def test_convert_both_ways(tmp_path):
+    source = tmp_path / 'data.json'
+    source.write_text(json.dumps([{"name": "A"}, {"name": "B"}]))
+    snapshot = str(tmp_path / 'data.snap')
+    back = str(tmp_path / 'back.json')
+    if convert(str(source), snapshot) != 2:
+        raise Exception("Expected two items converted")
+    convert(snapshot, back)
+    with open(back) as back_file:
+        items = json.load(back_file)
+    if items != [{"name": "A", "id": 1}, {"name": "B", "id": 2}]:
+        raise Exception("Unexpected items {}".format(items))
+
+
+def test_damaged_snapshot_is_rejected(snapshot_file):
+    with open(snapshot_file, 'r+b') as damaged:
+        damaged.seek(-1, 2)
+        last = damaged.read(1)
+        damaged.seek(-1, 2)
+        damaged.write(bytes([last[0] ^ 0xFF]))
+    with pytest.raises(ValueError):
+        Snapshot.open(snapshot_file, verify=True)
+    with pytest.raises(ValueError):
+        ItemStore(snapshot_file).load()
+    with pytest.raises(ValueError):
+        convert(snapshot_file, snapshot_file + '.json')
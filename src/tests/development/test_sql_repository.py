@@ -0,0 +1,97 @@
+import pytest
+from flask import Flask
+
+pytest.importorskip('flask_sqlalchemy')
+
+from sqlalchemy.exc import IntegrityError  # noqa: E402
+from src.api.routes import main_bp  # noqa: E402
+from src.api.exceptions import ItemAlreadyExistsError  # noqa: E402
+from src.api.sql_repository import (  # noqa: E402
+    SQLItemRepository,
+    build_engine
+)
+
+
+@pytest.fixture
+def repository():
+    repository = SQLItemRepository(build_engine('sqlite://'))
+    repository.load()
+    repository.add({"name": "Item 1"})
+    repository.add({"name": "Item 2", "description": "Second"})
+    yield repository
+    repository.close()
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = Flask(__name__)
+    app.config['ITEM_BACKEND'] = 'sql'
+    app.config['DATABASE_URL'] = 'sqlite:///{}'.format(tmp_path / 'items.db')
+    app.register_blueprint(main_bp)
+
+    with app.app_context():
+        from src.api.repository import get_repository
+        get_repository().load()
+    with app.test_client() as client:
+        yield client
+
+
+def test_crud_round_trip(repository):
+    repository.update(1, {"name": "Item 1b"})
+    repository.delete(2)
+    added = repository.add({"name": "Item 3"})
+
+    if repository.all() != [{"id": 1, "name": "Item 1b"}, added]:
+        raise Exception("Unexpected items: {}".format(repository.all()))
+    if added['id'] != 3:
+        raise Exception("Ids must not be reused, got {}".format(added))
+
+
+def test_duplicate_names_are_rejected(repository):
+    with pytest.raises(ItemAlreadyExistsError):
+        repository.add({"name": "Item 1"})
+    with pytest.raises(ItemAlreadyExistsError):
+        repository.update(2, {"name": "Item 1"})
+
+
+def test_integrity_errors_on_delete_are_not_duplicates(
+        repository, monkeypatch):
+    def violation(*args):
+        raise IntegrityError('DELETE', {}, Exception('constraint failed'))
+
+    monkeypatch.setattr(repository, '_apply', violation)
+    with pytest.raises(IntegrityError):
+        repository.delete(1)
+
+
+def test_page_and_lookup(repository):
+    items, last_id = repository.page(limit=1)
+    if items != [{"id": 1, "name": "Item 1"}] or last_id != 1:
+        raise Exception("Unexpected first page: {}".format(items))
+    if repository.page(after=last_id, limit=1)[1] is not None:
+        raise Exception("Second page should be the last one")
+    if repository.find_by_name("Item 2")[0]['description'] != "Second":
+        raise Exception("Name lookup failed")
+
+
+def test_bulk_isolates_failures(repository):
+    results = repository.bulk([
+        ('create', None, {"name": "Item 3"}),
+        ('create', None, {"name": "Item 1"}),
+        ('delete', 99, None)
+    ])
+    outcomes = [outcome for outcome, _ in results]
+    if outcomes != ['created', 'exists', 'not_found']:
+        raise Exception("Unexpected outcomes: {}".format(outcomes))
+    if len(repository) != 3:
+        raise Exception("Expected 3 items, got {}".format(len(repository)))
+
+
+def test_routes_use_sql_backend(client):
+    response = client.post('/api/items', json={"name": "Item 1"})
+    if response.status_code != 201:
+        raise Exception(
+            "Expected status code 201, got {}".format(response.status_code)
+        )
+    if client.get('/api/items').get_json() != [{"id": 1, "name": "Item 1"}]:
+        raise Exception("Item was not stored in the database")
@@ -0,0 +1,112 @@
+import json
+import pytest
+from src.api.store import ItemStore
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps([{"name": "Item 1"}]))
+    return str(path)
+
+
+def open_store(path, **kwargs):
+    store = ItemStore(path, persistence='wal', **kwargs)
+    store.load()
+    return store
+
+
+def test_mutations_append_to_log(data_file):
+    store = open_store(data_file)
+    store.add({"name": "Item 2"})
+    store.update(1, {"name": "Item 0"})
+    store.delete(2)
+    store.close()
+
+    with open(data_file) as snapshot:
+        if json.load(snapshot) != [{"name": "Item 1"}]:
+            raise Exception("Snapshot must not be rewritten by mutations")
+    with open(data_file + '.wal') as log:
+        lines = log.read().splitlines()
+    if len(lines) != 4:
+        raise Exception(
+            "Expected header and 3 records, got {}".format(lines)
+        )
+
+
+def test_log_replayed_on_startup(data_file):
+    store = open_store(data_file)
+    store.add({"name": "Item 2"})
+    store.delete(1)
+    store.close()
+
+    reopened = open_store(data_file)
+    if reopened.all() != [{"id": 2, "name": "Item 2"}]:
+        raise Exception(
+            "Expected replayed items, got {}".format(reopened.all())
+        )
+
+
+def test_torn_record_is_ignored(data_file):
+    store = open_store(data_file)
+    store.add({"name": "Item 2"})
+    store.close()
+    with open(data_file + '.wal', 'a') as log:
+        log.write('{"op":"add","item":{"na')
+
+    reopened = open_store(data_file)
+    if len(reopened.all()) != 2:
+        raise Exception("Expected 2 items, got {}".format(reopened.all()))
+
+
+def test_compaction_folds_log_into_snapshot(data_file):
+    store = open_store(data_file, compact_threshold=1000)
+    for number in range(2, 6):
+        store.add({"name": "Item {}".format(number)})
+    store.compact()
+    store.close()
+
+    with open(data_file) as snapshot:
+        if len(json.load(snapshot)) != 5:
+            raise Exception("Expected 5 items in the compacted snapshot")
+    if open_store(data_file).all() != store.all():
+        raise Exception("Compacted store differs after reload")
+
+
+def test_stale_log_is_discarded(data_file):
+    store = open_store(data_file)
+    store.add({"name": "Item 2"})
+    store.close()
+    with open(data_file, 'w') as snapshot:
+        json.dump([{"name": "Item 1"}, {"name": "Item 2"}], snapshot)
+
+    reopened = open_store(data_file)
+    if len(reopened.all()) != 2:
+        raise Exception("Log for an older snapshot must not be replayed")
+
+
+def test_other_process_appends_are_picked_up(data_file):
+    first = open_store(data_file)
+    second = open_store(data_file)
+    first.add({"name": "Item 2"})
+
+    if second.all() != first.all():
+        raise Exception(
+            "Expected {}, got {}".format(first.all(), second.all())
+        )
+
+
+def test_appends_follow_a_log_compacted_elsewhere(data_file):
+    first = open_store(data_file)
+    second = open_store(data_file)
+    first.add({"name": "aaa"})
+    second.add({"name": "bbb"})
+    second.compact()
+    first.add({"name": "ccc"})
+    first.close()
+    second.close()
+
+    reloaded = open_store(data_file)
+    names = [item['name'] for item in reloaded.all()]
+    if names != ["Item 1", "aaa", "bbb", "ccc"]:
+        raise Exception("Expected every append kept, got {}".format(names))
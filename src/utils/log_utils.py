@@ -1,38 +1,206 @@
-import pika
-from pika.exceptions import AMQPError
+import os
+import copy
+import json
+import queue
+import threading
 from config.config import Config
 import logging
 
+_publisher = None
+_publisher_lock = threading.Lock()
 
-def setup_logging():
+LOG_EXCHANGE = 'logs'
+SHIPPING_POLICIES = ('drop', 'block')
+
+# Records from these loggers are never shipped, to avoid feedback loops
+# when publishing itself logs a warning.
+_UNSHIPPED_LOGGERS = ('pika', 'utils.rabbitmq_utils')
+
+
+def setup_logging(ship=None):
+    """
+    Configures the root logger once per process.
+
+    Records are also shipped to RabbitMQ when ``ship`` (default
+    ``Config.LOG_TO_RABBITMQ``) is true; pika is only imported then.
+    """
     logging.basicConfig(level=logging.INFO,
                         format='%(asctime)s - %(levelname)s - %(message)s')
+    if ship is None:
+        ship = Config.LOG_TO_RABBITMQ
+    root = logging.getLogger()
+    if ship and not any(
+            isinstance(handler, RabbitMQLogHandler)
+            for handler in root.handlers):
+        root.addHandler(RabbitMQLogHandler())
     logging.info("Logging is set up.")
 
 
+def get_log_publisher():
+    """Returns the process-wide publisher used for log messages."""
+    global _publisher
+    if _publisher is None:
+        with _publisher_lock:
+            if _publisher is None:
+                from utils.rabbitmq_utils import (
+                    RabbitMQPublisher,
+                    connection_parameters
+                )
+                _publisher = RabbitMQPublisher(
+                    connection_parameters(Config.RABBITMQ_URI),
+                    routing_key='log_queue',
+                    pool_size=Config.RABBITMQ_POOL_SIZE,
+                    batch_size=Config.RABBITMQ_BATCH_SIZE,
+                    batch_interval=Config.RABBITMQ_BATCH_INTERVAL,
+                    transactional=Config.RABBITMQ_TRANSACTIONAL
+                )
+    return _publisher
+
+
 def send_log_to_rabbitmq(log_message):
-    rabbitmq_host = Config.RABBITMQ_URI
-
-    connection = None
-    try:
-        connection = pika.BlockingConnection(
-            pika.ConnectionParameters(rabbitmq_host)
-        )
-        channel = connection.channel()
-        channel.queue_declare(queue='log_queue')
-        channel.basic_publish(
-            exchange='',
-            routing_key='log_queue',
-            body=log_message
-        )
-        print("Log sent to RabbitMQ successfully.")
-    except AMQPError as e:
-        print(f"Error in RabbitMQ connection or publication: {e}")
-    except Exception as e:
-        print(f"Unexpected error: {e}")
-    finally:
-        if connection:
-            try:
-                connection.close()
-            except AMQPError as e:
-                print(f"Error closing RabbitMQ connection: {e}")
+    """
+    Queues ``log_message`` for the ``log_queue`` queue.
+
+    The message is sent in the background over a pooled connection, so
+    this call does not wait on the broker.
+    """
+    get_log_publisher().publish(log_message)
+
+
+class RabbitMQLogHandler(logging.Handler):
+    """
+    Logging handler that ships records to the ``logs`` fanout exchange.
+
+    ``emit`` formats the record and puts a copy of it on a bounded queue,
+    so request threads never wait on the network. A background worker
+    drains the queue in batches of up to ``batch_size`` records (or
+    whatever arrived within ``batch_interval`` seconds), serializes them
+    to JSON and sends each batch with one publisher call.
+
+    When the queue is full the ``drop`` policy discards the record and
+    counts it in ``dropped``; the ``block`` policy makes the caller wait
+    for room instead.
+    """
+
+    def __init__(self, publisher=None, capacity=None, policy=None,
+                 batch_size=None, batch_interval=None, level=logging.NOTSET):
+        super().__init__(level)
+        policy = policy or Config.LOG_SHIPPING_POLICY
+        if policy not in SHIPPING_POLICIES:
+            raise ValueError(f"Unknown log shipping policy: {policy}")
+        self.policy = policy
+        self.batch_size = batch_size or Config.RABBITMQ_BATCH_SIZE
+        self.batch_interval = batch_interval or Config.RABBITMQ_BATCH_INTERVAL
+        if publisher is None:
+            from utils.rabbitmq_utils import (
+                RabbitMQPublisher,
+                connection_parameters
+            )
+            publisher = RabbitMQPublisher(
+                connection_parameters(Config.RABBITMQ_URI),
+                exchange=LOG_EXCHANGE,
+                exchange_type='fanout',
+                pool_size=1,
+                transactional=Config.RABBITMQ_TRANSACTIONAL
+            )
+        self.publisher = publisher
+        self.queue = queue.Queue(capacity or Config.LOG_SHIPPING_CAPACITY)
+        self.shipped = 0
+        self.dropped = 0
+        self._worker = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_worker(self):
+        # The worker thread does not survive a fork; restart it in children.
+        if self._worker is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._worker is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._worker = threading.Thread(
+                    target=self._run, name='rabbitmq-log-handler', daemon=True
+                )
+                self._worker.start()
+
+    def prepare(self, record):
+        """
+        Returns a copy of ``record`` with its message formatted, and its
+        arguments and exception dropped, as ``QueueHandler.prepare`` does.
+        They could otherwise change or be freed before the worker ships
+        the record.
+        """
+        message = self.format(record)
+        record = copy.copy(record)
+        record.message = message
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        record.stack_info = None
+        return record
+
+    def emit(self, record):
+        if record.name.startswith(_UNSHIPPED_LOGGERS):
+            return
+        self._ensure_worker()
+        try:
+            record = self.prepare(record)
+        except Exception:
+            self.handleError(record)
+            return
+        try:
+            if self.policy == 'block':
+                self.queue.put(record)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def serialize(self, record):
+        return json.dumps({
+            'timestamp': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'pid': record.process
+        })
+
+    def _next_batch(self):
+        """Blocks for one record, then collects more for a short while."""
+        batch = [self.queue.get()]
+        try:
+            while len(batch) < self.batch_size:
+                batch.append(self.queue.get(timeout=self.batch_interval))
+        except queue.Empty:
+            pass
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stop = None in batch
+            records = [record for record in batch if record is not None]
+            bodies = []
+            for record in records:
+                try:
+                    bodies.append(self.serialize(record))
+                except Exception:
+                    self.handleError(record)
+            if bodies:
+                dropped = self.publisher.dropped
+                self.publisher.send_batch(bodies)
+                failed = self.publisher.dropped - dropped
+                self.dropped += failed
+                self.shipped += len(bodies) - failed
+            if stop:
+                return
+
+    def close(self):
+        """Ships every queued record, then stops the worker."""
+        if self._worker is not None and self._pid == os.getpid():
+            self.queue.put(None)
+            self._worker.join()
+            self._worker = None
+        self.publisher.close()
+        super().close()
@@ -1,12 +1,317 @@
+import os
+import time
+import queue
+import logging
+import threading
 import pika
+from pika.exceptions import AMQPError
 from config.config import Config
 
+logger = logging.getLogger(__name__)
+
+
 def parse_rabbitmq_url():
     url = Config.RABBITMQ_URI
 
     connection_params = pika.URLParameters(url)
-    
+
     connection = pika.BlockingConnection(connection_params)
-    channel = connection.channel()
-    
+    connection.close()
+
     return url
+
+
+def connection_parameters(uri=None):
+    """Builds pika parameters from an AMQP URL or a bare host name."""
+    uri = uri or Config.RABBITMQ_URI or 'localhost'
+    if '://' in uri:
+        return pika.URLParameters(uri)
+    return pika.ConnectionParameters(uri)
+
+
+class RabbitMQPublisher:
+    """
+    Long-lived, thread-safe RabbitMQ publisher.
+
+    ``publish`` only appends the message to an in-memory batch, so callers
+    never wait on the network. A background thread sends the batch once it
+    holds ``batch_size`` messages or ``batch_interval`` seconds have
+    passed, over a small pool of open connections and channels.
+
+    With ``transactional``, channels use AMQP transactions rather than
+    publisher confirms: each batch is committed with a single round-trip,
+    so the broker has accepted all of it once ``send_batch`` returns.
+    Publisher confirms on a blocking channel would instead wait for the
+    broker after every message. Without it, messages are published
+    unacknowledged and may be lost if the broker fails. A failed send
+    drops the broken connection and retries on a fresh one with
+    exponential backoff; messages are only dropped, and counted in
+    ``dropped``, after ``max_retries`` attempts.
+
+    ``connection_factory`` defaults to ``pika.BlockingConnection`` and can
+    be replaced with a fake transport in tests.
+    """
+
+    def __init__(self, parameters=None, exchange='', exchange_type=None,
+                 routing_key='log_queue', pool_size=2, batch_size=100,
+                 batch_interval=0.05, transactional=True, max_retries=5,
+                 backoff=0.1, max_backoff=5.0, connection_factory=None):
+        self.parameters = parameters
+        self.exchange = exchange
+        self.exchange_type = exchange_type
+        self.routing_key = routing_key
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.transactional = transactional
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.connection_factory = connection_factory or pika.BlockingConnection
+        self.published = 0
+        self.dropped = 0
+        self._buffer = []
+        self._cond = threading.Condition()
+        self._flusher = None
+        self._closed = False
+        self._reset_pool()
+
+    def _reset_pool(self):
+        self._pid = os.getpid()
+        self._pool = queue.LifoQueue()
+        for _ in range(self.pool_size):
+            self._pool.put(None)
+
+    def _check_fork(self):
+        # Connections and threads do not survive a fork; start over.
+        if self._pid != os.getpid():
+            self._reset_pool()
+            self._buffer = []
+            self._flusher = None
+
+    def _open(self):
+        connection = self.connection_factory(
+            self.parameters or connection_parameters()
+        )
+        channel = connection.channel()
+        if self.exchange:
+            channel.exchange_declare(
+                exchange=self.exchange,
+                exchange_type=self.exchange_type or 'fanout'
+            )
+        else:
+            channel.queue_declare(queue=self.routing_key)
+        if self.transactional:
+            channel.tx_select()
+        return connection, channel
+
+    @staticmethod
+    def _discard(slot):
+        connection = slot[0]
+        try:
+            if connection.is_open:
+                connection.close()
+        except AMQPError:
+            pass
+
+    def publish(self, message):
+        """Queues ``message`` (str or bytes) for the next batch."""
+        with self._cond:
+            self._check_fork()
+            if self._closed:
+                raise RuntimeError("Publisher is closed.")
+            self._buffer.append(message)
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._run, name='rabbitmq-publisher', daemon=True
+                )
+                self._flusher.start()
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def _take_batch(self):
+        with self._cond:
+            batch, self._buffer = self._buffer, []
+            return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if len(self._buffer) < self.batch_size and not self._closed:
+                    self._cond.wait(self.batch_interval)
+                closed = self._closed
+            self.send_batch(self._take_batch())
+            if closed:
+                return
+
+    def flush(self):
+        """Sends everything queued so far from the calling thread."""
+        self.send_batch(self._take_batch())
+
+    def send_batch(self, batch):
+        """
+        Sends ``batch`` from the calling thread, retrying on a fresh
+        connection with backoff.
+        """
+        if not batch:
+            return
+        delay = self.backoff
+        for attempt in range(self.max_retries):
+            sent = 0
+            slot = self._pool.get()
+            try:
+                if slot is None:
+                    slot = self._open()
+                channel = slot[1]
+                for body in batch:
+                    channel.basic_publish(
+                        exchange=self.exchange,
+                        routing_key='' if self.exchange else self.routing_key,
+                        body=body
+                    )
+                    sent += 1
+                if self.transactional:
+                    channel.tx_commit()
+                self.published += sent
+                self._pool.put(slot)
+                return
+            except (AMQPError, OSError) as e:
+                logger.warning(
+                    "RabbitMQ publish failed (attempt %d/%d): %s",
+                    attempt + 1,
+                    self.max_retries,
+                    e
+                )
+                if slot is not None:
+                    self._discard(slot)
+                self._pool.put(None)
+                # The broker discards an uncommitted transaction, so with
+                # ``transactional`` the whole batch is sent again.
+                if not self.transactional:
+                    self.published += sent
+                    batch = batch[sent:]
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+        self.dropped += len(batch)
+        logger.error("Dropped %d RabbitMQ messages", len(batch))
+
+    def close(self):
+        """Sends pending messages and closes every pooled connection."""
+        with self._cond:
+            self._closed = True
+            flusher = self._flusher
+            self._cond.notify()
+        if flusher is not None and flusher.is_alive():
+            flusher.join()
+        self.flush()
+        while not self._pool.empty():
+            slot = self._pool.get_nowait()
+            if slot is not None:
+                self._discard(slot)
+
+
+class RabbitMQSubscriber:
+    """
+    Background consumer of a fanout exchange.
+
+    ``start`` runs a daemon thread that binds an exclusive, server-named
+    queue to ``exchange`` and calls ``on_message(body)`` for everything
+    published there from then on. A lost connection is reopened with
+    exponential backoff; messages published in between are not received.
+
+    ``connection_factory`` defaults to ``pika.BlockingConnection`` and can
+    be replaced with a fake transport in tests.
+    """
+
+    def __init__(self, parameters=None, exchange='', on_message=None,
+                 backoff=0.1, max_backoff=5.0, connection_factory=None):
+        self.parameters = parameters
+        self.exchange = exchange
+        self.on_message = on_message
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.connection_factory = connection_factory or pika.BlockingConnection
+        self.received = 0
+        self._connection = None
+        self._channel = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Starts consuming in the background; does nothing if running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='rabbitmq-subscriber', daemon=True
+            )
+            self._thread.start()
+
+    def _deliver(self, channel, method, properties, body):
+        self.received += 1
+        try:
+            self.on_message(body)
+        except Exception:
+            logger.exception("RabbitMQ message handler failed")
+
+    def _consume(self):
+        connection = self.connection_factory(
+            self.parameters or connection_parameters()
+        )
+        with self._lock:
+            self._connection = connection
+        try:
+            channel = connection.channel()
+            channel.exchange_declare(
+                exchange=self.exchange, exchange_type='fanout'
+            )
+            queue_name = channel.queue_declare(
+                queue='', exclusive=True
+            ).method.queue
+            channel.queue_bind(exchange=self.exchange, queue=queue_name)
+            channel.basic_consume(
+                queue=queue_name,
+                on_message_callback=self._deliver,
+                auto_ack=True
+            )
+            with self._lock:
+                self._channel = channel
+            if not self._stopping.is_set():
+                channel.start_consuming()
+        finally:
+            with self._lock:
+                self._connection = self._channel = None
+            try:
+                if connection.is_open:
+                    connection.close()
+            except AMQPError:
+                pass
+
+    def _run(self):
+        delay = self.backoff
+        while not self._stopping.is_set():
+            try:
+                self._consume()
+                delay = self.backoff
+            except (AMQPError, OSError) as e:
+                logger.warning(
+                    "RabbitMQ subscription to %s failed: %s", self.exchange, e
+                )
+                self._stopping.wait(delay)
+                delay = min(delay * 2, self.max_backoff)
+
+    def stop(self):
+        """Stops consuming and waits for the background thread."""
+        self._stopping.set()
+        with self._lock:
+            connection, channel = self._connection, self._channel
+            thread = self._thread
+        if connection is not None and channel is not None:
+            try:
+                connection.add_callback_threadsafe(channel.stop_consuming)
+            except AMQPError:
+                pass
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()